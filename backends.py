@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译推理后端
+支持 PyTorch fp32、PyTorch 动态int8量化以及导出的 ONNX Runtime 计算图，
+另有不依赖 torch/transformers 的确定性桩后端，用于离线基准测试和压力测试
+
+用法（预先导出ONNX模型）:
+    python backends.py export Helsinki-NLP/opus-mt-zh-en onnx_models/opus-mt-zh-en
+"""
+
+import argparse
+import copy
+import os
+import re
+import time
+from typing import Dict, List, Optional, Union
+
+# 可选的推理后端
+BACKENDS = ("pytorch", "quantized", "onnx", "stub")
+
+# 桩后端模拟的推理耗时：每批固定开销 + 每个padding后字符的开销（毫秒）
+STUB_BATCH_LATENCY_MS = float(os.environ.get("TRANSLATOR_STUB_BATCH_MS", "2"))
+STUB_TOKEN_LATENCY_MS = float(os.environ.get("TRANSLATOR_STUB_TOKEN_MS", "0.05"))
+
+# ONNX 导出后的编码器文件名，用于判断目录是否已经是导出好的模型
+_ONNX_ENCODER_FILE = "encoder_model.onnx"
+
+
+def set_num_threads(num_threads: Optional[int], interop_threads: Optional[int] = None):
+    """设置 torch 的算子内线程数（intra-op）和算子间线程池大小（inter-op）
+
+    inter-op 线程池只能在第一次并行计算之前设置一次，之后再设置时只打印提示。
+    """
+    if not num_threads and not interop_threads:
+        return
+    import torch
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            print(f"无法设置inter-op线程数（已经开始并行计算）: {e}")
+
+
+def clone_pipeline(pipe):
+    """创建与 pipe 共享模型权重的pipeline副本，分词器和pipeline状态各自独立
+
+    HF 快速分词器在多个线程同时调用时会报 "Already borrowed"，并发推理时每个线程使用自己的副本。
+    """
+    if isinstance(pipe, StubTranslationPipeline):
+        return StubTranslationPipeline(pipe.model_name, pipe.batch_latency_ms, pipe.token_latency_ms)
+
+    from transformers import pipeline
+
+    return pipeline("translation", model=pipe.model, tokenizer=copy.deepcopy(pipe.tokenizer),
+                    device=pipe.device)
+
+
+class StubTranslationPipeline:
+    """确定性的桩翻译pipeline
+
+    译文固定为 "[模型名] 原文"，按批次大小和padding后的字符数 sleep 模拟推理耗时
+    （sleep 期间释放GIL，与真实推理一样允许其他线程运行）。
+    """
+
+    def __init__(self, model_name: str, batch_latency_ms: float = STUB_BATCH_LATENCY_MS,
+                 token_latency_ms: float = STUB_TOKEN_LATENCY_MS):
+        """初始化桩pipeline"""
+        self.model_name = model_name
+        self.tag = os.path.basename(model_name.rstrip("/"))
+        self.batch_latency_ms = batch_latency_ms
+        self.token_latency_ms = token_latency_ms
+        # 没有分词器，长度统计退化为字符数
+        self.tokenizer = None
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: Optional[int] = None,
+                 **kwargs) -> List[Dict[str, str]]:
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return []
+        padded = len(texts) * max(len(text) for text in texts)
+        time.sleep((self.batch_latency_ms + self.token_latency_ms * padded) / 1000)
+        return [{"translation_text": f"[{self.tag}] {text}"} for text in texts]
+
+
+def _onnx_export_dir(model_name: str, onnx_cache_dir: str) -> str:
+    """导出的ONNX模型在缓存目录中的位置"""
+    return os.path.join(onnx_cache_dir, re.sub(r'[^A-Za-z0-9._-]+', '--', model_name))
+
+
+def _load_onnx_model(model_name: str, num_threads: Optional[int],
+                     onnx_cache_dir: Optional[str], interop_threads: Optional[int] = None):
+    """加载ONNX Runtime模型，必要时先从PyTorch权重导出"""
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError(
+            "onnx 后端需要安装 onnxruntime 和 optimum: pip install optimum[onnxruntime]"
+        ) from e
+
+    session_options = onnxruntime.SessionOptions()
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+    if interop_threads:
+        session_options.inter_op_num_threads = interop_threads
+
+    # 已导出的目录直接加载；否则查缓存目录，都没有时现场导出
+    source = model_name
+    export = not os.path.isfile(os.path.join(model_name, _ONNX_ENCODER_FILE))
+    if export and onnx_cache_dir:
+        cached = _onnx_export_dir(model_name, onnx_cache_dir)
+        if os.path.isfile(os.path.join(cached, _ONNX_ENCODER_FILE)):
+            source, export = cached, False
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        source, export=export, session_options=session_options
+    )
+    if export and onnx_cache_dir:
+        model.save_pretrained(_onnx_export_dir(model_name, onnx_cache_dir))
+    return model
+
+
+def _load_quantized_model(model_name: str):
+    """加载PyTorch模型并对线性层做动态int8量化（仅CPU）"""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def create_translation_pipeline(model_name: str, backend: str = "pytorch", device: int = -1,
+                                num_threads: Optional[int] = None,
+                                onnx_cache_dir: Optional[str] = None,
+                                interop_threads: Optional[int] = None):
+    """按指定后端创建 transformers 翻译pipeline
+
+    model_name: 模型名或本地路径（onnx 后端也可以是已导出的目录）
+    backend: "pytorch"（fp32）、"quantized"（动态int8）、"onnx" 或 "stub"（桩后端）
+    device: pipeline 设备号，-1 表示CPU；量化和ONNX后端总是在CPU上运行
+    num_threads: 算子内线程数，None 表示使用框架默认值
+    onnx_cache_dir: 导出的ONNX模型缓存目录，避免每次启动重新导出
+    interop_threads: torch 的 inter-op 线程池大小，None 表示使用框架默认值
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的推理后端: {backend}，可选: {', '.join(BACKENDS)}")
+
+    if backend == "stub":
+        return StubTranslationPipeline(model_name)
+
+    from transformers import AutoTokenizer, pipeline
+
+    if backend == "pytorch":
+        set_num_threads(num_threads, interop_threads)
+        return pipeline("translation", model=model_name, device=device)
+
+    if device != -1:
+        print(f"{backend} 后端只支持CPU，忽略GPU设置")
+
+    if backend == "quantized":
+        set_num_threads(num_threads, interop_threads)
+        model = _load_quantized_model(model_name)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+    else:
+        model = _load_onnx_model(model_name, num_threads, onnx_cache_dir, interop_threads)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    return pipeline("translation", model=model, tokenizer=tokenizer, device=-1)
+
+
+def main():
+    """命令行入口：导出ONNX模型"""
+    parser = argparse.ArgumentParser(description="翻译模型推理后端工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="把PyTorch模型导出为ONNX Runtime模型")
+    export_parser.add_argument("model", help="模型名或本地路径")
+    export_parser.add_argument("output", help="导出目录")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from transformers import AutoTokenizer
+
+        model = _load_onnx_model(args.model, None, None)
+        model.save_pretrained(args.output)
+        AutoTokenizer.from_pretrained(args.model).save_pretrained(args.output)
+        print(f"已导出到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
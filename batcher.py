@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+动态微批处理
+把并发到达的翻译请求合并成一个批次，交给模型一次前向计算
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from serving import QueueFullError, ServiceDrainingError
+
+
+class MicroBatcher:
+    """动态微批处理器
+
+    后台线程从请求队列中取出请求：拿到第一个请求后，最多再等待
+    max_wait_ms 毫秒收集更多请求，凑满 max_batch_size 条立即发出。
+    同一批内按源语言和解码预设分组调用 translator.translate_batch，结果
+    （译文, 实际解码步数）通过 Future 返回给各自的调用方。max_queue_size 大于 0 时队列有界，
+    排队请求达到上限后新请求立即被拒绝。
+    """
+
+    def __init__(self, translator, max_batch_size: int = 16, max_wait_ms: float = 10.0,
+                 max_queue_size: int = 0):
+        """初始化微批处理器"""
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size 必须大于 0")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms 不能为负数")
+
+        self.translator = translator
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Optional[str], Future]]]" = \
+            queue.Queue(max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self):
+        """启动后台批处理线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台线程，已入队的请求会先处理完"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit_async(self, text: str, source_lang: str = "zh",
+                     preset: Optional[str] = None) -> Future:
+        """提交一条翻译请求，返回结果为 (译文, 解码步数) 的 Future；队列满时抛出 QueueFullError"""
+        if not self._running:
+            raise ServiceDrainingError("微批处理器未运行")
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((text, source_lang, preset, future))
+        except queue.Full:
+            raise QueueFullError(f"翻译队列已满（{self.max_queue_size}）")
+        return future
+
+    def submit(self, text: str, source_lang: str = "zh", timeout: Optional[float] = None,
+               preset: Optional[str] = None, with_steps: bool = False):
+        """提交一条翻译请求并等待译文，超时后取消尚未执行的请求
+
+        with_steps=True 时返回 (译文, 解码步数)，缓存等命中时步数为0。
+        """
+        future = self.submit_async(text, source_lang, preset)
+        try:
+            result = future.result(timeout)
+            return result if with_steps else result[0]
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def queue_depth(self) -> int:
+        """当前排队的请求数"""
+        return self._queue.qsize()
+
+    def _collect_batch(self) -> Tuple[List[Tuple[str, str, Optional[str], Future]], bool]:
+        """收集一个批次，返回 (批次, 是否收到停止信号)"""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        """后台线程主循环"""
+        stopping = False
+        while not stopping or not self._queue.empty():
+            if stopping:
+                # 停止信号之后仍有残留请求，逐批清空
+                batch, _ = self._collect_batch()
+            else:
+                batch, stopping = self._collect_batch()
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch: List[Tuple[str, str, Optional[str], Future]]):
+        """按源语言和解码预设分组执行批量翻译"""
+        groups: Dict[Tuple[str, Optional[str]], List[Tuple[str, Future]]] = {}
+        for text, source_lang, preset, future in batch:
+            if future.set_running_or_notify_cancel():
+                groups.setdefault((source_lang, preset), []).append((text, future))
+
+        # 支持异步批量翻译的后端（如多进程工作池）不阻塞批处理线程，
+        # 多个批次可以同时在不同的推理进程中执行
+        translate_async = getattr(self.translator, "translate_batch_async", None)
+
+        for (source_lang, preset), items in groups.items():
+            texts = [text for text, _ in items]
+            if translate_async is not None:
+                try:
+                    batch_future = translate_async(texts, source_lang, preset, with_steps=True)
+                except Exception as e:
+                    self._resolve(items, error=e)
+                    continue
+                batch_future.add_done_callback(partial(self._resolve_future, items))
+                continue
+            try:
+                results = self.translator.translate_batch(texts, source_lang, preset, with_steps=True)
+            except Exception as e:
+                self._resolve(items, error=e)
+                continue
+            self._resolve(items, results=results)
+
+    def _resolve_future(self, items: List[Tuple[str, Future]], batch_future: Future):
+        """异步批次完成后的回调"""
+        error = batch_future.exception()
+        if error is not None:
+            self._resolve(items, error=error)
+        else:
+            self._resolve(items, results=batch_future.result())
+
+    @staticmethod
+    def _resolve(items: List[Tuple[str, Future]],
+                 results: Optional[Tuple[List[str], List[int]]] = None,
+                 error: Optional[BaseException] = None):
+        """把一个批次的 (译文, 解码步数) 或异常交给各个调用方"""
+        for i, (_, future) in enumerate(items):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result((results[0][i], results[1][i]))
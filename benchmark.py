@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译与词典热路径基准测试
+测量单次调用延迟（p50/p95/p99）、批量吞吐、内存峰值和冷启动耗时，
+结果写成JSON，便于在不同提交之间对比。可完全离线运行：
+桩后端（--backend stub）或本地随机初始化的小型 Marian 模型（--model-dir）。
+
+用法:
+    python benchmark.py run --backend stub --output bench.json
+    python benchmark.py make-tiny-model /tmp/tiny-marian
+    python benchmark.py run --backend pytorch --model-dir /tmp/tiny-marian --output bench.json
+    python benchmark.py compare base.json bench.json --threshold 10
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+# 基准输入：短句、中等长度句子和多句段落
+ZH_SAMPLES = [
+    "你好",
+    "今天天气很好。",
+    "我喜欢学习新的语言，因为它让我了解不同的文化。",
+    "人工智能正在改变我们的生活方式。它不仅提高了工作效率，还带来了新的挑战。我们需要认真思考如何应对。",
+]
+
+EN_SAMPLES = [
+    "Hello",
+    "The weather is nice today.",
+    "I love learning new languages because they help me understand other cultures.",
+    "Artificial intelligence is changing the way we live. It improves productivity, "
+    "but it also brings new challenges. We need to think carefully about how to respond.",
+]
+
+WORD_SAMPLES = ["hello", "world", "computer", "learning", "beautiful", "notaword"]
+
+# 训练小型分词器用的语料
+_TINY_CORPUS = ZH_SAMPLES + EN_SAMPLES + ["我爱学习。", "Hello world, this is a beautiful day!"]
+
+# 冷启动子进程：分别计时 import、初始化和首次调用
+_COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from translator import ChineseEnglishTranslator
+imported = time.perf_counter()
+options = json.loads(sys.argv[1])
+translator = ChineseEnglishTranslator(cache=None, **options)
+initialized = time.perf_counter()
+translator.translate_chinese_to_english("你好")
+first_call = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "init_ms": (initialized - imported) * 1000,
+    "first_call_ms": (first_call - initialized) * 1000,
+    "total_ms": (first_call - start) * 1000,
+}))
+"""
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """延迟分布（毫秒）"""
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(pick(0.50), 4),
+        "p95_ms": round(pick(0.95), 4),
+        "p99_ms": round(pick(0.99), 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+
+def measure_latency(fn: Callable, inputs: Sequence, iterations: int, warmup: int = 3) -> Dict:
+    """轮流用各个输入调用 fn，记录每次调用的耗时"""
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def measure_throughput(translator, texts: Sequence[str], source_lang: str,
+                       batch_sizes: Sequence[int], rounds: int) -> List[Dict]:
+    """不同批次大小下的批量翻译吞吐（句/秒）"""
+    results = []
+    for batch_size in batch_sizes:
+        batch = [texts[i % len(texts)] for i in range(batch_size)]
+        translator.translate_batch(batch, source_lang)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            translator.translate_batch(batch, source_lang)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "source_lang": source_lang,
+            "batch_size": batch_size,
+            "rounds": rounds,
+            "sentences_per_s": round(batch_size * rounds / elapsed, 2),
+            "batch_ms": round(elapsed * 1000 / rounds, 4),
+        })
+    return results
+
+
+def measure_cold_start(options: Dict, runs: int) -> Dict:
+    """在全新的子进程中测量冷启动耗时，取各阶段的中位数"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, HF_HUB_OFFLINE=os.environ.get("HF_HUB_OFFLINE", "1"))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _COLD_START_SCRIPT, json.dumps(options)],
+            cwd=here, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        # 翻译器加载时会打印提示信息，结果在最后一行
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 2)
+        for key in samples[0]
+    }
+
+
+def max_rss_mb() -> float:
+    """当前进程的内存峰值（MB）"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def git_commit() -> Optional[str]:
+    """当前代码所在的提交"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def translator_options(args) -> Dict:
+    """根据命令行参数构造翻译器参数"""
+    # 关闭词典直译，短输入（如“你好”）也要经过模型，冷启动和延迟测到的才是模型耗时
+    options = {"backend": args.backend, "num_threads": args.threads, "dictionary_shortcut": False}
+    if args.model_dir:
+        options["model_names"] = {"zh": args.model_dir, "en": args.model_dir}
+    if args.dictionary:
+        options["dictionary_path"] = args.dictionary
+    return options
+
+
+def run_benchmark(args) -> Dict:
+    """运行全部基准项目"""
+    from translator import ChineseEnglishTranslator
+
+    options = translator_options(args)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "options": options,
+            "iterations": args.iterations,
+        }
+    }
+
+    if args.cold_start_runs:
+        print("测量冷启动...", file=sys.stderr)
+        report["cold_start"] = measure_cold_start(options, args.cold_start_runs)
+
+    # 关闭缓存，否则重复输入测到的只是缓存命中
+    translator = ChineseEnglishTranslator(cache=None, warmup=["zh", "en"], **options)
+
+    print("测量单次调用延迟...", file=sys.stderr)
+    report["latency"] = {
+        "translate_chinese_to_english": measure_latency(
+            translator.translate_chinese_to_english, ZH_SAMPLES, args.iterations),
+        "translate_english_to_chinese": measure_latency(
+            translator.translate_english_to_chinese, EN_SAMPLES, args.iterations),
+        "translate_with_examples": measure_latency(
+            translator.translate_with_examples, ZH_SAMPLES, args.iterations),
+        "get_word_definition": measure_latency(
+            translator.get_word_definition, WORD_SAMPLES, args.iterations * 10),
+    }
+
+    print("测量批量吞吐...", file=sys.stderr)
+    report["throughput"] = (
+        measure_throughput(translator, ZH_SAMPLES, "zh", args.batch_sizes, args.rounds)
+        + measure_throughput(translator, EN_SAMPLES, "en", args.batch_sizes, args.rounds)
+    )
+
+    report["memory"] = {"max_rss_mb": max_rss_mb()}
+    return report
+
+
+def flatten_metrics(report: Dict) -> Dict[str, float]:
+    """把报告展开成 指标名 -> 数值，用于对比"""
+    metrics = {}
+    for name, stats in report.get("latency", {}).items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"latency.{name}.{key}"] = stats[key]
+    for item in report.get("throughput", []):
+        metrics[f"throughput.{item['source_lang']}.bs{item['batch_size']}.sentences_per_s"] = \
+            item["sentences_per_s"]
+    for key, value in report.get("cold_start", {}).items():
+        metrics[f"cold_start.{key}"] = value
+    for key, value in report.get("memory", {}).items():
+        metrics[f"memory.{key}"] = value
+    return metrics
+
+
+def compare_reports(base: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """逐项对比两份报告
+
+    吞吐越高越好，其余指标越低越好；变差超过 threshold 百分比的记为退化。
+    """
+    base_metrics = flatten_metrics(base)
+    current_metrics = flatten_metrics(current)
+    rows = []
+    for name in sorted(base_metrics.keys() & current_metrics.keys()):
+        before, after = base_metrics[name], current_metrics[name]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if name.startswith("throughput.") else change
+        rows.append({
+            "metric": name,
+            "base": before,
+            "current": after,
+            "change_pct": round(change, 2),
+            "regression": worse > threshold,
+        })
+    return rows
+
+
+def make_tiny_model(output_dir: str, seed: int = 0):
+    """生成随机初始化的小型 Marian 翻译模型（含 sentencepiece 分词器），供离线基准使用"""
+    import tempfile
+
+    import sentencepiece as spm
+    import torch
+    from transformers import MarianConfig, MarianMTModel, MarianTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "corpus.txt")
+        with open(corpus, "w", encoding="utf-8") as f:
+            f.write("\n".join(_TINY_CORPUS * 20) + "\n")
+        prefix = os.path.join(tmp, "spm")
+        spm.SentencePieceTrainer.train(
+            input=corpus, model_prefix=prefix, vocab_size=120,
+            character_coverage=1.0, hard_vocab_limit=False,
+            pad_id=2, eos_id=0, unk_id=1, bos_id=-1
+        )
+
+        processor = spm.SentencePieceProcessor(model_file=prefix + ".model")
+        vocab = {processor.id_to_piece(i): i for i in range(processor.get_piece_size())}
+        vocab["<pad>"] = 2
+        vocab_file = os.path.join(tmp, "vocab.json")
+        with open(vocab_file, "w", encoding="utf-8") as f:
+            json.dump(vocab, f, ensure_ascii=False)
+
+        tokenizer = MarianTokenizer(
+            source_spm=prefix + ".model", target_spm=prefix + ".model", vocab=vocab_file
+        )
+        tokenizer.save_pretrained(output_dir)
+
+    config = MarianConfig(
+        vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=128,
+        pad_token_id=2, eos_token_id=0, decoder_start_token_id=2, forced_eos_token_id=0,
+        max_length=32, num_beams=1
+    )
+    torch.manual_seed(seed)
+    MarianMTModel(config).save_pretrained(output_dir)
+    print(f"已生成小型模型: {output_dir}")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="翻译与词典基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行基准测试")
+    run_parser.add_argument("--backend", default="stub", help="推理后端（默认 stub）")
+    run_parser.add_argument("--model-dir", help="本地模型目录，两个翻译方向共用")
+    run_parser.add_argument("--dictionary", help="SQLite 词典文件")
+    run_parser.add_argument("--threads", type=int, help="推理线程数")
+    run_parser.add_argument("--iterations", type=int, default=100, help="每项延迟测试的调用次数")
+    run_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 32],
+                            help="吞吐测试的批次大小")
+    run_parser.add_argument("--rounds", type=int, default=10, help="每个批次大小重复的轮数")
+    run_parser.add_argument("--cold-start-runs", type=int, default=3,
+                            help="冷启动测量次数，0 表示跳过")
+    run_parser.add_argument("--output", help="结果JSON文件，默认输出到标准输出")
+
+    compare_parser = subparsers.add_parser("compare", help="对比两次基准结果")
+    compare_parser.add_argument("base", help="基线结果JSON")
+    compare_parser.add_argument("current", help="当前结果JSON")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="判定为退化的变化百分比")
+
+    tiny_parser = subparsers.add_parser("make-tiny-model", help="生成随机初始化的小型 Marian 模型")
+    tiny_parser.add_argument("output", help="输出目录")
+    tiny_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+
+    args = parser.parse_args()
+
+    if args.command == "make-tiny-model":
+        make_tiny_model(args.output, args.seed)
+
+    elif args.command == "run":
+        # 进度和模型加载提示输出到stderr，stdout只保留JSON报告，便于重定向到文件
+        with contextlib.redirect_stdout(sys.stderr):
+            report = run_benchmark(args)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"结果已写入 {args.output}")
+        else:
+            print(text)
+
+    elif args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+
+        rows = compare_reports(base, current, args.threshold)
+        for row in rows:
+            flag = "  <-- 退化" if row["regression"] else ""
+            print(f"{row['metric']:<70} {row['base']:>12.4f} {row['current']:>12.4f} "
+                  f"{row['change_pct']:>+8.2f}%{flag}")
+        regressions = sum(row["regression"] for row in rows)
+        print(f"共 {len(rows)} 项指标，{regressions} 项退化（阈值 {args.threshold}%）")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑二进制字典格式
+所有字符串去重后存放在同一个字符串池中，词条只保存指向字符串池的偏移；
+文件通过 mmap 只读映射，查询时按字段惰性解码，并为每个词条预先编码好JSON，
+Web 层可以直接发送而不必重建 Python 对象
+
+文件布局（小端序）:
+    文件头 | 词条表（按词头UTF-8字节排序，定长记录） | 列表表 | 哈希表 | 字符串池 | JSON区
+
+用法（离线编译）:
+    python dictionary_store.py build lexicon.jsonl dictionary.bin --format binary
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dictionary_store import ENTRY_FIELDS, LIST_FIELDS
+from lookup_index import DEFAULT_PREFIX_LENGTH
+
+MAGIC = b"DICTBIN1"
+VERSION = 1
+
+# 文件头：魔数、版本、词条数、哈希表槽数，以及各区段的起始偏移
+_HEADER = struct.Struct("<8sIIIQQQQQ")
+# 词条记录：词头 + 各字段 + JSON，每项都是 (偏移, 长度/个数) 两个 uint32；列表字段的偏移指向列表表
+_RECORD = struct.Struct("<" + "II" * (len(ENTRY_FIELDS) + 2))
+# 字符串引用：(偏移, 长度)
+_REF = struct.Struct("<II")
+_SLOT = struct.Struct("<I")
+
+_UINT32_MAX = 0xFFFFFFFF
+
+
+def is_binary_dictionary(path: str) -> bool:
+    """判断文件是否为二进制字典格式"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _hash(word: bytes) -> int:
+    """跨进程稳定的哈希（内置 hash 每次启动随机化，不能写进文件）"""
+    return zlib.crc32(word)
+
+
+class CompactEntry(Mapping):
+    """惰性解码的词条视图
+
+    行为与词条 dict 一致（支持 get / in / 下标 / ** 展开），访问哪个字段才解码哪个字段；
+    to_json() 直接返回文件中预编码的JSON字节。序列化（pickle）时转换为普通 dict。
+    """
+
+    __slots__ = ("_store", "_index", "_decoded")
+
+    def __init__(self, store: "BinaryDictionaryStore", index: int):
+        self._store = store
+        self._index = index
+        self._decoded: Dict[str, object] = {}
+
+    def __getitem__(self, field: str):
+        value = self._decoded.get(field)
+        if value is None:
+            # 与 dict 一致：未知字段抛出 KeyError，get(field, default) 才能返回默认值
+            if field not in ENTRY_FIELDS:
+                raise KeyError(field)
+            value = self._decoded[field] = self._store._decode_field(self._index, field)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ENTRY_FIELDS)
+
+    def __len__(self) -> int:
+        return len(ENTRY_FIELDS)
+
+    def __contains__(self, field) -> bool:
+        return field in ENTRY_FIELDS
+
+    def to_json(self) -> bytes:
+        """预编码的JSON字节"""
+        return self._store._entry_json(self._index)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __repr__(self) -> str:
+        return f"CompactEntry({dict(self)!r})"
+
+
+class BinaryDictionaryStore:
+    """只读的二进制字典存储
+
+    提供与 SQLiteDictionaryStore 相同的 get / get_many / in / len / items / words_with_prefix 接口。
+    精确查询走文件内的开放寻址哈希表，前缀查询在有序词条表上二分查找。
+    mmap 映射的页面由操作系统按需换入并在进程间共享，读取无需加锁。
+    该格式不含模糊查询索引（max_distance 为 0）和中文反向索引（由查找引擎在内存中构建）。
+    """
+
+    max_distance = 0
+    prefix_length = DEFAULT_PREFIX_LENGTH
+
+    def __init__(self, path: str):
+        """以只读方式映射编译好的字典文件"""
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"字典文件不存在: {path}")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self._count, self._capacity, self._entries_offset,
+         self._lists_offset, self._hash_offset, self._pool_offset,
+         self._json_offset) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是二进制字典文件: {path}")
+        if version != VERSION:
+            raise ValueError(f"不支持的二进制字典版本: {version}")
+
+    def _record(self, index: int) -> Tuple[int, ...]:
+        return _RECORD.unpack_from(self._mm, self._entries_offset + index * _RECORD.size)
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._pool_offset + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _word_bytes(self, index: int) -> bytes:
+        offset, length = _REF.unpack_from(self._mm, self._entries_offset + index * _RECORD.size)
+        start = self._pool_offset + offset
+        return self._mm[start:start + length]
+
+    def _find(self, word: str) -> int:
+        """返回词条下标，不存在时返回 -1"""
+        key = word.encode("utf-8")
+        mask = self._capacity - 1
+        slot = _hash(key) & mask
+        while True:
+            value = _SLOT.unpack_from(self._mm, self._hash_offset + slot * _SLOT.size)[0]
+            if value == 0:
+                return -1
+            if self._word_bytes(value - 1) == key:
+                return value - 1
+            slot = (slot + 1) & mask
+
+    def _decode_field(self, index: int, field: str):
+        """解码一个字段"""
+        position = ENTRY_FIELDS.index(field)
+        record = self._record(index)
+        offset, length = record[2 + position * 2], record[3 + position * 2]
+        if field not in LIST_FIELDS:
+            return self._string(offset, length)
+        return [
+            self._string(*_REF.unpack_from(self._mm, self._lists_offset + (offset + i) * _REF.size))
+            for i in range(length)
+        ]
+
+    def _entry_json(self, index: int) -> bytes:
+        offset, length = self._record(index)[-2:]
+        start = self._json_offset + offset
+        return self._mm[start:start + length]
+
+    def get(self, word: str, default=None) -> Optional[CompactEntry]:
+        """查询词条，不存在时返回 default"""
+        index = self._find(word)
+        return CompactEntry(self, index) if index >= 0 else default
+
+    def get_json(self, word: str) -> Optional[bytes]:
+        """词条的预编码JSON，不存在时返回 None"""
+        index = self._find(word)
+        return self._entry_json(index) if index >= 0 else None
+
+    def get_many(self, words: Iterable[str]) -> Dict[str, CompactEntry]:
+        """批量查询词条，不存在的词不出现在结果中"""
+        entries = {}
+        for word in dict.fromkeys(words):
+            index = self._find(word)
+            if index >= 0:
+                entries[word] = CompactEntry(self, index)
+        return entries
+
+    def __contains__(self, word: str) -> bool:
+        return self._find(word) >= 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self) -> Iterator[Tuple[str, CompactEntry]]:
+        """按词头顺序遍历全部词条，词条字段仍按需解码"""
+        for index in range(self._count):
+            yield self._word_bytes(index).decode("utf-8"), CompactEntry(self, index)
+
+    def words_with_prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """按字母序返回以 prefix 开头的词（在有序词条表上二分查找）"""
+        key = prefix.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._word_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        result = []
+        for index in range(low, min(low + limit, self._count)):
+            word = self._word_bytes(index)
+            if not word.startswith(key):
+                break
+            result.append(word.decode("utf-8"))
+        return result
+
+    def fuzzy_candidates(self, query: str) -> Set[str]:
+        """二进制格式不含模糊索引"""
+        return set()
+
+    def close(self):
+        """解除映射"""
+        self._mm.close()
+
+
+class _StringPool:
+    """编译时的去重字符串池"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self._refs: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, value: str) -> Tuple[int, int]:
+        ref = self._refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            ref = self._refs[value] = (len(self.data), len(encoded))
+            self.data += encoded
+        return ref
+
+
+def build_binary_dictionary(records: Iterable[Tuple[str, Dict]], output_path: str) -> int:
+    """把 (词头, 词条) 记录编译为二进制字典文件，返回词条数
+
+    重复的词头以最后一次出现为准。先写入临时文件，完成后再替换目标文件。
+    """
+    entries: Dict[str, Dict] = {}
+    for word, entry in records:
+        entries[word] = entry
+    # 按UTF-8字节排序，与读取时的字节比较一致
+    words = sorted(entries, key=lambda word: word.encode("utf-8"))
+
+    pool = _StringPool()
+    records_data = bytearray()
+    lists_data = bytearray()
+    json_data = bytearray()
+    list_count = 0
+
+    for word in words:
+        entry = entries[word]
+        values = list(pool.add(word))
+        for field in ENTRY_FIELDS:
+            if field in LIST_FIELDS:
+                items = [str(item) for item in entry.get(field) or []]
+                values += [list_count, len(items)]
+                for item in items:
+                    lists_data += _REF.pack(*pool.add(item))
+                list_count += len(items)
+            else:
+                values += list(pool.add(str(entry.get(field) or "")))
+        encoded = json.dumps(
+            {field: entry.get(field) or ([] if field in LIST_FIELDS else "")
+             for field in ENTRY_FIELDS},
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        values += [len(json_data), len(encoded)]
+        json_data += encoded
+        records_data += _RECORD.pack(*values)
+
+    if max(len(pool.data), len(json_data), list_count) > _UINT32_MAX:
+        raise ValueError("字典过大，字符串池或JSON区超过4GB")
+
+    # 开放寻址哈希表，负载因子不超过0.5；槽中保存 词条下标+1，0 表示空槽
+    capacity = 8
+    while capacity < len(words) * 2:
+        capacity *= 2
+    slots = [0] * capacity
+    for index, word in enumerate(words):
+        slot = _hash(word.encode("utf-8")) & (capacity - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (capacity - 1)
+        slots[slot] = index + 1
+    hash_data = struct.pack(f"<{capacity}I", *slots)
+
+    entries_offset = _HEADER.size
+    lists_offset = entries_offset + len(records_data)
+    hash_offset = lists_offset + len(lists_data)
+    pool_offset = hash_offset + len(hash_data)
+    json_offset = pool_offset + len(pool.data)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(words), capacity, entries_offset,
+                             lists_offset, hash_offset, pool_offset, json_offset))
+        for section in (records_data, lists_data, hash_data, pool.data, json_data):
+            f.write(section)
+    os.replace(tmp_path, output_path)
+    return len(words)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大规模文件批量翻译
+从文件或标准输入流式读取纯文本、TSV 或 JSONL，按块分桶批量推理，边翻译边按原顺序写出。
+内存占用只与块大小和并行块数有关，与文件大小无关；定期写检查点，中断后可用 --resume 续跑。
+
+用法:
+    python bulk_translate.py corpus.zh.txt -o corpus.en.txt --source-lang zh --workers 4
+    python bulk_translate.py data.jsonl -o out.jsonl --field text --output-field translation
+    cat data.tsv | python bulk_translate.py - --format tsv --column 1 > out.tsv
+    python bulk_translate.py corpus.zh.txt -o corpus.en.txt --resume
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from segmenter import bucket_by_length
+
+FORMATS = ("text", "tsv", "jsonl")
+
+
+def detect_format(path: str) -> str:
+    """按扩展名推断输入格式，无法判断时按纯文本处理"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".tsv":
+        return "tsv"
+    return "text"
+
+
+class RecordCodec:
+    """按输入格式取出待翻译文本并生成输出行
+
+    text: 每行一条，输出译文；tsv: 翻译第 column 列，输出原行加一列译文；
+    jsonl: 翻译 field 字段，译文写入 output_field 字段。空行原样输出空行，保证行号一一对应。
+    """
+
+    def __init__(self, fmt: str, column: int = 0, field: str = "text",
+                 output_field: str = "translation"):
+        """初始化编解码器"""
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}，可选: {', '.join(FORMATS)}")
+        self.format = fmt
+        self.column = column
+        self.field = field
+        self.output_field = output_field
+
+    def parse(self, line: str, line_number: int):
+        """解析一行，返回 (记录, 待翻译文本)"""
+        if self.format == "text" or not line.strip():
+            return line, line
+        if self.format == "tsv":
+            fields = line.split("\t")
+            return fields, fields[self.column] if self.column < len(fields) else ""
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"第 {line_number} 行不是合法的JSON: {e}") from e
+        text = record.get(self.field, "") if isinstance(record, dict) else ""
+        return record, text if isinstance(text, str) else ""
+
+    def format_output(self, record, translation: str) -> str:
+        """生成一行输出（不含换行符）"""
+        # 译文中的换行和制表符会破坏按行的格式
+        translation = " ".join(translation.split())
+        if self.format == "text":
+            return translation
+        if self.format == "tsv":
+            return "\t".join(record + [translation])
+        if not isinstance(record, dict):
+            return ""
+        record[self.output_field] = translation
+        return json.dumps(record, ensure_ascii=False)
+
+
+def read_lines(stream: TextIO, skip: int = 0) -> Iterator[Tuple[int, str]]:
+    """逐行读取（去掉行尾换行），跳过前 skip 行，返回 (行号, 内容)"""
+    for line_number, line in enumerate(stream, 1):
+        if line_number <= skip:
+            continue
+        yield line_number, line.rstrip("\r\n")
+
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    """读取检查点，不存在时返回 None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: Dict):
+    """原子地写入检查点：先写临时文件再替换"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BulkTranslator:
+    """流式批量翻译
+
+    输入按 chunk_size 行切块，每块按长度分桶后交给翻译引擎；最多 max_in_flight 个块
+    同时在推理，最早的块完成后立即按顺序写出。翻译引擎可以是 ProcessWorkerPool
+    （多进程），也可以是单个翻译器（在后台线程中执行，读写与推理重叠）。
+    """
+
+    def __init__(self, translator, source_lang: str, codec: RecordCodec, workers: int = 1,
+                 chunk_size: int = 256, max_batch_size: int = 32,
+                 max_batch_tokens: int = 8192, max_in_flight: Optional[int] = None):
+        """初始化批量翻译器
+
+        translator: ChineseEnglishTranslator（建议关闭缓存）
+        workers: 推理进程数，大于 1 时使用多进程工作池
+        """
+        self.translator = translator
+        self.source_lang = source_lang
+        self.codec = codec
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_in_flight = max_in_flight or max(2, workers * 2)
+
+        self._pool = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            from worker_pool import ProcessWorkerPool
+            self._pool = ProcessWorkerPool(self.translator, num_workers=self.workers,
+                                           warmup=[self.source_lang])
+        else:
+            self.translator._init_translation_models([self.source_lang])
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-translate")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.close()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def _submit_batch(self, texts: List[str]) -> Future:
+        if self._pool is not None:
+            return self._pool.translate_batch_async(texts, self.source_lang)
+        return self._executor.submit(self.translator.translate_batch, texts, self.source_lang)
+
+    def _submit_chunk(self, texts: List[str]) -> List[Tuple[List[int], Future]]:
+        """按长度分桶提交一个块，返回 (桶内下标, Future) 列表"""
+        buckets = bucket_by_length([len(text) for text in texts], self.max_batch_size,
+                                   self.max_batch_tokens)
+        return [(bucket, self._submit_batch([texts[i] for i in bucket])) for bucket in buckets]
+
+    @staticmethod
+    def _collect_chunk(size: int, pending: List[Tuple[List[int], Future]]) -> List[str]:
+        """等待一个块的所有桶完成，按原顺序返回译文"""
+        translations = [""] * size
+        for bucket, future in pending:
+            for i, translation in zip(bucket, future.result()):
+                translations[i] = translation
+        return translations
+
+    def _chunks(self, lines: Iterator[Tuple[int, str]]) -> Iterator[Tuple[List, List[str]]]:
+        """把输入行切成 (记录列表, 文本列表) 块"""
+        records, texts = [], []
+        for line_number, line in lines:
+            record, text = self.codec.parse(line, line_number)
+            records.append(record)
+            texts.append(text)
+            if len(records) >= self.chunk_size:
+                yield records, texts
+                records, texts = [], []
+        if records:
+            yield records, texts
+
+    def run(self, lines: Iterator[Tuple[int, str]], output: BinaryIO, lines_done: int = 0,
+            bytes_done: int = 0, checkpoint_path: Optional[str] = None,
+            checkpoint_state: Optional[Dict] = None, checkpoint_every: int = 10000) -> Dict:
+        """翻译全部输入并写出，返回处理统计
+
+        每写出 checkpoint_every 行就刷新输出并写检查点，记录已完成的行数和输出字节数。
+        """
+        start = time.perf_counter()
+        in_flight: "deque[Tuple[List, List[Tuple[List[int], Future]]]]" = deque()
+        processed = 0
+        last_checkpoint = lines_done
+
+        def write_oldest():
+            nonlocal lines_done, bytes_done, processed, last_checkpoint
+            records, pending = in_flight.popleft()
+            translations = self._collect_chunk(len(records), pending)
+            data = "".join(
+                self.codec.format_output(record, translation) + "\n"
+                for record, translation in zip(records, translations)
+            ).encode("utf-8")
+            output.write(data)
+            bytes_done += len(data)
+            lines_done += len(records)
+            processed += len(records)
+
+            if checkpoint_path and lines_done - last_checkpoint >= checkpoint_every:
+                output.flush()
+                os.fsync(output.fileno())
+                save_checkpoint(checkpoint_path, dict(checkpoint_state or {}, lines=lines_done,
+                                                      output_bytes=bytes_done))
+                last_checkpoint = lines_done
+                elapsed = time.perf_counter() - start
+                print(f"已完成 {lines_done} 行（{processed / elapsed:.1f} 行/秒）", file=sys.stderr)
+
+        for records, texts in self._chunks(lines):
+            in_flight.append((records, self._submit_chunk(texts)))
+            while len(in_flight) >= self.max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+        output.flush()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "lines": lines_done,
+            "processed": processed,
+            "output_bytes": bytes_done,
+            "seconds": round(elapsed, 3),
+            "lines_per_s": round(processed / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="大规模文件批量翻译")
+    parser.add_argument("input", help="输入文件，- 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出文件，默认标准输出")
+    parser.add_argument("--source-lang", choices=["zh", "en"], default="zh", help="源语言")
+    parser.add_argument("--format", choices=FORMATS, help="输入格式，默认按扩展名推断")
+    parser.add_argument("--column", type=int, default=0, help="TSV 中待翻译的列（从0开始）")
+    parser.add_argument("--field", default="text", help="JSONL 中待翻译的字段")
+    parser.add_argument("--output-field", default="translation", help="JSONL 中写入译文的字段")
+    parser.add_argument("--workers", type=int, default=1, help="推理进程数")
+    parser.add_argument("--chunk-size", type=int, default=256, help="每块行数")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="每批最多句数")
+    parser.add_argument("--checkpoint", help="检查点文件，默认 <输出文件>.checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="每多少行写一次检查点")
+    parser.add_argument("--resume", action="store_true", help="从检查点继续")
+    parser.add_argument("--backend", default="pytorch", help="推理后端")
+    parser.add_argument("--threads", type=int, help="每个推理进程的线程数")
+    parser.add_argument("--model", help="翻译模型名或本地路径，默认按源语言选择")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.input)
+    to_stdout = args.output == "-"
+    checkpoint_path = None if to_stdout else (args.checkpoint or args.output + ".checkpoint")
+    if args.resume and to_stdout:
+        parser.error("--resume 需要用 -o 指定输出文件")
+
+    checkpoint_state = {"input": os.path.abspath(args.input) if args.input != "-" else "-",
+                        "format": fmt, "source_lang": args.source_lang}
+    lines_done = bytes_done = 0
+    checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    if checkpoint and not args.resume:
+        parser.error(f"发现检查点 {checkpoint_path}，使用 --resume 继续或先删除检查点")
+    if args.resume and checkpoint:
+        for key, value in checkpoint_state.items():
+            if checkpoint.get(key) != value:
+                parser.error(f"检查点的 {key} 与本次参数不一致: {checkpoint.get(key)} != {value}")
+        lines_done, bytes_done = checkpoint["lines"], checkpoint["output_bytes"]
+        print(f"从检查点继续：跳过已完成的 {lines_done} 行", file=sys.stderr)
+
+    if to_stdout:
+        output = sys.stdout.buffer
+    elif lines_done:
+        # 丢弃检查点之后写出的不完整内容
+        output = open(args.output, "r+b")
+        output.truncate(bytes_done)
+        output.seek(bytes_done)
+    else:
+        output = open(args.output, "wb")
+
+    if args.input == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    else:
+        stream = open(args.input, encoding="utf-8")
+
+    # 模型加载等提示信息打印到标准错误，避免混入标准输出中的译文
+    with contextlib.redirect_stdout(sys.stderr), stream, output:
+        from translator import ChineseEnglishTranslator
+
+        model_names = {args.source_lang: args.model} if args.model else None
+        translator = ChineseEnglishTranslator(cache=None, model_names=model_names,
+                                              backend=args.backend, num_threads=args.threads)
+        codec = RecordCodec(fmt, column=args.column, field=args.field,
+                            output_field=args.output_field)
+        with BulkTranslator(translator, args.source_lang, codec, workers=args.workers,
+                            chunk_size=args.chunk_size,
+                            max_batch_size=args.max_batch_size) as bulk:
+            stats = bulk.run(read_lines(stream, skip=lines_done), output,
+                             lines_done=lines_done, bytes_done=bytes_done,
+                             checkpoint_path=checkpoint_path, checkpoint_state=checkpoint_state,
+                             checkpoint_every=args.checkpoint_every)
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"完成：共 {stats['lines']} 行，本次处理 {stats['processed']} 行，"
+          f"耗时 {stats['seconds']} 秒（{stats['lines_per_s']} 行/秒）", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
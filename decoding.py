@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解码策略预设
+在延迟和译文质量之间取舍：fast 贪心解码、balanced 小束宽、quality 大束宽加长度惩罚；
+max_new_tokens 按输入长度设上限，避免短输入生成失控拖慢整批
+"""
+
+from typing import Dict, Optional, Sequence
+
+# 预设参数：num_beams 等直接传给 generate；max_new_tokens 为上限，length_ratio 为输出/输入长度比
+DECODING_PRESETS = {
+    "fast": {"num_beams": 1, "do_sample": False, "max_new_tokens": 128, "length_ratio": 1.5},
+    "balanced": {"num_beams": 2, "do_sample": False, "max_new_tokens": 256, "length_ratio": 2.0},
+    "quality": {"num_beams": 5, "do_sample": False, "length_penalty": 1.2,
+                "early_stopping": True, "max_new_tokens": 512, "length_ratio": 3.0},
+}
+
+# 按输入长度估算的上限之外额外留出的token数，保证极短输入也能完整输出
+MAX_NEW_TOKENS_MARGIN = 8
+
+
+def validate_preset(preset: Optional[str]) -> Optional[str]:
+    """检查预设名，None 表示使用模型自带的生成配置"""
+    if preset is not None and preset not in DECODING_PRESETS:
+        raise ValueError(f"未知的解码预设: {preset}，可选: {', '.join(DECODING_PRESETS)}")
+    return preset
+
+
+def generation_kwargs(preset: str, input_lengths: Sequence[int]) -> Dict:
+    """预设对应的 generate 参数，max_new_tokens 取 min(预设上限, 最长输入×长度比+余量)"""
+    config = DECODING_PRESETS[validate_preset(preset)]
+    longest = max(input_lengths, default=0)
+    kwargs = {key: value for key, value in config.items()
+              if key not in ("max_new_tokens", "length_ratio")}
+    kwargs["max_new_tokens"] = min(
+        config["max_new_tokens"], int(longest * config["length_ratio"]) + MAX_NEW_TOKENS_MARGIN
+    )
+    return kwargs
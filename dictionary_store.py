@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部字典存储
+把JSON Lines或CSV格式的词典数据离线编译成SQLite索引文件，运行时按需查询，
+启动时不解析原始数据，内存占用不随词条数增长
+
+用法（离线编译）:
+    python dictionary_store.py build lexicon.jsonl dictionary.db
+    python dictionary_store.py build lexicon.csv dictionary.db
+    python dictionary_store.py build lexicon.jsonl dictionary.bin --format binary
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from lookup_index import DEFAULT_MAX_DISTANCE, DEFAULT_PREFIX_LENGTH, generate_deletes
+from reverse_index import NGRAM_SIZE, index_keys, query_keys, split_glosses
+
+# 词条字段，与内置字典的结构一致
+ENTRY_FIELDS = ("pronunciation", "definitions", "examples", "chinese")
+
+# 列表字段在CSV中用竖线分隔
+LIST_FIELDS = ("definitions", "examples")
+CSV_LIST_SEPARATOR = "|"
+
+# 每批写入的词条数
+BUILD_BATCH_SIZE = 10000
+
+# 批量查询时每条SQL的参数个数上限（低于SQLite默认的999）
+QUERY_BATCH_SIZE = 500
+
+
+class SQLiteDictionaryStore:
+    """只读的SQLite字典存储
+
+    提供与 dict 相同的 get / in / len / items 接口，可以直接替换内置字典。
+    词条以JSON文本存储，查询时才反序列化。同时提供基于主键有序索引的
+    前缀查询、编译时生成的SymSpell删除变体表上的模糊候选查询，
+    以及中文释义反向索引表上的中文候选查询。
+    """
+
+    def __init__(self, path: str):
+        """以只读方式打开编译好的字典文件"""
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"字典文件不存在: {path}")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        # 旧版本编译的文件没有模糊索引，max_distance 为 0 表示不支持模糊查询
+        self.max_distance = int(meta.get("fuzzy_max_distance", 0))
+        self.prefix_length = int(meta.get("fuzzy_prefix_length", DEFAULT_PREFIX_LENGTH))
+        # 旧版本编译的文件没有反向索引表，由查找引擎在内存中构建
+        reverse_index = int(meta.get("reverse_index", 0))
+        self.has_reverse_index = reverse_index >= 1
+        # 版本1的反向索引没有单字倒排表，单字查询退化为扫描释义表
+        self._unigram_postings = reverse_index >= 2
+
+    def get(self, word: str, default=None) -> Optional[Dict]:
+        """查询词条，不存在时返回 default"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM entries WHERE word = ?", (word,)
+            ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def get_many(self, words: Iterable[str]) -> Dict[str, Dict]:
+        """批量查询词条，返回 词 -> 词条，不存在的词不出现在结果中"""
+        words = list(dict.fromkeys(words))
+        entries = {}
+        with self._lock:
+            for start in range(0, len(words), QUERY_BATCH_SIZE):
+                chunk = words[start:start + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT word, data FROM entries WHERE word IN ({placeholders})", chunk
+                ).fetchall()
+                for word, data in rows:
+                    entries[word] = data
+        return {word: json.loads(data) for word, data in entries.items()}
+
+    def get_json(self, word: str) -> Optional[bytes]:
+        """词条的JSON文本（库中原样存储），不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM entries WHERE word = ?", (word,)
+            ).fetchone()
+        return row[0].encode("utf-8") if row is not None else None
+
+    def __contains__(self, word: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entries WHERE word = ?", (word,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        # 词条数在编译时写入 meta 表，避免启动时全表扫描
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'entry_count'"
+            ).fetchone()
+        return int(row[0])
+
+    def words_with_prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """按字母序返回以 prefix 开头的词（主键范围扫描）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT word FROM entries WHERE word >= ? AND word < ? ORDER BY word LIMIT ?",
+                (prefix, prefix + "\uffff", limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def fuzzy_candidates(self, query: str) -> Set[str]:
+        """返回与查询共享删除变体的候选词（尚未校验编辑距离）"""
+        if not self.max_distance:
+            return set()
+        variants = list(generate_deletes(query, self.max_distance, self.prefix_length))
+        placeholders = ",".join("?" * len(variants))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT word FROM deletes WHERE variant IN ({placeholders})", variants
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def chinese_candidates(self, term: str) -> List[Tuple[str, str, int]]:
+        """返回释义等于或可能包含 term 的 (词头, 释义, 释义序号)，由 rank_hits 校验"""
+        keys = sorted(query_keys(term))
+        query = "SELECT word, gloss, position FROM glosses WHERE gloss = ?"
+        params = [term]
+        if len(term) < NGRAM_SIZE and not self._unigram_postings:
+            query += " OR instr(gloss, ?) > 0"
+            params.append(term)
+        elif keys:
+            # 包含查询的释义必然包含查询的每个 n-gram（单字查询为该字）
+            shared = " INTERSECT ".join(["SELECT gloss FROM gloss_ngrams WHERE ngram = ?"] * len(keys))
+            query += f" OR gloss IN ({shared})"
+            params += keys
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """按词头顺序遍历全部词条（分批读取，每批之间释放锁）"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT word, data FROM entries WHERE word > ? ORDER BY word LIMIT ?",
+                    (last, BUILD_BATCH_SIZE)
+                ).fetchall()
+            if not rows:
+                return
+            for word, data in rows:
+                yield word, json.loads(data)
+            last = rows[-1][0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def open_dictionary(path: str):
+    """按文件格式打开编译好的字典：二进制格式或SQLite"""
+    from binary_store import BinaryDictionaryStore, is_binary_dictionary
+
+    if os.path.isfile(path) and is_binary_dictionary(path):
+        return BinaryDictionaryStore(path)
+    return SQLiteDictionaryStore(path)
+
+
+def _normalize_entry(record: Dict) -> Tuple[str, Dict]:
+    """把一条原始记录整理成 (词头, 词条)"""
+    word = str(record.get("word", "")).lower().strip()
+    entry = {}
+    for field in ENTRY_FIELDS:
+        value = record.get(field)
+        if field in LIST_FIELDS:
+            if isinstance(value, str):
+                value = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+            entry[field] = list(value or [])
+        else:
+            entry[field] = value or ""
+    return word, entry
+
+
+def iter_records(input_path: str) -> Iterator[Tuple[str, Dict]]:
+    """流式读取JSON Lines或CSV词典数据"""
+    is_csv = input_path.lower().endswith(".csv")
+    with open(input_path, "r", encoding="utf-8", newline="") as f:
+        rows: Iterable[Dict] = csv.DictReader(f) if is_csv else (
+            json.loads(line) for line in f if line.strip()
+        )
+        for record in rows:
+            word, entry = _normalize_entry(record)
+            if word:
+                yield word, entry
+
+
+def build_dictionary(input_path: str, output_path: str,
+                     max_distance: int = DEFAULT_MAX_DISTANCE,
+                     prefix_length: int = DEFAULT_PREFIX_LENGTH) -> int:
+    """把原始词典数据编译为SQLite索引文件，返回词条数
+
+    重复的词头以最后一次出现为准。同时生成中文释义反向索引表；max_distance 大于 0 时
+    还会生成模糊查询用的删除变体表。先写入临时文件，完成后再替换目标文件，避免编译中途失败留下损坏的字典。
+    """
+    tmp_path = output_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE entries (word TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        batch = []
+        for word, entry in iter_records(input_path):
+            batch.append((word, json.dumps(entry, ensure_ascii=False)))
+            if len(batch) >= BUILD_BATCH_SIZE:
+                conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?)", batch)
+                batch = []
+        if batch:
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?)", batch)
+
+        count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        conn.execute("INSERT INTO meta VALUES ('entry_count', ?)", (str(count),))
+        
+        _build_reverse_index(conn)
+        if max_distance > 0:
+            _build_fuzzy_index(conn, max_distance, prefix_length)
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, output_path)
+    return count
+
+
+def _build_reverse_index(conn: sqlite3.Connection):
+    """生成中文释义反向索引：释义 -> 词头，以及释义的 n-gram 和单字 -> 释义"""
+    conn.execute(
+        "CREATE TABLE glosses (gloss TEXT NOT NULL, word TEXT NOT NULL, position INTEGER NOT NULL, "
+        "PRIMARY KEY (gloss, word)) WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE TABLE gloss_ngrams (ngram TEXT NOT NULL, gloss TEXT NOT NULL, "
+        "PRIMARY KEY (ngram, gloss)) WITHOUT ROWID"
+    )
+    gloss_batch = []
+    ngram_batch = []
+    for word, data in conn.execute("SELECT word, data FROM entries").fetchall():
+        for position, gloss in enumerate(split_glosses(json.loads(data).get("chinese", ""))):
+            gloss_batch.append((gloss, word, position))
+            ngram_batch.extend((key, gloss) for key in index_keys(gloss))
+        if len(gloss_batch) >= BUILD_BATCH_SIZE:
+            conn.executemany("INSERT OR IGNORE INTO glosses VALUES (?, ?, ?)", gloss_batch)
+            conn.executemany("INSERT OR IGNORE INTO gloss_ngrams VALUES (?, ?)", ngram_batch)
+            gloss_batch, ngram_batch = [], []
+    conn.executemany("INSERT OR IGNORE INTO glosses VALUES (?, ?, ?)", gloss_batch)
+    conn.executemany("INSERT OR IGNORE INTO gloss_ngrams VALUES (?, ?)", ngram_batch)
+    
+    # 版本2：倒排表中包含单字
+    conn.execute("INSERT INTO meta VALUES ('reverse_index', '2')")
+
+
+def _build_fuzzy_index(conn: sqlite3.Connection, max_distance: int, prefix_length: int):
+    """生成SymSpell删除变体表：变体 -> 词头"""
+    conn.execute(
+        "CREATE TABLE deletes (variant TEXT NOT NULL, word TEXT NOT NULL, "
+        "PRIMARY KEY (variant, word)) WITHOUT ROWID"
+    )
+    batch = []
+    for (word,) in conn.execute("SELECT word FROM entries").fetchall():
+        for variant in generate_deletes(word, max_distance, prefix_length):
+            batch.append((variant, word))
+        if len(batch) >= BUILD_BATCH_SIZE:
+            conn.executemany("INSERT OR IGNORE INTO deletes VALUES (?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT OR IGNORE INTO deletes VALUES (?, ?)", batch)
+    
+    conn.execute("INSERT INTO meta VALUES ('fuzzy_max_distance', ?)", (str(max_distance),))
+    conn.execute("INSERT INTO meta VALUES ('fuzzy_prefix_length', ?)", (str(prefix_length),))
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="字典数据离线编译工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="把JSON Lines/CSV词典编译为SQLite索引")
+    build_parser.add_argument("input", help="原始词典文件（.jsonl 或 .csv）")
+    build_parser.add_argument("output", help="输出的字典文件")
+    build_parser.add_argument("--format", choices=["sqlite", "binary"], default="sqlite",
+                              help="sqlite（支持模糊查询）或 binary（紧凑的mmap格式，不含模糊索引）")
+    build_parser.add_argument("--fuzzy-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+                              help="模糊查询的最大编辑距离，0 表示不生成模糊索引")
+    build_parser.add_argument("--fuzzy-prefix", type=int, default=DEFAULT_PREFIX_LENGTH,
+                              help="模糊索引只对词的前若干个字符生成删除变体")
+
+    args = parser.parse_args()
+
+    if args.command == "build" and args.format == "binary":
+        from binary_store import build_binary_dictionary
+
+        count = build_binary_dictionary(iter_records(args.input), args.output)
+        print(f"已编译 {count} 个词条到 {args.output}")
+    elif args.command == "build":
+        count = build_dictionary(args.input, args.output, args.fuzzy_distance, args.fuzzy_prefix)
+        print(f"已编译 {count} 个词条到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
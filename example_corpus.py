@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+例句语料库检索
+把中英双语句对离线编译成SQLite文件，其中包含带词位置的倒排索引；
+运行时查询“包含单词 X（或短语 X Y）的例句”，只读取排名最前的若干条倒排记录
+
+编译时句子按排名（句子越短、在语料中重复出现越多越靠前）编号，倒排表的主键是
+(词, 句子编号)，所以单词查询就是一次主键范围扫描的前 k 行，耗时与语料规模基本无关
+
+用法（离线编译）:
+    python example_corpus.py build pairs.tsv examples.db      # 每行: 英文<Tab>中文
+    python example_corpus.py build pairs.jsonl examples.db    # 每行: {"en": ..., "zh": ...}
+    python example_corpus.py search examples.db "make sure"
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# 英文词（小写，允许 don't 这类缩写），位置按词序从0开始
+_TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# 每批写入的记录数
+BUILD_BATCH_SIZE = 10000
+
+# 例句长度超过这个词数时不编入索引
+MAX_SENTENCE_TOKENS = 64
+
+# 短语查询最多检查的候选句子数（最罕见的词的倒排记录数），保证查询耗时有上限
+MAX_PHRASE_CANDIDATES = 2000
+PHRASE_FIRST_CHUNK = 16
+PHRASE_MAX_CHUNK = 512
+
+
+def tokenize(text: str) -> List[str]:
+    """把英文文本切成小写词序列（保留重复，用于记录位置）"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def sentence_cost(length: int, frequency: int) -> float:
+    """排名代价：句子越短、重复出现次数越多代价越低"""
+    return length / (1.0 + math.log(frequency))
+
+
+def iter_pairs(input_path: str) -> Iterator[Tuple[str, str]]:
+    """流式读取TSV或JSON Lines格式的句对"""
+    is_jsonl = input_path.lower().endswith((".jsonl", ".json"))
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if is_jsonl:
+                record = json.loads(line)
+                english, chinese = record.get("en", ""), record.get("zh", "")
+            else:
+                english, _, chinese = line.partition("\t")
+            english, chinese = english.strip(), chinese.strip()
+            if english:
+                yield english, chinese
+
+
+def build_corpus(pairs: Iterable[Tuple[str, str]], output_path: str) -> int:
+    """把句对编译为例句索引文件，返回去重后的句子数
+
+    相同的句对合并为一条并记录出现次数；句子按排名代价编号后写入，
+    倒排表记录每个词在句子中的全部位置。先写入临时文件，完成后再替换目标文件。
+    """
+    tmp_path = output_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TEMP TABLE raw (en TEXT NOT NULL, zh TEXT NOT NULL)")
+        batch = []
+        for pair in pairs:
+            batch.append(pair)
+            if len(batch) >= BUILD_BATCH_SIZE:
+                conn.executemany("INSERT INTO raw VALUES (?, ?)", batch)
+                batch = []
+        conn.executemany("INSERT INTO raw VALUES (?, ?)", batch)
+
+        # 去重并计算排名代价
+        conn.execute("CREATE TEMP TABLE ranked (en TEXT, zh TEXT, length INTEGER, "
+                     "frequency INTEGER, cost REAL)")
+        batch = []
+        for english, chinese, frequency in conn.execute(
+                "SELECT en, zh, COUNT(*) FROM raw GROUP BY en, zh"):
+            length = len(tokenize(english))
+            if 0 < length <= MAX_SENTENCE_TOKENS:
+                batch.append((english, chinese, length, frequency, sentence_cost(length, frequency)))
+            if len(batch) >= BUILD_BATCH_SIZE:
+                conn.executemany("INSERT INTO ranked VALUES (?, ?, ?, ?, ?)", batch)
+                batch = []
+        conn.executemany("INSERT INTO ranked VALUES (?, ?, ?, ?, ?)", batch)
+        conn.execute("DROP TABLE raw")
+
+        # 句子编号即排名
+        conn.execute("CREATE TABLE sentences (id INTEGER PRIMARY KEY, en TEXT NOT NULL, "
+                     "zh TEXT NOT NULL, length INTEGER NOT NULL, frequency INTEGER NOT NULL)")
+        conn.execute("INSERT INTO sentences (en, zh, length, frequency) "
+                     "SELECT en, zh, length, frequency FROM ranked ORDER BY cost, length, en")
+        conn.execute("DROP TABLE ranked")
+
+        conn.execute("CREATE TABLE postings (term TEXT NOT NULL, sentence_id INTEGER NOT NULL, "
+                     "positions BLOB NOT NULL, PRIMARY KEY (term, sentence_id)) WITHOUT ROWID")
+        document_frequency: Dict[str, int] = {}
+        batch = []
+        for sentence_id, english in conn.execute("SELECT id, en FROM sentences"):
+            positions: Dict[str, array] = {}
+            for position, term in enumerate(tokenize(english)):
+                positions.setdefault(term, array("H")).append(position)
+            for term, term_positions in positions.items():
+                batch.append((term, sentence_id, term_positions.tobytes()))
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+            if len(batch) >= BUILD_BATCH_SIZE:
+                conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", batch)
+                batch = []
+        conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", batch)
+
+        conn.execute("CREATE TABLE terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        conn.executemany("INSERT INTO terms VALUES (?, ?)", document_frequency.items())
+
+        count = conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT INTO meta VALUES ('sentence_count', ?)", (str(count),))
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, output_path)
+    return count
+
+
+def _phrase_matches(positions: List[array]) -> bool:
+    """各词的位置列表中是否存在连续出现（第 i 个词位于起点 + i）"""
+    rest = [set(term_positions) for term_positions in positions[1:]]
+    return any(
+        all(start + offset + 1 in term_positions for offset, term_positions in enumerate(rest))
+        for start in positions[0]
+    )
+
+
+class ExampleCorpus:
+    """只读的例句语料库
+
+    search(query) 返回包含该词或短语的例句，按编译时的排名排序，
+    每项包含 en、zh、length（词数）和 frequency（句对在原始语料中出现的次数）。
+    """
+
+    def __init__(self, path: str):
+        """以只读方式打开编译好的例句索引文件"""
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"例句索引文件不存在: {path}")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self._count = int(meta["sentence_count"])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _sentences(self, ids: List[int]) -> List[Dict]:
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            f"SELECT id, en, zh, length, frequency FROM sentences WHERE id IN ({placeholders})", ids
+        ).fetchall()
+        by_id = {row[0]: row for row in rows}
+        return [
+            {"en": by_id[i][1], "zh": by_id[i][2], "length": by_id[i][3], "frequency": by_id[i][4]}
+            for i in ids if i in by_id
+        ]
+
+    def _search_term(self, term: str, limit: int) -> List[int]:
+        rows = self._conn.execute(
+            "SELECT sentence_id FROM postings WHERE term = ? ORDER BY sentence_id LIMIT ?",
+            (term, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _search_phrase(self, terms: List[str], limit: int) -> List[int]:
+        """短语查询：按最罕见的词的倒排记录顺序取候选句子，再用位置校验是否连续出现
+
+        其他词的倒排记录通过主键连接取出（SQLite 内部逐行按主键查找），所有词都出现的句子
+        再校验位置；候选按批读取，批大小从小到大翻倍。最多检查 MAX_PHRASE_CANDIDATES 条候选，
+        由常见词组成的罕见短语可能返回不足 limit 条。
+        """
+        unique_terms = list(dict.fromkeys(terms))
+        placeholders = ",".join("?" * len(unique_terms))
+        frequencies = dict(self._conn.execute(
+            f"SELECT term, df FROM terms WHERE term IN ({placeholders})", unique_terms
+        ).fetchall())
+        if len(frequencies) < len(unique_terms):
+            return []
+        anchor = min(frequencies, key=frequencies.get)
+        others = [term for term in unique_terms if term != anchor]
+
+        # 短语由同一个词重复组成（如 "very very"）时没有其他词，只校验锚点词自己的位置
+        columns = "".join(f", p{i}.positions" for i in range(len(others)))
+        # LEFT JOIN 让 SQLite 固定以最罕见的词为外层循环，且每条候选都返回一行，便于限制扫描量
+        joins = " ".join(
+            f"LEFT JOIN postings p{i} ON p{i}.term = ? AND p{i}.sentence_id = a.sentence_id"
+            for i in range(len(others))
+        )
+        query = (f"SELECT a.sentence_id, a.positions{columns} FROM postings a {joins} "
+                 f"WHERE a.term = ? AND a.sentence_id > ? ORDER BY a.sentence_id LIMIT ?")
+        order = [anchor] + others
+
+        matches: List[int] = []
+        last_id = 0
+        scanned = 0
+        chunk_size = PHRASE_FIRST_CHUNK
+        while len(matches) < limit and scanned < MAX_PHRASE_CANDIDATES:
+            rows = self._conn.execute(query, others + [anchor, last_id, chunk_size]).fetchall()
+            if not rows:
+                break
+            scanned += len(rows)
+            last_id = rows[-1][0]
+            chunk_size = min(chunk_size * 2, PHRASE_MAX_CHUNK)
+            for sentence_id, *blobs in rows:
+                if not all(blobs):
+                    continue
+                positions = dict(zip(order, blobs))
+                if _phrase_matches([array("H", positions[term]) for term in terms]):
+                    matches.append(sentence_id)
+                    if len(matches) >= limit:
+                        break
+        return matches
+
+    def search(self, query: str, limit: int = 3) -> List[Dict]:
+        """查询包含单词或短语（按词序连续出现）的例句"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            if len(terms) == 1:
+                ids = self._search_term(terms[0], limit)
+            else:
+                ids = self._search_phrase(terms, limit)
+            return self._sentences(ids)
+
+    def search_many(self, queries: Iterable[str], limit: int = 3) -> Dict[str, List[Dict]]:
+        """批量查询，没有例句的查询不出现在结果中"""
+        results = {}
+        for query in dict.fromkeys(queries):
+            examples = self.search(query, limit)
+            if examples:
+                results[query] = examples
+        return results
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="例句语料库编译与查询工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="把双语句对编译为例句索引")
+    build_parser.add_argument("input", help="句对文件（.tsv：英文<Tab>中文；.jsonl：{\"en\", \"zh\"}）")
+    build_parser.add_argument("output", help="输出的例句索引文件")
+
+    search_parser = subparsers.add_parser("search", help="查询例句")
+    search_parser.add_argument("corpus", help="例句索引文件")
+    search_parser.add_argument("query", help="单词或短语")
+    search_parser.add_argument("--limit", type=int, default=5, help="返回的例句数")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_corpus(iter_pairs(args.input), args.output)
+        print(f"已编译 {count} 条例句到 {args.output}（{time.perf_counter() - start:.1f}秒）")
+    else:
+        corpus = ExampleCorpus(args.corpus)
+        start = time.perf_counter()
+        examples = corpus.search(args.query, args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for example in examples:
+            print(f"{example['en']}\n    {example['zh']}")
+        print(f"共 {len(examples)} 条，耗时 {elapsed_ms:.3f} 毫秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只读接口的HTTP缓存
+按响应内容计算ETag，支持 If-None-Match 条件请求（304）和 gzip/brotli 压缩；
+热点响应的JSON字节、ETag和压缩结果保存在LRU中，重复请求不再进入查词代码
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 小于这个字节数的响应不压缩（压缩头部的开销抵消收益）
+COMPRESS_MIN_BYTES = 512
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def compute_etag(body: bytes) -> str:
+    """内容哈希ETag（强校验）"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def supported_encodings():
+    """当前环境支持的压缩编码，按优先级排列"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """按 Accept-Encoding 选择压缩编码，优先 brotli；q=0 的编码视为不接受"""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，忽略 W/ 前缀和压缩后缀）"""
+    if not if_none_match:
+        return False
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"').split("-", 1)[0] == base:
+            return True
+    return False
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class PreparedResponse:
+    """预先序列化好的响应：原始字节、ETag，各压缩编码的结果在第一次用到时生成并保留"""
+
+    __slots__ = ("body", "etag", "mimetype", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, mimetype: str = "application/json"):
+        self.body = body
+        self.etag = compute_etag(body)
+        self.mimetype = mimetype
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        """指定编码压缩后的字节"""
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding)
+            with self._lock:
+                self._encoded[encoding] = data
+        return data
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """压缩后的表示使用带编码后缀的ETag，与未压缩的表示区分"""
+        if encoding is None:
+            return self.etag
+        return self.etag[:-1] + "-" + encoding + '"'
+
+
+class HotResponseCache:
+    """热点响应LRU，键通常为请求路径加查询参数"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PreparedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[PreparedResponse]:
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return prepared
+
+    def put(self, key: str, prepared: PreparedResponse):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = prepared
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "encodings": list(supported_encodings())
+            }
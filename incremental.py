@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量翻译
+实时翻译场景下用户每次编辑都会提交整段文本；按句切分后，与上一次请求相同的句子
+直接复用上一次的译文，只有新增或修改过的句子才进入模型
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from language import resolve_language
+from segmenter import bucket_by_length, join_translations, split_long_sentence, split_sentences
+
+
+class IncrementalTranslator:
+    """按句复用译文的增量翻译
+
+    每次请求返回一个会话 id，并在会话表中保存本次各句的译文；下一次请求带上这个 id 时，
+    文本中未变化的句子直接复用，只把变化的句子一起交给 translate_batch，会话更新为最新的
+    译文并沿用同一个 id。会话在过期（超过 ttl_seconds 未使用）、被 close() 关闭或按最近使用
+    被淘汰（最多 max_sessions 个）之前可以反复使用。
+    """
+
+    def __init__(self, translate_batch: Callable[[List[str], str], List[str]],
+                 max_sessions: int = 1000, ttl_seconds: float = 600.0,
+                 max_sentence_chars: int = 300, max_batch_size: int = 16):
+        """初始化增量翻译器
+
+        translate_batch: 批量翻译函数 (文本列表, 源语言) -> 译文列表
+        """
+        self.translate_batch = translate_batch
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_sentence_chars = max_sentence_chars
+        self.max_batch_size = max_batch_size
+
+        # id -> (源语言, 句子 -> 译文, 最后使用时间)
+        self._sessions: "OrderedDict[str, Tuple[str, Dict[str, str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "chained": 0,
+            "segments_reused": 0,
+            "segments_translated": 0,
+            "evictions": 0
+        }
+
+    def _get_session(self, session_id: Optional[str], source_lang: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """查找会话，返回 (会话 id, 上一次的译文表)；会话不存在、已过期或源语言不同时 id 为 None"""
+        if not session_id:
+            return None, {}
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None, {}
+            lang, translations, last_used = session
+            if time.monotonic() - last_used > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None, {}
+        if lang != source_lang:
+            return None, {}
+        return session_id, translations
+
+    def _save_session(self, session_id: Optional[str], source_lang: str,
+                      translations: Dict[str, str]) -> str:
+        """保存（或更新已有会话的）译文表，返回会话 id"""
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (source_lang, translations, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evictions"] += 1
+        return session_id
+
+    def close(self, session_id: str) -> bool:
+        """关闭会话，返回会话是否存在"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def translate(self, text: str, source_lang: str = "zh",
+                  previous_id: Optional[str] = None) -> Dict:
+        """增量翻译整段文本
+
+        返回会话 id（下次请求作为 previous_id 传入，会话有效时与 previous_id 相同）、译文、实际使用的源语言（source_lang="auto"
+        时按全文主语言检测），以及复用和重新翻译的片段数。
+        """
+        source_lang = resolve_language(text, source_lang)
+        target_lang = "en" if source_lang == "zh" else "zh"
+        piece_joiner = " " if target_lang == "en" else ""
+        start = time.perf_counter()
+
+        session_id, known = self._get_session(previous_id, source_lang)
+
+        segments = split_sentences(text, source_lang)
+        sentence_pieces = [split_long_sentence(sentence, self.max_sentence_chars)
+                           for sentence, _ in segments]
+        pieces = [piece for parts in sentence_pieces for piece in parts]
+
+        # 只翻译上次没有出现过的片段（同一请求内重复的片段也只翻译一次）；
+        # 变化的片段按长度分桶，每桶作为一批交给 translate_batch
+        missing = [piece for piece in dict.fromkeys(pieces) if piece not in known]
+        translations = {piece: known[piece] for piece in pieces if piece in known}
+        for bucket in bucket_by_length([len(piece) for piece in missing], self.max_batch_size):
+            batch = [missing[i] for i in bucket]
+            translations.update(zip(batch, self.translate_batch(batch, source_lang)))
+
+        translation = join_translations(
+            [piece_joiner.join(translations[piece] for piece in parts) for parts in sentence_pieces],
+            [sep for _, sep in segments],
+            target_lang
+        )
+        session_id = self._save_session(session_id, source_lang, translations)
+
+        reused = sum(1 for piece in pieces if piece in known)
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["chained"] += 1 if known else 0
+            self._stats["segments_reused"] += reused
+            self._stats["segments_translated"] += len(missing)
+
+        return {
+            "id": session_id,
+            "source_lang": source_lang,
+            "translation": translation,
+            "sentences": len(segments),
+            "segments": len(pieces),
+            "reused": reused,
+            "translated": len(missing),
+            "total_ms": (time.perf_counter() - start) * 1000
+        }
+
+    def stats(self) -> Dict:
+        """会话数、复用率等统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._sessions)
+        total = stats["segments_reused"] + stats["segments_translated"]
+        stats["reuse_rate"] = stats["segments_reused"] / total if total else 0.0
+        return stats
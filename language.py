@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中英文语言检测与分段路由
+一次扫描把文本切成汉字段和拉丁字母段，按字符量判断主语言；
+source_lang="auto" 时只把源语言片段送入对应模型，较长的目标语言片段原样保留
+（嵌在句子中的短片段如“我用iPhone拍照”随整句翻译），多条文本的同语言片段合并成一批翻译后再按原顺序拼回
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 汉字（含扩展A区和兼容区）与拉丁字母，预编译后每条文本只扫描一次
+_SCRIPT_PATTERN = re.compile(r"([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)|([A-Za-z]+)")
+# 跟在汉字后面的全角标点归入中文片段
+_CJK_PUNCTUATION = re.compile(r"[\u3000-\u303f\uff00-\uffef]*")
+
+# 一个英文单词大致相当于的汉字数（中文平均词长）
+HAN_PER_WORD = 1.5
+
+# 另一种语言的片段不超过这个字符量（英文按单词数折算成汉字数）时视为所在句子的一部分，不单独切分
+EMBEDDED_RUN_MAX = 6.0
+
+SOURCE_LANGS = ("zh", "en", "auto")
+
+
+def _scan(text: str) -> Tuple[List[Tuple[str, Optional[str]]], Dict[str, float]]:
+    """一次扫描得到分段结果和各语言的字符量（英文按单词数折算成汉字数）"""
+    runs: List[Tuple[str, Optional[str]]] = []
+    weights = {"zh": 0.0, "en": 0.0}
+    start = 0
+    current = None
+    previous_end = 0
+    for match in _SCRIPT_PATTERN.finditer(text):
+        if match.group(1):
+            lang = "zh"
+            weights["zh"] += match.end() - match.start()
+        else:
+            lang = "en"
+            weights["en"] += HAN_PER_WORD
+        if current is None:
+            current = lang
+        elif lang != current:
+            if current == "zh":
+                split = min(_CJK_PUNCTUATION.match(text, previous_end).end(), match.start())
+            else:
+                split = match.start()
+            runs.append((text[start:split], current))
+            start, current = split, lang
+        previous_end = match.end()
+    if text[start:] or not runs:
+        runs.append((text[start:], current))
+    return runs, weights
+
+
+def _run_weight(segment: str) -> float:
+    """片段的字符量，折算方式与 _scan 相同"""
+    weight = 0.0
+    for match in _SCRIPT_PATTERN.finditer(segment):
+        weight += match.end() - match.start() if match.group(1) else HAN_PER_WORD
+    return weight
+
+
+def _merge_embedded(runs: List[Tuple[str, Optional[str]]],
+                    source_lang: str) -> List[Tuple[str, Optional[str]]]:
+    """把不超过 EMBEDDED_RUN_MAX 的目标语言片段并入相邻的源语言片段，只有较长的片段单独保留"""
+    merged: List[Tuple[str, Optional[str]]] = []
+    for segment, lang in runs:
+        if lang is not None and lang != source_lang and _run_weight(segment) <= EMBEDDED_RUN_MAX:
+            lang = source_lang
+        if merged and merged[-1][1] == lang:
+            merged[-1] = (merged[-1][0] + segment, lang)
+        else:
+            merged.append((segment, lang))
+    return merged
+
+
+def _dominant(weights: Dict[str, float], default: str) -> str:
+    if not weights["zh"] and not weights["en"]:
+        return default
+    return "zh" if weights["zh"] >= weights["en"] else "en"
+
+
+def split_runs(text: str) -> List[Tuple[str, Optional[str]]]:
+    """把文本切成 (片段, 语言) 列表，语言为 "zh" / "en"，不含字母和汉字的文本为 None
+
+    片段按原顺序拼接后等于原文；数字、空格等中性字符并入相邻片段，
+    中英文交界处的全角标点归入中文片段，其余归入英文片段。
+    """
+    return _scan(text)[0]
+
+
+def detect_language(text: str, default: str = "zh") -> str:
+    """判断文本的主语言，既没有汉字也没有字母时返回 default"""
+    return _dominant(_scan(text)[1], default)
+
+
+def resolve_language(text: str, source_lang: str) -> str:
+    """把请求中的源语言规范为 "zh" / "en"，"auto" 时按文本检测"""
+    if source_lang == "auto":
+        return detect_language(text)
+    return "zh" if source_lang == "zh" else "en"
+
+
+def translate_mixed(texts: List[str],
+                    translate_batch: Callable[[List[str], str], List[str]]) -> Tuple[List[str], List[str]]:
+    """自动检测语言并翻译一批文本，返回 (译文列表, 各文本的源语言)
+
+    每条文本按主语言确定翻译方向；其中源语言的片段送入对应方向的模型，
+    较长的目标语言片段和纯数字/符号片段原样保留，嵌在句子中的短片段（如产品名、缩写）
+    并入所在句子一起翻译。所有文本中同一方向的片段合并后各调用一次 translate_batch，
+    重复片段只翻译一次。
+    """
+    plans = []
+    pending: Dict[str, Dict[str, None]] = {"zh": {}, "en": {}}
+    for text in texts:
+        runs, weights = _scan(text)
+        source_lang = _dominant(weights, "zh")
+        pieces = [(segment.strip(), lang == source_lang)
+                  for segment, lang in _merge_embedded(runs, source_lang)]
+        for piece, translate in pieces:
+            if translate and piece:
+                pending[source_lang][piece] = None
+        plans.append((source_lang, pieces))
+
+    translated: Dict[str, Dict[str, str]] = {}
+    for lang, pieces in pending.items():
+        batch = list(pieces)
+        translated[lang] = dict(zip(batch, translate_batch(batch, lang))) if batch else {}
+
+    results = []
+    for source_lang, pieces in plans:
+        joiner = " " if source_lang == "zh" else ""
+        results.append(joiner.join(
+            translated[source_lang][piece] if translate else piece
+            for piece, translate in pieces if piece
+        ))
+    return results, [source_lang for source_lang, _ in plans]
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字典查找引擎
+前缀补全（有序数组二分查找）、SymSpell风格的有界编辑距离模糊匹配，以及词形还原回退
+
+延迟目标（20万词条，单次查询）：
+- 精确/词形还原查询 < 0.1 毫秒
+- 前缀补全 < 1 毫秒
+- 编辑距离 ≤ 2 的模糊查询 < 10 毫秒（随机20万词表实测约5毫秒，耗时主要在候选词的距离校验）
+"""
+
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from reverse_index import LazyReverseIndex, rank_hits
+
+# 模糊匹配默认的最大编辑距离
+DEFAULT_MAX_DISTANCE = 2
+
+# SymSpell 只对词的前若干个字符生成删除变体，控制索引大小
+DEFAULT_PREFIX_LENGTH = 7
+
+# 常见不规则变化
+IRREGULAR_FORMS = {
+    "am": "be", "is": "be", "are": "be", "was": "be", "were": "be", "been": "be",
+    "has": "have", "had": "have", "did": "do", "does": "do", "done": "do",
+    "went": "go", "gone": "go", "made": "make", "said": "say", "took": "take",
+    "taken": "take", "came": "come", "saw": "see", "seen": "see", "knew": "know",
+    "known": "know", "got": "get", "gotten": "get", "gave": "give", "given": "give",
+    "found": "find", "thought": "think", "told": "tell", "became": "become",
+    "left": "leave", "felt": "feel", "brought": "bring", "began": "begin",
+    "begun": "begin", "kept": "keep", "held": "hold", "wrote": "write",
+    "written": "write", "stood": "stand", "heard": "hear", "meant": "mean",
+    "met": "meet", "ran": "run", "paid": "pay", "sat": "sit", "spoke": "speak",
+    "spoken": "speak", "led": "lead", "grew": "grow", "grown": "grow",
+    "lost": "lose", "fell": "fall", "fallen": "fall", "sent": "send",
+    "built": "build", "understood": "understand", "ate": "eat", "eaten": "eat",
+    "taught": "teach", "bought": "buy", "caught": "catch", "learnt": "learn",
+    "slept": "sleep", "drove": "drive", "driven": "drive", "flew": "fly",
+    "flown": "fly", "sang": "sing", "sung": "sing", "swam": "swim",
+    "children": "child", "men": "man", "women": "woman", "people": "person",
+    "feet": "foot", "teeth": "tooth", "mice": "mouse", "geese": "goose",
+    "better": "good", "best": "good", "worse": "bad", "worst": "bad",
+}
+
+# 规则还原：(后缀, 替换) 按顺序尝试
+_SUFFIX_RULES = (
+    ("ies", "y"), ("ied", "y"), ("iest", "y"), ("ier", "y"),
+    ("ves", "f"), ("ves", "fe"),
+    ("sses", "ss"), ("xes", "x"), ("ches", "ch"), ("shes", "sh"), ("oes", "o"),
+    ("s", ""),
+    ("ed", "e"), ("ed", ""),
+    ("ing", "e"), ("ing", ""),
+    ("est", "e"), ("est", ""),
+    ("er", "e"), ("er", ""),
+    ("ly", ""),
+)
+
+_VOWELS = set("aeiou")
+
+# 英文单词（只含字母，两侧为单词边界），模块加载时编译一次
+_WORD_PATTERN = re.compile(r'\b[a-zA-Z]+\b')
+
+
+def tokenize_words(text: str, min_length: int = 3) -> List[str]:
+    """一次扫描提取英文单词：转小写、过滤短词、按首次出现顺序去重"""
+    words = {}
+    for match in _WORD_PATTERN.finditer(text):
+        word = match.group()
+        if len(word) >= min_length:
+            words[word.lower()] = None
+    return list(words)
+
+
+def lemma_candidates(word: str) -> List[str]:
+    """生成可能的词元（按可能性排序，不含原词）"""
+    word = word.lower()
+    candidates = []
+    if word in IRREGULAR_FORMS:
+        candidates.append(IRREGULAR_FORMS[word])
+
+    for suffix, replacement in _SUFFIX_RULES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 2:
+            continue
+        if suffix == "s" and word.endswith("ss"):
+            continue
+        stem = word[:-len(suffix)]
+        candidates.append(stem + replacement)
+        # stopped -> stop, running -> run, bigger -> big
+        if (replacement == "" and suffix in ("ed", "ing", "er", "est")
+                and len(stem) >= 3 and stem[-1] == stem[-2] and stem[-1] not in _VOWELS):
+            candidates.append(stem[:-1])
+
+    seen = {word}
+    result = []
+    for candidate in candidates:
+        if candidate not in seen:
+            seen.add(candidate)
+            result.append(candidate)
+    return result
+
+
+def generate_deletes(word: str, max_distance: int = DEFAULT_MAX_DISTANCE,
+                     prefix_length: int = DEFAULT_PREFIX_LENGTH) -> Set[str]:
+    """生成词前缀在 max_distance 次删除以内的所有变体（包含前缀本身）"""
+    prefix = word[:prefix_length]
+    deletes = {prefix}
+    frontier = {prefix}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                variant = item[:i] + item[i + 1:]
+                if variant not in deletes:
+                    deletes.add(variant)
+                    next_frontier.add(variant)
+        frontier = next_frontier
+    return deletes
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """有界的 Damerau-Levenshtein（相邻换位）距离，超过上限时返回 max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    # 去掉公共前缀和后缀，只对不同的部分做动态规划
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return min(max(len(a), len(b)), max_distance + 1)
+
+    # 只计算对角线附近宽度为 max_distance 的带状区域
+    too_far = max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return min(previous[-1], max_distance + 1)
+
+
+class MemoryWordIndex:
+    """内存中的词表索引，用于内置字典等小词表
+
+    前缀查询使用有序数组二分查找，模糊查询使用SymSpell删除变体表。
+    """
+
+    def __init__(self, words: Iterable[str], max_distance: int = DEFAULT_MAX_DISTANCE,
+                 prefix_length: int = DEFAULT_PREFIX_LENGTH):
+        """由词表构建索引"""
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._words = sorted(set(words))
+        self._deletes: Dict[str, List[str]] = {}
+        for word in self._words:
+            for variant in generate_deletes(word, max_distance, prefix_length):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def words_with_prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """按字母序返回以 prefix 开头的词"""
+        start = bisect.bisect_left(self._words, prefix)
+        result = []
+        for word in self._words[start:start + limit]:
+            if not word.startswith(prefix):
+                break
+            result.append(word)
+        return result
+
+    def fuzzy_candidates(self, query: str) -> Set[str]:
+        """返回与查询共享删除变体的候选词（尚未校验编辑距离）"""
+        candidates = set()
+        for variant in generate_deletes(query, self.max_distance, self.prefix_length):
+            candidates.update(self._deletes.get(variant, ()))
+        return candidates
+
+
+class LookupEngine:
+    """字典查找引擎
+
+    dictionary 是内置字典、SQLiteDictionaryStore 或 BinaryDictionaryStore；后两者自带磁盘上的
+    前缀索引（SQLite 还有模糊索引），内置字典则在内存中建立 MemoryWordIndex。
+    中文反查使用 SQLite 文件中的反向索引表，其他字典在第一次中文查询时于内存中构建。
+    """
+
+    def __init__(self, dictionary):
+        """初始化查找引擎"""
+        self.dictionary = dictionary
+        if hasattr(dictionary, "words_with_prefix"):
+            self.index = dictionary
+        else:
+            self.index = MemoryWordIndex(dictionary.keys())
+        if getattr(dictionary, "has_reverse_index", False):
+            self.reverse_index = dictionary
+        else:
+            self.reverse_index = LazyReverseIndex(dictionary)
+
+    def lemmatize(self, word: str) -> Optional[str]:
+        """返回字典中存在的词元，找不到时返回 None"""
+        for candidate in lemma_candidates(word):
+            if candidate in self.dictionary:
+                return candidate
+        return None
+
+    def _get_many(self, words: Sequence[str]) -> Dict[str, Dict]:
+        """批量取词条，字典支持 get_many 时一次查询完成"""
+        get_many = getattr(self.dictionary, "get_many", None)
+        if get_many is not None:
+            return get_many(words)
+        entries = {}
+        for word in words:
+            entry = self.dictionary.get(word)
+            if entry is not None:
+                entries[word] = entry
+        return entries
+
+    def lookup_many(self, words: Iterable[str]) -> Dict[str, Tuple[str, Dict]]:
+        """批量查词，查不到原词时回退到词元
+
+        返回 词 -> (命中的词头, 词条)，查不到的词不出现在结果中。
+        每个不同的词只查一次：先一次批量查原词，再对未命中的词一次批量查所有词元候选。
+        """
+        unique = list(dict.fromkeys(word.lower().strip() for word in words))
+        found = self._get_many(unique)
+        results = {word: (word, found[word]) for word in unique if word in found}
+
+        candidates = {word: lemma_candidates(word) for word in unique if word not in found}
+        if candidates:
+            lemmas = self._get_many(list(dict.fromkeys(
+                lemma for lemma_list in candidates.values() for lemma in lemma_list
+            )))
+            for word, lemma_list in candidates.items():
+                for lemma in lemma_list:
+                    if lemma in lemmas:
+                        results[word] = (lemma, lemmas[lemma])
+                        break
+        return results
+
+    def lookup_chinese(self, term: str, limit: int = 10, with_entries: bool = True) -> List[Dict]:
+        """中文反查英文词头：先完全等于释义的词，再释义中包含 term 的词
+
+        返回的每一项包含 word、gloss（命中的中文释义）、match（exact/partial），
+        with_entries 为 True 时还包含词条内容（一次批量取出）。
+        """
+        term = term.strip()
+        if not term:
+            return []
+        hits = rank_hits(term, self.reverse_index.chinese_candidates(term), limit)
+        if with_entries:
+            entries = self._get_many([hit["word"] for hit in hits])
+            hits = [{**hit, **entries[hit["word"]]} for hit in hits if hit["word"] in entries]
+        return hits
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """前缀补全"""
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        return self.index.words_with_prefix(prefix, limit)
+
+    def fuzzy(self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE,
+              limit: int = 10) -> List[Dict]:
+        """有界编辑距离匹配，按 (距离, 词) 排序"""
+        query = query.lower().strip()
+        max_distance = min(max_distance, self.index.max_distance)
+        matches = []
+        for candidate in self.index.fuzzy_candidates(query):
+            distance = edit_distance(query, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append({"word": candidate, "distance": distance})
+        matches.sort(key=lambda match: (match["distance"], match["word"]))
+        return matches[:limit]
+
+    def search(self, query: str, max_distance: int = DEFAULT_MAX_DISTANCE,
+               limit: int = 10) -> List[Dict]:
+        """综合查询：精确匹配 -> 词形还原 -> 模糊匹配
+
+        返回的每一项包含 word、match（exact/lemma/fuzzy）、distance 及词条内容。
+        """
+        query = query.lower().strip()
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(word: str, match: str, distance: int):
+            if word in seen or len(results) >= limit:
+                return
+            entry = self.dictionary.get(word)
+            if entry is not None:
+                seen.add(word)
+                results.append({"word": word, "match": match, "distance": distance, **entry})
+
+        if query in self.dictionary:
+            add(query, "exact", 0)
+
+        lemma = self.lemmatize(query)
+        if lemma:
+            add(lemma, "lemma", 0)
+
+        for match in self.fuzzy(query, max_distance, limit):
+            add(match["word"], "fuzzy", match["distance"])
+
+        return results
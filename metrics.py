@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热路径埋点与 Prometheus 文本格式指标
+按阶段和翻译方向记录延迟直方图，统计输入/输出token数、批次大小、队列深度和错误数；
+profiling() 在当前请求内收集各阶段耗时，用于单个请求的耗时分解
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 延迟直方图的桶边界（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+# token数与批次大小的桶边界
+TOKEN_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _escape(value: str) -> str:
+    """转义标签值中的反斜杠、引号和换行"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """带标签的指标基类"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签: {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """生成 Prometheus 文本格式的行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: Tuple[str, ...], value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """可任意设置的瞬时值（如队列深度），通常在抓取时更新"""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """累积直方图，同时给出总和与次数"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 各桶计数（非累积）+ 总和 + 次数
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key: Tuple[str, ...], state) -> List[str]:
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """全部指标的 Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "translator_stage_seconds", "各阶段耗时（秒）", ("stage", "direction"))
+STAGE_ERRORS = REGISTRY.counter(
+    "translator_errors_total", "各阶段抛出的异常数", ("stage", "direction"))
+INPUT_TOKENS = REGISTRY.histogram(
+    "translator_input_tokens", "每条输入的token数", ("direction",), TOKEN_BUCKETS)
+OUTPUT_TOKENS = REGISTRY.histogram(
+    "translator_output_tokens", "每条输出的token数", ("direction",), TOKEN_BUCKETS)
+DECODE_STEPS = REGISTRY.histogram(
+    "translator_decode_steps", "每个请求的解码步数（模型实际生成的token数，未经模型时为0）", ("endpoint", "preset"), TOKEN_BUCKETS)
+BATCH_SIZE = REGISTRY.histogram(
+    "translator_batch_size", "每次模型推理的批次大小", ("direction",), BATCH_BUCKETS)
+TRANSLATION_SOURCES = REGISTRY.counter(
+    "translator_results_total", "按来源统计的译文条数（dictionary/cache/memory/model）", ("direction", "source"))
+TRANSLATION_MEMORY_HITS = REGISTRY.counter(
+    "translator_memory_hits_total", "由翻译记忆库直接给出译文、未调用模型的输入数", ("direction", "match"))
+WORKER_RESTARTS = REGISTRY.counter(
+    "translator_worker_restarts_total", "推理进程异常退出后被重新启动的次数")
+QUEUE_DEPTH = REGISTRY.gauge(
+    "translator_queue_depth", "排队中的请求数", ("queue",))
+MODEL_MEMORY = REGISTRY.gauge(
+    "translator_model_memory_mb", "已加载模型的估算内存（MB），未加载为0", ("model",))
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP请求数", ("endpoint", "method", "status"))
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时（秒）", ("endpoint",))
+
+
+def direction_label(source_lang: str) -> str:
+    """翻译方向标签"""
+    return "zh-en" if source_lang == "zh" else "en-zh"
+
+
+class Profile:
+    """单个请求内各阶段的耗时汇总"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.total_ms = 0.0
+
+    def add(self, stage: str, elapsed_ms: float):
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += elapsed_ms
+        totals[1] += 1
+
+    def breakdown(self) -> Dict:
+        """阶段名 -> 累计耗时（毫秒）和调用次数"""
+        return {
+            "total_ms": round(self.total_ms, 3),
+            "stages": {
+                stage: {"ms": round(elapsed, 3), "calls": calls}
+                for stage, (elapsed, calls) in self.stages.items()
+            }
+        }
+
+
+_active_profile: ContextVar[Optional[Profile]] = ContextVar("active_profile", default=None)
+
+
+@contextmanager
+def profiling() -> Iterator[Profile]:
+    """在当前线程（上下文）内收集各阶段耗时"""
+    profile = Profile()
+    token = _active_profile.set(profile)
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total_ms = (time.perf_counter() - start) * 1000
+        _active_profile.reset(token)
+
+
+def observe_stage(stage: str, direction: str, seconds: float):
+    """记录一次阶段耗时"""
+    STAGE_SECONDS.observe(seconds, stage=stage, direction=direction)
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.add(stage, seconds * 1000)
+
+
+@contextmanager
+def stage(name: str, direction: str = ""):
+    """计时一个阶段，异常计入错误数后继续抛出"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name, direction=direction)
+        raise
+    finally:
+        observe_stage(name, direction, time.perf_counter() - start)
+
+
+def instrument_pipeline(pipe, direction: str):
+    """给 transformers 翻译pipeline的分词、生成、解码三个阶段加计时
+
+    pipeline 内部按 preprocess -> _forward -> postprocess 调用，这里在实例上替换这三个方法；
+    没有这些方法的对象（如桩后端）原样返回。
+    """
+    preprocess = getattr(pipe, "preprocess", None)
+    forward = getattr(pipe, "_forward", None)
+    postprocess = getattr(pipe, "postprocess", None)
+    if getattr(pipe, "_instrumented", False) or not all(
+            callable(method) for method in (preprocess, forward, postprocess)):
+        return pipe
+
+    pad_token_id = getattr(getattr(pipe, "tokenizer", None), "pad_token_id", None)
+
+    def timed_preprocess(*args, **kwargs):
+        with stage("tokenize", direction):
+            model_inputs = preprocess(*args, **kwargs)
+        input_ids = model_inputs.get("input_ids") if hasattr(model_inputs, "get") else None
+        if input_ids is not None:
+            INPUT_TOKENS.observe(input_ids.shape[-1], direction=direction)
+        return model_inputs
+
+    def timed_forward(model_inputs, **kwargs):
+        with stage("generate", direction):
+            model_outputs = forward(model_inputs, **kwargs)
+        output_ids = model_outputs.get("output_ids") if hasattr(model_outputs, "get") else None
+        if output_ids is not None:
+            sequences = output_ids.reshape(-1, output_ids.shape[-1])
+            if pad_token_id is not None:
+                lengths = (sequences != pad_token_id).sum(-1).tolist()
+            else:
+                lengths = [sequences.shape[-1]] * sequences.shape[0]
+            for length in lengths:
+                OUTPUT_TOKENS.observe(length, direction=direction)
+            # 独占该pipeline的调用方（见 translator._generate）借此取回每条译文实际生成的token数
+            generated = getattr(pipe, "_generated_lengths", None)
+            if generated is not None:
+                generated.extend(lengths)
+        return model_outputs
+
+    def timed_postprocess(*args, **kwargs):
+        with stage("decode", direction):
+            return postprocess(*args, **kwargs)
+
+    pipe.preprocess = timed_preprocess
+    pipe._forward = timed_forward
+    pipe.postprocess = timed_postprocess
+    pipe._instrumented = True
+    return pipe
+
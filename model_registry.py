@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型注册表
+按名字登记模型（模型名或本地路径），第一次使用时加载；已加载模型的总内存超过预算时
+按最近最少使用淘汰。支持不停服切换模型版本：新版本加载完成前旧版本继续提供服务
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+def _rss_mb() -> Optional[float]:
+    """当前进程的常驻内存（MB），只支持Linux"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def estimate_model_memory(pipeline) -> Optional[float]:
+    """按参数和缓冲区的字节数估算模型占用的内存（MB），不是 PyTorch 模型时返回 None"""
+    model = getattr(pipeline, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return None
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    if hasattr(model, "buffers"):
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return total / (1024 * 1024)
+
+
+class ModelRegistry:
+    """按需加载、按内存预算淘汰的模型注册表
+
+    loader(path) 负责创建pipeline。memory_budget_mb 为已加载模型的内存上限，
+    None 表示不限制；刚加载的模型即使单独超出预算也会保留。
+    local_only=True 时只允许从本地目录加载，不会访问模型仓库。
+    on_unload(name) 在模型被淘汰、卸载或切换版本后调用（不持有注册表的锁），
+    使用方据此丢弃自己对旧pipeline的引用，内存才能真正释放。
+    """
+
+    def __init__(self, loader: Callable[[str], object],
+                 memory_budget_mb: Optional[float] = None, local_only: bool = False,
+                 on_unload: Optional[Callable[[str], None]] = None):
+        self.loader = loader
+        self.memory_budget_mb = memory_budget_mb
+        self.local_only = local_only
+        self.on_unload = on_unload
+
+        # 名字 -> 模型信息；已加载的模型按最近使用排在后面
+        self._models: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 每个名字一把加载锁，避免并发请求重复加载同一个模型
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._evictions = 0
+
+    def register(self, name: str, path: Optional[str] = None):
+        """登记模型，path 默认与名字相同；已登记的模型不受影响"""
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = {
+                    "path": path or name,
+                    "version": None,
+                    "pipeline": None,
+                    "memory_mb": None,
+                    "load_ms": None,
+                    "loads": 0,
+                    "hits": 0,
+                    "evictions": 0,
+                    "last_used": None
+                }
+                self._load_locks[name] = threading.Lock()
+
+    def _check_path(self, path: str):
+        if self.local_only and not os.path.isdir(path):
+            raise FileNotFoundError(f"只允许加载本地模型，目录不存在: {path}")
+
+    def _load(self, path: str):
+        """加载模型，返回 (pipeline, 内存MB, 加载耗时毫秒)"""
+        self._check_path(path)
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        pipeline = self.loader(path)
+        load_ms = (time.perf_counter() - start) * 1000
+        memory_mb = estimate_model_memory(pipeline)
+        if memory_mb is None:
+            # 非 PyTorch 模型（ONNX等）退化为加载前后的常驻内存差
+            rss_after = _rss_mb()
+            memory_mb = max(rss_after - rss_before, 0.0) if rss_before and rss_after else 0.0
+        return pipeline, memory_mb, load_ms
+
+    def _install(self, name: str, pipeline, memory_mb: float, load_ms: float) -> List[str]:
+        """在持有 self._lock 时装入加载好的模型并按预算淘汰其他模型，返回被淘汰的模型名"""
+        info = self._models[name]
+        info.update(pipeline=pipeline, memory_mb=memory_mb, load_ms=load_ms,
+                    last_used=time.time())
+        info["loads"] += 1
+        self._models.move_to_end(name)
+        return self._evict(keep=name)
+
+    def _evict(self, keep: str) -> List[str]:
+        """淘汰最近最少使用的模型，直到内存回到预算以内，返回被淘汰的模型名"""
+        evicted = []
+        if self.memory_budget_mb is None:
+            return evicted
+        for name in list(self._models):
+            if self._used_mb() <= self.memory_budget_mb:
+                break
+            info = self._models[name]
+            if name == keep or info["pipeline"] is None:
+                continue
+            print(f"内存超出预算，卸载模型 {name}（{info['memory_mb']:.1f}MB）")
+            # 正在推理的请求仍持有pipeline引用，完成后内存才会释放
+            info["pipeline"] = None
+            info["evictions"] += 1
+            self._evictions += 1
+            evicted.append(name)
+        return evicted
+
+    def _notify_unloaded(self, names: List[str]):
+        """在释放 self._lock 之后通知使用方模型已被卸载"""
+        if self.on_unload is not None:
+            for name in names:
+                self.on_unload(name)
+
+    def _used_mb(self) -> float:
+        return sum(info["memory_mb"] or 0.0 for info in self._models.values()
+                   if info["pipeline"] is not None)
+
+    def get(self, name: str):
+        """获取模型pipeline，未加载（或已被淘汰）时加载"""
+        with self._lock:
+            info = self._models.get(name)
+            if info is None:
+                raise KeyError(f"模型未登记: {name}")
+            if info["pipeline"] is not None:
+                info["hits"] += 1
+                info["last_used"] = time.time()
+                self._models.move_to_end(name)
+                return info["pipeline"]
+            load_lock = self._load_locks[name]
+            path = info["path"]
+
+        with load_lock:
+            with self._lock:
+                pipeline = self._models[name]["pipeline"]
+            if pipeline is not None:
+                return pipeline
+            pipeline, memory_mb, load_ms = self._load(path)
+            with self._lock:
+                evicted = self._install(name, pipeline, memory_mb, load_ms)
+            self._notify_unloaded(evicted)
+            return pipeline
+
+    def swap(self, name: str, path: str, version: Optional[str] = None) -> Dict:
+        """切换模型版本：先加载新版本，加载完成后再替换，期间旧版本继续服务
+
+        version 为版本标签，默认按切换次数生成（v2、v3...）；加载失败时保持旧版本不变。
+        """
+        self.register(name, path)
+        with self._load_locks[name]:
+            pipeline, memory_mb, load_ms = self._load(path)
+            with self._lock:
+                info = self._models[name]
+                info["path"] = path
+                info["version"] = version or f"v{info['loads'] + 1}"
+                replaced = info["pipeline"] is not None
+                evicted = self._install(name, pipeline, memory_mb, load_ms)
+        # 旧版本的pipeline已被替换，同样需要通知使用方
+        self._notify_unloaded(([name] if replaced else []) + evicted)
+        print(f"模型 {name} 已切换到 {path}（{info['version']}）")
+        return self.model_stats(name)
+
+    def unload(self, name: str):
+        """卸载模型，下次使用时重新加载"""
+        with self._lock:
+            info = self._models.get(name)
+            loaded = info is not None and info["pipeline"] is not None
+            if loaded:
+                info["pipeline"] = None
+        if loaded:
+            self._notify_unloaded([name])
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            info = self._models.get(name)
+            return info is not None and info["pipeline"] is not None
+
+    def version(self, name: str) -> Optional[str]:
+        """模型当前的版本标签，从未切换过时为 None"""
+        info = self._models.get(name)
+        return info["version"] if info else None
+
+    def model_stats(self, name: str) -> Dict:
+        """单个模型的路径、版本、内存、加载耗时等信息"""
+        with self._lock:
+            info = self._models[name]
+            stats = {key: value for key, value in info.items() if key != "pipeline"}
+            stats["loaded"] = info["pipeline"] is not None
+        return stats
+
+    def stats(self) -> Dict:
+        """全部模型的信息以及内存预算使用情况"""
+        models = {name: self.model_stats(name) for name in list(self._models)}
+        with self._lock:
+            used_mb = self._used_mb()
+        return {
+            "models": models,
+            "memory_budget_mb": self.memory_budget_mb,
+            "memory_used_mb": used_mb,
+            "evictions": self._evictions,
+            "local_only": self.local_only
+        }
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发推理槽位
+同一个模型按并发度准备若干pipeline副本（共享模型权重，分词器各自独立），
+每次推理独占一个槽位，超过并发度的调用者排队等待；另有一份独立加锁的分词器用于统计token数
+"""
+
+import copy
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from backends import clone_pipeline
+
+
+class PipelinePool:
+    """同一模型的若干推理槽位
+
+    size 为允许同时进行的推理数。prepare 对每个槽位的pipeline做额外处理（如加计时），
+    source 是用来创建槽位的原始pipeline，模型被热切换或重新加载后据此判断是否需要重建。
+    """
+
+    def __init__(self, pipeline, size: int = 1, prepare: Optional[Callable] = None):
+        self.source = pipeline
+        self.size = max(1, size)
+        prepare = prepare or (lambda pipe: pipe)
+        slots = [pipeline] + [clone_pipeline(pipeline) for _ in range(self.size - 1)]
+        # 后进先出：刚用完的槽位优先复用
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        for slot in slots:
+            self._idle.put(prepare(slot))
+
+        # 统计token数用的分词器副本，与推理槽位互不等待
+        tokenizer = getattr(pipeline, "tokenizer", None)
+        self.tokenizer = copy.deepcopy(tokenizer) if tokenizer is not None else None
+        self._tokenizer_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak = 0
+        self._calls = 0
+        self._waits = 0
+        self._wait_ms = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator:
+        """独占一个槽位的pipeline，没有空闲槽位时阻塞等待"""
+        try:
+            pipe = self._idle.get_nowait()
+            waited_ms = None
+        except queue.Empty:
+            start = time.perf_counter()
+            pipe = self._idle.get()
+            waited_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._calls += 1
+            self._in_use += 1
+            self._peak = max(self._peak, self._in_use)
+            if waited_ms is not None:
+                self._waits += 1
+                self._wait_ms += waited_ms
+        try:
+            yield pipe
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(pipe)
+
+    def token_lengths(self, texts: List[str], target: bool = False) -> List[int]:
+        """每条文本的token数（target=True 时按译文语言分词），没有分词器时退化为字符数"""
+        if self.tokenizer is None or not texts:
+            return [len(text) for text in texts]
+        with self._tokenizer_lock:
+            if target:
+                encoded = self.tokenizer(text_target=texts)
+            else:
+                encoded = self.tokenizer(texts)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def stats(self) -> Dict:
+        """槽位数、当前/峰值占用、排队次数和平均排队耗时"""
+        with self._lock:
+            return {
+                "slots": self.size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak,
+                "calls": self._calls,
+                "waits": self._waits,
+                "avg_wait_ms": self._wait_ms / self._waits if self._waits else 0.0
+            }
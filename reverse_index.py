@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中文释义反向索引（中文 -> 英文词头）
+词条的 chinese 字段按分号等分隔成若干释义词，每个释义词再切成相邻两字的 n-gram 和单字；
+完全等于某个释义的查询直接命中，较短的查询通过 n-gram 倒排表（单字查询用单字倒排表）找到包含它的释义
+
+延迟目标：内存索引单次查询为微秒级，SQLite 字典使用编译时生成的索引表
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+# 释义之间的分隔符（全角/半角分号、逗号、顿号、斜线）
+_GLOSS_SEPARATORS = re.compile(r"[；;，,、/|]")
+# 释义中的括号注释，如“（口语）”“[计]”
+_GLOSS_NOTES = re.compile(r"[（(\[【][^）)\]】]*[）)\]】]")
+
+# 倒排表使用的 n-gram 长度
+NGRAM_SIZE = 2
+
+# 匹配类型：完全等于释义、释义中包含查询
+EXACT = "exact"
+PARTIAL = "partial"
+
+
+def split_glosses(chinese: str) -> List[str]:
+    """把 chinese 字段切分为释义词列表（去掉括号注释和空白，按首次出现顺序去重）"""
+    glosses = {}
+    for gloss in _GLOSS_SEPARATORS.split(_GLOSS_NOTES.sub("", chinese or "")):
+        gloss = gloss.strip()
+        if gloss:
+            glosses[gloss] = None
+    return list(glosses)
+
+
+def char_ngrams(text: str, size: int = NGRAM_SIZE) -> Set[str]:
+    """文本中所有相邻 size 个字符的片段"""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def index_keys(gloss: str) -> Set[str]:
+    """释义在倒排表中的键：n-gram 加上单字（单字查询没有 n-gram）"""
+    return char_ngrams(gloss) | set(gloss)
+
+
+def query_keys(term: str) -> Set[str]:
+    """查询用到的倒排表键：包含查询的释义必然包含这些键；不足 NGRAM_SIZE 个字时用单字"""
+    return char_ngrams(term) or set(term)
+
+
+def rank_hits(term: str, candidates: Iterable[Tuple[str, str, int]],
+              limit: int = 10) -> List[Dict]:
+    """校验并排序候选 (词头, 释义, 释义序号)
+
+    完全匹配排在前面，其余按释义多出的字数、释义在词条中的序号、词头长度和字母序排序；
+    每个词头只保留最好的一条。
+    """
+    best: Dict[str, Tuple] = {}
+    for word, gloss, position in candidates:
+        if gloss == term:
+            key = (0, 0, position, len(word), word)
+        elif term in gloss:
+            key = (1, len(gloss) - len(term), position, len(word), word)
+        else:
+            continue
+        if word not in best or key < best[word][0]:
+            best[word] = (key, gloss)
+    hits = sorted(best.items(), key=lambda item: item[1][0])[:limit]
+    return [
+        {"word": word, "gloss": gloss, "match": EXACT if key[0] == 0 else PARTIAL}
+        for word, (key, gloss) in hits
+    ]
+
+
+class MemoryReverseIndex:
+    """内存中的反向索引，用于内置字典和不含反向索引表的字典文件"""
+
+    def __init__(self, items: Iterable[Tuple[str, str]]):
+        """由 (词头, chinese 字段) 构建索引"""
+        self._glosses: List[str] = []
+        self._gloss_ids: Dict[str, int] = {}
+        # 释义序号 -> [(词头, 释义在词条中的序号)]
+        self._postings: List[List[Tuple[str, int]]] = []
+        self._ngrams: Dict[str, List[int]] = {}
+        for word, chinese in items:
+            for position, gloss in enumerate(split_glosses(chinese)):
+                gloss_id = self._gloss_ids.get(gloss)
+                if gloss_id is None:
+                    gloss_id = self._gloss_ids[gloss] = len(self._glosses)
+                    self._glosses.append(gloss)
+                    self._postings.append([])
+                    for key in index_keys(gloss):
+                        self._ngrams.setdefault(key, []).append(gloss_id)
+                self._postings[gloss_id].append((word, position))
+
+    def __len__(self) -> int:
+        return len(self._glosses)
+
+    def chinese_candidates(self, term: str) -> List[Tuple[str, str, int]]:
+        """返回可能匹配的 (词头, 释义, 释义序号)，由 rank_hits 校验"""
+        gloss_ids = set()
+        exact = self._gloss_ids.get(term)
+        if exact is not None:
+            gloss_ids.add(exact)
+        keys = query_keys(term)
+        if keys:
+            postings = sorted((self._ngrams.get(key, ()) for key in keys), key=len)
+            shared = set(postings[0])
+            for posting in postings[1:]:
+                shared.intersection_update(posting)
+                if not shared:
+                    break
+            gloss_ids.update(shared)
+        return [
+            (word, self._glosses[gloss_id], position)
+            for gloss_id in gloss_ids
+            for word, position in self._postings[gloss_id]
+        ]
+
+
+class LazyReverseIndex:
+    """第一次查询时才构建的内存反向索引（构建需要遍历全部词条）"""
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _get_index(self) -> MemoryReverseIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = MemoryReverseIndex(
+                        (word, entry.get("chinese", "")) for word, entry in self.dictionary.items()
+                    )
+        return self._index
+
+    def chinese_candidates(self, term: str) -> List[Tuple[str, str, int]]:
+        return self._get_index().chinese_candidates(term)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中英文分句与按长度分桶
+用于长文档翻译：先分句，再把长度相近的句子放进同一批次以减少padding
+"""
+
+import re
+from typing import List, Sequence, Tuple
+
+# 中文句末标点（可跟随右引号/右括号）
+_ZH_BOUNDARY = re.compile(r'[。！？!?…]+[”’」』）)"\']*')
+
+# 英文句末标点，后面必须是空白或文本结尾
+_EN_BOUNDARY = re.compile(r'[.!?]+["\')\]]*(?=\s|$)')
+
+# 分句时不应断开的常见英文缩写
+_EN_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc",
+    "e.g", "i.e", "u.s", "u.k", "no", "fig", "inc", "ltd", "co",
+}
+
+# 超长句子的次级切分点（逗号、分号、冒号）
+_CLAUSE_BOUNDARY = re.compile(r'[，,；;：:、]')
+
+_NEWLINES = re.compile(r'(\n+)')
+
+
+def _is_abbreviation(sentence: str) -> bool:
+    """判断以句点结尾的片段是否只是缩写"""
+    words = sentence.rstrip(".").split()
+    if not words:
+        return False
+    last = words[-1].lower()
+    return last in _EN_ABBREVIATIONS or (len(last) == 1 and last.isalpha())
+
+
+def _split_line(line: str, lang: str) -> List[Tuple[str, str]]:
+    """对单行文本分句，返回 (句子, 句后空白) 列表"""
+    pattern = _ZH_BOUNDARY if lang == "zh" else _EN_BOUNDARY
+    segments = []
+    start = 0
+
+    for match in pattern.finditer(line):
+        end = match.end()
+        if lang != "zh" and match.group().startswith(".") and _is_abbreviation(line[start:end]):
+            continue
+        # 句后空白归入分隔符，重建时原样保留
+        sep_end = end
+        while sep_end < len(line) and line[sep_end].isspace():
+            sep_end += 1
+        sentence = line[start:end].strip()
+        if sentence:
+            segments.append((sentence, line[end:sep_end]))
+        start = sep_end
+
+    tail = line[start:].strip()
+    if tail:
+        segments.append((tail, ""))
+    return segments
+
+
+def split_sentences(text: str, lang: str = "zh") -> List[Tuple[str, str]]:
+    """把文本切分成句子
+
+    返回 (句子, 分隔符) 列表，分隔符是句子后面的原始空白（包括换行），
+    按顺序拼接 句子+分隔符 即可还原段落结构。
+    """
+    segments: List[Tuple[str, str]] = []
+    for part in _NEWLINES.split(text):
+        if not part:
+            continue
+        if part.startswith("\n"):
+            # 换行并入前一句的分隔符
+            if segments:
+                sentence, sep = segments[-1]
+                segments[-1] = (sentence, sep + part)
+            continue
+        segments.extend(_split_line(part, lang))
+    return segments
+
+
+def split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """把超长句子按逗号、分号等切成不超过 max_chars 的片段"""
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    pieces = []
+    current = ""
+    start = 0
+    for match in _CLAUSE_BOUNDARY.finditer(sentence):
+        clause = sentence[start:match.end()]
+        start = match.end()
+        if current and len(current) + len(clause) > max_chars:
+            pieces.append(current.strip())
+            current = ""
+        current += clause
+    current += sentence[start:]
+
+    if current.strip():
+        pieces.append(current.strip())
+
+    # 没有可用切分点时按长度硬切
+    result = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            result.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        if piece:
+            result.append(piece)
+    return result
+
+
+def bucket_by_length(lengths: Sequence[int], max_batch_size: int = 16,
+                     max_batch_tokens: int = 4096) -> List[List[int]]:
+    """按长度分桶
+
+    把下标按长度排序后依次装桶，每桶不超过 max_batch_size 条，
+    且 条数×桶内最大长度（即padding后的token数）不超过 max_batch_tokens。
+    返回每个桶包含的原始下标。
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets: List[List[int]] = []
+    current: List[int] = []
+
+    for i in order:
+        longest = max(lengths[i], 1)
+        if current and (len(current) >= max_batch_size
+                        or (len(current) + 1) * longest > max_batch_tokens):
+            buckets.append(current)
+            current = []
+        current.append(i)
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def output_separator(source_separator: str, target_lang: str) -> str:
+    """译文中句子之间的分隔符
+
+    原文分隔符中的换行原样保留；其余情况英文译文用一个空格，中文译文不加分隔。
+    """
+    if "\n" in source_separator:
+        return "\n" * source_separator.count("\n")
+    return " " if target_lang == "en" else ""
+
+
+def join_translations(translations: Sequence[str], separators: Sequence[str],
+                      target_lang: str) -> str:
+    """按原始顺序拼接译文"""
+    parts = []
+    for translation, sep in zip(translations, separators):
+        parts.append(translation)
+        parts.append(output_separator(sep, target_lang))
+    return "".join(parts).strip()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理服务层
+有界推理队列 + 专用工作线程池：请求线程只负责排队等待结果，
+队列满时立即拒绝（背压），支持单请求超时和关闭时的平滑排空
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, Iterator, Optional
+
+
+class QueueFullError(Exception):
+    """推理队列已满，调用方应稍后重试（HTTP 429）"""
+
+
+class ServiceDrainingError(Exception):
+    """服务正在关闭排空，不再接受新请求（HTTP 503）"""
+
+
+# 流式任务结束标记
+_STREAM_END = object()
+
+
+class InferenceQueue:
+    """有界推理队列
+
+    submit() 把任务放进容量为 max_queue_size 的队列，由 num_workers 个
+    工作线程执行；队列满时抛出 QueueFullError，等待超过 timeout 秒抛出
+    TimeoutError（尚未开始执行的任务会被取消）。drain() 停止接收新任务，
+    等已入队的任务执行完后关闭工作线程。
+    """
+
+    def __init__(self, max_queue_size: int = 64, num_workers: int = 1,
+                 default_timeout: Optional[float] = 30.0):
+        """初始化推理队列并启动工作线程"""
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size 必须大于 0")
+        if num_workers < 1:
+            raise ValueError("num_workers 必须大于 0")
+
+        self.max_queue_size = max_queue_size
+        self.num_workers = num_workers
+        self.default_timeout = default_timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._draining = False
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0
+        }
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f"inference-worker-{i}", daemon=True)
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def draining(self) -> bool:
+        """是否正在排空"""
+        return self._draining
+
+    def submit_async(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交任务，返回 Future；队列满或正在排空时立即抛出异常"""
+        if self._draining:
+            raise ServiceDrainingError("服务正在关闭")
+
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((fn, args, kwargs, future))
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise QueueFullError(f"推理队列已满（{self.max_queue_size}）")
+
+        with self._lock:
+            self._stats["submitted"] += 1
+        return future
+
+    def submit(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """提交任务并等待结果"""
+        future = self.submit_async(fn, *args, **kwargs)
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise
+
+    def submit_stream(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Iterator:
+        """提交流式任务，返回在调用方线程中逐个取结果的迭代器
+
+        fn 返回的生成器在工作线程中迭代，整个迭代期间占用一个工作线程。排队阶段与 submit 相同：
+        队列满或正在排空时立即抛出异常，timeout 秒内没有开始执行时抛出 TimeoutError。
+        调用方提前关闭迭代器（如客户端断开）时，工作线程在下一个元素之后停止并关闭生成器。
+        """
+        items: "queue.Queue" = queue.Queue()
+        started = threading.Event()
+        closed = threading.Event()
+
+        def produce():
+            started.set()
+            generator = None
+            try:
+                generator = iter(fn(*args, **kwargs))
+                for item in generator:
+                    items.put((True, item))
+                    if closed.is_set():
+                        break
+            except BaseException as e:
+                items.put((False, e))
+                raise
+            finally:
+                if generator is not None and hasattr(generator, "close"):
+                    generator.close()
+                items.put(_STREAM_END)
+
+        future = self.submit_async(produce)
+        timeout = self.default_timeout if timeout is None else timeout
+        # 已经开始执行的任务无法取消，继续返回结果
+        if not started.wait(timeout) and future.cancel():
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise TimeoutError()
+        return self._consume_stream(items, closed)
+
+    @staticmethod
+    def _consume_stream(items: "queue.Queue", closed: threading.Event) -> Iterator:
+        try:
+            while True:
+                item = items.get()
+                if item is _STREAM_END:
+                    return
+                ok, value = item
+                if not ok:
+                    raise value
+                yield value
+        finally:
+            closed.set()
+
+    def _run(self):
+        """工作线程主循环"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+
+            fn, args, kwargs, future = item
+            if not future.set_running_or_notify_cancel():
+                # 调用方已超时放弃
+                self._queue.task_done()
+                continue
+
+            with self._lock:
+                self._in_flight += 1
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                with self._lock:
+                    self._stats["failed"] += 1
+            else:
+                future.set_result(result)
+                with self._lock:
+                    self._stats["completed"] += 1
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                self._queue.task_done()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """停止接收新任务，等待已入队任务完成后关闭工作线程
+
+        返回是否在超时前全部完成。
+        """
+        self._draining = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        for _ in self._workers:
+            while True:
+                try:
+                    # 队列满时等待腾出位置放入停止信号
+                    self._queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    if deadline is not None and time.monotonic() > deadline:
+                        return False
+
+        for worker in self._workers:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            worker.join(remaining)
+        return not any(worker.is_alive() for worker in self._workers)
+
+    def stats(self) -> Dict:
+        """队列深度、执行中任务数及各类计数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+        stats["queue_depth"] = self._queue.qsize()
+        stats["max_queue_size"] = self.max_queue_size
+        stats["workers"] = self.num_workers
+        stats["draining"] = self._draining
+        return stats
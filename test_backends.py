@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理后端一致性测试
+比较量化、ONNX 后端与 PyTorch fp32 的输出
+
+默认用 benchmark.make_tiny_model 生成随机初始化的小型 Marian 模型（不联网），
+也可以通过环境变量指定本地保存的模型:
+    TRANSLATOR_TEST_MODEL=/path/to/opus-mt-zh-en python -m pytest test_backends.py
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_PATH = os.environ.get("TRANSLATOR_TEST_MODEL", "")
+
+SENTENCES = [
+    "你好，世界！",
+    "我爱学习。",
+    "今天天气很好，我想去公园散步。",
+    "Hello, world!",
+]
+
+
+def _first_step_logits(pipe, texts):
+    """计算解码第一步的logits，用于比较数值一致性"""
+    import torch
+
+    inputs = pipe.tokenizer(texts, return_tensors="pt", padding=True)
+    start_id = pipe.model.config.decoder_start_token_id
+    decoder_input_ids = torch.full((len(texts), 1), start_id, dtype=torch.long)
+    with torch.no_grad():
+        outputs = pipe.model(**inputs, decoder_input_ids=decoder_input_ids)
+    return outputs.logits[:, -1, :].float()
+
+
+def _translate(pipe, texts):
+    return [output["translation_text"] for output in pipe(texts, batch_size=len(texts))]
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    """TRANSLATOR_TEST_MODEL 指定的本地模型，未指定时生成小型模型"""
+    if os.path.isdir(MODEL_PATH):
+        return MODEL_PATH
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    pytest.importorskip("sentencepiece")
+    from benchmark import make_tiny_model
+
+    path = str(tmp_path_factory.mktemp("tiny-marian"))
+    make_tiny_model(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def reference(model_path):
+    from backends import create_translation_pipeline
+    return create_translation_pipeline(model_path, backend="pytorch")
+
+
+def test_quantized_parity(reference, model_path):
+    """动态int8量化后logits应与fp32高度相关"""
+    import torch
+    from backends import create_translation_pipeline
+
+    quantized = create_translation_pipeline(model_path, backend="quantized", num_threads=1)
+
+    expected = _first_step_logits(reference, SENTENCES)
+    actual = _first_step_logits(quantized, SENTENCES)
+    similarity = torch.nn.functional.cosine_similarity(expected, actual, dim=-1)
+    assert similarity.min().item() > 0.98
+
+    assert len(_translate(quantized, SENTENCES)) == len(SENTENCES)
+
+
+def test_onnx_parity(reference, model_path, tmp_path):
+    """ONNX Runtime 与 PyTorch fp32 的输出应一致"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum.onnxruntime")
+    import torch
+    from backends import create_translation_pipeline
+
+    onnx = create_translation_pipeline(
+        model_path, backend="onnx", num_threads=1, onnx_cache_dir=str(tmp_path)
+    )
+
+    expected = _first_step_logits(reference, SENTENCES)
+    actual = _first_step_logits(onnx, SENTENCES)
+    assert torch.allclose(expected, actual, atol=1e-3, rtol=1e-3)
+    assert _translate(onnx, SENTENCES) == _translate(reference, SENTENCES)
+
+    # 第二次创建应直接复用缓存目录中导出的模型
+    assert os.listdir(tmp_path)
+    cached = create_translation_pipeline(
+        model_path, backend="onnx", onnx_cache_dir=str(tmp_path)
+    )
+    assert _translate(cached, SENTENCES) == _translate(reference, SENTENCES)
+
+
+def test_unknown_backend():
+    """未知后端在加载模型之前报错，不需要模型"""
+    from backends import create_translation_pipeline
+
+    with pytest.raises(ValueError):
+        create_translation_pipeline("no-such-model", backend="tensorrt")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步客户端测试
+在子进程中启动使用桩后端的 web_app.py，检查批量合并、在途请求去重、查词LRU和连接复用
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("flask")
+
+from translator_client import TranslatorClient, TranslatorClientError
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STARTUP_TIMEOUT = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def server():
+    """启动桩后端的翻译服务，返回服务地址"""
+    port = _free_port()
+    env = dict(os.environ, TRANSLATOR_BACKEND="stub", TRANSLATION_MEMORY_THRESHOLD="0")
+    process = subprocess.Popen(
+        [sys.executable, "web_app.py", "--production", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + STARTUP_TIMEOUT
+    while True:
+        try:
+            with urllib.request.urlopen(base_url + "/api/health", timeout=1):
+                break
+        except OSError:
+            if process.poll() is not None or time.time() > deadline:
+                process.kill()
+                pytest.fail("翻译服务启动失败")
+            time.sleep(0.2)
+    yield base_url
+    process.terminate()
+    process.wait(10)
+
+
+def test_concurrent_translations_are_batched(server):
+    """同一时间窗口内的翻译合并成少量批量请求"""
+    async def run():
+        async with TranslatorClient(server, max_connections=4, max_batch_size=32) as client:
+            texts = [f"第{i}句需要翻译的话" for i in range(40)]
+            results = await client.translate_many(texts)
+            return texts, results, client.stats()
+
+    texts, results, stats = asyncio.run(run())
+    assert results == [f"[opus-mt-zh-en] {text}" for text in texts]
+    assert stats["batches"] == 2
+    assert stats["http_requests"] == 2
+    assert stats["connections_opened"] <= 2
+
+
+def test_duplicate_requests_collapse(server):
+    """相同的在途请求只发送一次"""
+    async def run():
+        async with TranslatorClient(server) as client:
+            results = await asyncio.gather(*(client.translate("重复的句子", "zh") for _ in range(10)))
+            return results, client.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["[opus-mt-zh-en] 重复的句子"] * 10
+    assert stats["coalesced"] == 9
+    assert stats["items_sent"] == 1
+
+
+def test_dictionary_lookup_and_lru(server):
+    """查词结果（包括查不到的词）保存在本地LRU中，重复查询不再请求服务"""
+    async def run():
+        async with TranslatorClient(server, dictionary_cache_size=2) as client:
+            hello, missing = await asyncio.gather(client.lookup("Hello"), client.lookup("zzzzqx"))
+            requests_before = client.stats()["http_requests"]
+            again = await client.lookup("hello")
+            requests_after = client.stats()["http_requests"]
+            await client.lookup("world")
+            await client.lookup("love")
+            return hello, missing, again, requests_before, requests_after, client.stats()
+
+    hello, missing, again, requests_before, requests_after, stats = asyncio.run(run())
+    assert hello["chinese"] and again is hello
+    assert missing is None
+    assert requests_before == requests_after == 1
+    assert stats["dictionary_cache_hits"] == 1
+    assert stats["dictionary_cache_size"] == 2
+
+
+def test_keep_alive_reuse(server):
+    """顺序请求复用同一个 keep-alive 连接"""
+    async def run():
+        async with TranslatorClient(server, batch_window_ms=0) as client:
+            for i in range(5):
+                assert await client.translate(f"hello number {i}", "en") == f"[opus-mt-en-zh] hello number {i}"
+            return client.stats()
+
+    stats = asyncio.run(run())
+    if stats["server_closes"]:
+        # Flask 内置服务器不支持 keep-alive，生产模式下安装 waitress 后才会复用连接
+        assert stats["connections_opened"] == 5
+        pytest.skip("服务端不支持keep-alive（未安装waitress）")
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+
+
+def test_service_error(server):
+    """服务返回的错误转为 TranslatorClientError"""
+    async def run():
+        async with TranslatorClient(server) as client:
+            await client.translate("你好", preset="no-such-preset")
+
+    with pytest.raises(TranslatorClientError):
+        asyncio.run(run())
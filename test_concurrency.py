@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译器并发压力测试
+多个客户端线程同时调用同一个翻译器，检查译文没有串号或损坏，并且吞吐量随客户端并发数上升
+
+默认使用桩后端（sleep 模拟推理耗时并释放GIL）；设置本地小模型时另外校验真实模型的并发输出
+与串行输出一致:
+    TRANSLATOR_TEST_MODEL=/path/to/opus-mt-zh-en python -m pytest test_concurrency.py
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from translator import ChineseEnglishTranslator
+
+MODEL_PATH = os.environ.get("TRANSLATOR_TEST_MODEL", "")
+
+CONCURRENCY_LEVELS = (1, 2, 4, 8)
+REQUESTS_PER_CLIENT = 20
+
+
+def _run_clients(clients, requests_per_client, translate, expected):
+    """clients 个线程同时发起请求，返回 (每秒请求数, 不一致的结果列表)"""
+    barrier = threading.Barrier(clients + 1)
+    mismatches = []
+
+    def client(index):
+        barrier.wait()
+        for i in range(requests_per_client):
+            text = f"第{index}个客户端发送的第{i}句话"
+            result = translate(text)
+            if result != expected(text):
+                mismatches.append((text, result))
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return clients * requests_per_client / elapsed, mismatches
+
+
+def test_stub_throughput_scales():
+    """吞吐量随客户端并发数上升，且每个客户端拿到的都是自己的译文"""
+    translator = ChineseEnglishTranslator(backend="stub", max_concurrency=max(CONCURRENCY_LEVELS))
+
+    throughput = {}
+    for clients in CONCURRENCY_LEVELS:
+        rate, mismatches = _run_clients(
+            clients, REQUESTS_PER_CLIENT,
+            lambda text: translator.translate_batch([text], "zh")[0],
+            lambda text: f"[opus-mt-zh-en] {text}"
+        )
+        assert not mismatches, mismatches[:3]
+        throughput[clients] = rate
+    print("吞吐量（请求/秒）:", {clients: round(rate) for clients, rate in throughput.items()})
+
+    assert throughput[2] > throughput[1] * 1.5
+    assert throughput[8] > throughput[1] * 3
+    slots = translator.get_load_stats()["concurrency"]["slots"]["zh"]
+    assert slots["peak_in_use"] <= max(CONCURRENCY_LEVELS)
+    assert slots["in_use"] == 0
+
+
+def test_concurrency_limit():
+    """同时进行的推理数不超过 max_concurrency，超出的调用排队等待"""
+    translator = ChineseEnglishTranslator(backend="stub", max_concurrency=2)
+    _, mismatches = _run_clients(
+        8, 5,
+        lambda text: translator.translate_batch([text], "zh")[0],
+        lambda text: f"[opus-mt-zh-en] {text}"
+    )
+    assert not mismatches
+    slots = translator.get_load_stats()["concurrency"]["slots"]["zh"]
+    assert slots["slots"] == 2
+    assert slots["peak_in_use"] == 2
+    assert slots["waits"] > 0
+
+
+@pytest.mark.skipif(not os.path.isdir(MODEL_PATH), reason="未设置 TRANSLATOR_TEST_MODEL 本地模型目录")
+def test_model_outputs_under_concurrency():
+    """真实模型：并发翻译的结果和生成的token数与串行翻译完全一致"""
+    pytest.importorskip("torch")
+    translator = ChineseEnglishTranslator(model_names={"zh": MODEL_PATH}, max_concurrency=4,
+                                          num_threads=1, dictionary_shortcut=False)
+    sentences = [f"第{i}个句子，用来检查并发推理的结果。" for i in range(16)]
+    reference = {}
+    steps = {}
+    for text in sentences:
+        [reference[text]], [steps[text]] = translator.translate_batch([text], "zh", preset="fast", with_steps=True)
+
+    errors = []
+
+    def client(seed):
+        order = sentences[:]
+        random.Random(seed).shuffle(order)
+        for text in order:
+            [result], [count] = translator._generate([text], "zh", "fast")
+            if result != reference[text] or count != steps[text]:
+                errors.append((text, result))
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors[:3]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+例句语料库测试
+编译一个小语料，检查单词查询的排名、短语的位置校验以及由重复词组成的短语
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from example_corpus import ExampleCorpus, build_corpus
+
+PAIRS = [
+    ("It is very very cold today.", "今天非常非常冷。"),
+    ("The soup is very hot.", "汤很烫。"),
+    ("Very good, very nice.", "很好，很不错。"),
+    ("Make sure you lock the door.", "一定要锁门。"),
+    ("I am sure you will make it.", "我相信你会成功的。"),
+    ("The soup is very hot.", "汤很烫。"),
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / "examples.db")
+    build_corpus(PAIRS, path)
+    corpus = ExampleCorpus(path)
+    yield corpus
+    corpus.close()
+
+
+def test_word_search_ranking(corpus):
+    """单词查询按排名返回，重复出现的句对合并计数"""
+    results = corpus.search("soup")
+    assert [item["en"] for item in results] == ["The soup is very hot."]
+    assert results[0]["frequency"] == 2
+    assert len(corpus) == 5
+
+
+def test_phrase_requires_adjacent_words(corpus):
+    """短语要求各词按顺序连续出现"""
+    assert [item["en"] for item in corpus.search("make sure")] == ["Make sure you lock the door."]
+    assert corpus.search("sure make") == []
+
+
+def test_repeated_word_phrase(corpus):
+    """全部由同一个词组成的短语只在该词连续出现时命中"""
+    assert [item["en"] for item in corpus.search("very very")] == ["It is very very cold today."]
+    assert corpus.search("very very very") == []
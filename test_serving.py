@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有界推理队列测试
+检查队列满、排空和超时时抛出的异常，以及Web接口对应返回的429/503/504
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from serving import InferenceQueue, QueueFullError, ServiceDrainingError
+
+
+@pytest.fixture
+def blocked_queue():
+    """唯一的工作线程被占住的队列，新任务只能排队"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(10)
+
+    queue = InferenceQueue(max_queue_size=2, num_workers=1, default_timeout=0.2)
+    queue.submit_async(block)
+    assert started.wait(5)
+    yield queue
+    release.set()
+    queue.drain(5)
+
+
+def test_queue_full(blocked_queue):
+    """队列满时立即拒绝"""
+    blocked_queue.submit_async(lambda: None)
+    blocked_queue.submit_async(lambda: None)
+    with pytest.raises(QueueFullError):
+        blocked_queue.submit_async(lambda: None)
+    assert blocked_queue.stats()["rejected"] == 1
+
+
+def test_timeout_cancels_queued_task(blocked_queue):
+    """等待超时抛出 TimeoutError，排队中的任务被取消、不再执行"""
+    ran = threading.Event()
+    with pytest.raises(TimeoutError):
+        blocked_queue.submit(ran.set)
+    with pytest.raises(TimeoutError):
+        blocked_queue.submit_stream(lambda: iter([ran.set()]))
+    assert blocked_queue.stats()["timeouts"] == 2
+    assert not ran.is_set()
+
+
+def test_draining_rejects_new_tasks():
+    """排空时已入队的任务执行完，新任务被拒绝"""
+    queue = InferenceQueue(max_queue_size=4, num_workers=1)
+    future = queue.submit_async(lambda: "done")
+    assert queue.drain(5)
+    assert future.result() == "done"
+    with pytest.raises(ServiceDrainingError):
+        queue.submit(lambda: None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """桩后端翻译器 + 可替换推理队列的测试客户端"""
+    pytest.importorskip("flask")
+    import web_app
+    from translator import ChineseEnglishTranslator
+
+    monkeypatch.setattr(web_app, "translator", ChineseEnglishTranslator(backend="stub", cache=None))
+    monkeypatch.setattr(web_app, "REQUEST_TIMEOUT", 0.2)
+    return web_app, web_app.app.test_client()
+
+
+def test_http_queue_full(client, blocked_queue, monkeypatch):
+    """队列满时翻译接口（含流式接口）返回429和 Retry-After"""
+    web_app, http = client
+    monkeypatch.setattr(web_app, "inference_queue", blocked_queue)
+    blocked_queue.submit_async(lambda: None)
+    blocked_queue.submit_async(lambda: None)
+
+    response = http.post("/api/translate/batch", json={"texts": ["你好"], "source_lang": "zh"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    response = http.post("/api/translate/stream", json={"text": "你好", "source_lang": "zh"})
+    assert response.status_code == 429
+
+
+def test_http_timeout(client, blocked_queue, monkeypatch):
+    """排队超时返回504"""
+    web_app, http = client
+    monkeypatch.setattr(web_app, "inference_queue", blocked_queue)
+
+    response = http.post("/api/translate/batch", json={"texts": ["你好"], "source_lang": "zh"})
+    assert response.status_code == 504
+    assert "error" in response.get_json()
+
+
+def test_http_draining(client, monkeypatch):
+    """排空期间翻译接口和健康检查返回503"""
+    web_app, http = client
+    queue = InferenceQueue(max_queue_size=4, num_workers=1)
+    monkeypatch.setattr(web_app, "inference_queue", queue)
+
+    response = http.post("/api/translate/batch", json={"texts": ["你好"], "source_lang": "zh"})
+    assert response.get_json()["translations"] == ["[opus-mt-zh-en] 你好"]
+
+    queue.drain(5)
+    response = http.post("/api/translate/batch", json={"texts": ["你好"], "source_lang": "zh"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert http.get("/api/health").status_code == 503
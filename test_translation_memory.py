@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译记忆库测试
+检查完全匹配、模糊匹配的开关以及差异含数字或否定词时不复用相似句
+"""
+
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from translation_memory import EXACT, FUZZY, FUZZY_THRESHOLD, TranslationMemory, meaning_differs
+
+PRICE = "The price of this item is 1999 yuan including shipping."
+NOTICE = "Please do not turn off the computer during the update process."
+
+
+def test_exact_only_by_default():
+    """默认只做完全匹配，原文规范化（合并空白、全角转半角）后相同才命中"""
+    memory = TranslationMemory()
+    memory.add(PRICE, "这件商品含运费1999元。", "en")
+    match = memory.lookup("The  price of this item is 1999 yuan including shipping.", "en")
+    assert match["match"] == EXACT
+    assert memory.lookup("The price of this item is 1999 yuan, including shipping.", "en") is None
+    assert memory.lookup(PRICE, "zh") is None
+
+
+def test_fuzzy_match_when_enabled():
+    """开启模糊匹配后，只有标点等不同的相似句复用译文"""
+    memory = TranslationMemory(threshold=FUZZY_THRESHOLD)
+    memory.add(PRICE, "这件商品含运费1999元。", "en")
+    match = memory.lookup("The price of this item is 1999 yuan, including shipping.", "en")
+    assert match["match"] == FUZZY
+    assert match["translation"] == "这件商品含运费1999元。"
+    assert FUZZY_THRESHOLD <= match["similarity"] < 1.0
+
+
+def test_fuzzy_rejects_numbers_and_negation():
+    """差异部分含有数字或否定词的相似句不复用"""
+    memory = TranslationMemory(threshold=FUZZY_THRESHOLD)
+    memory.add(PRICE, "这件商品含运费1999元。", "en")
+    memory.add(NOTICE, "更新过程中请不要关机。", "en")
+    assert memory.lookup(PRICE.replace("1999", "2999"), "en") is None
+    assert memory.lookup(NOTICE.replace("do not ", "do "), "en") is None
+    assert memory.stats()["fuzzy_rejected"] == 2
+
+
+def test_meaning_differs():
+    assert meaning_differs("请不要关机", "请要关机")
+    assert meaning_differs("共三件", "共五件")
+    assert meaning_differs("I can do it", "I can't do it")
+    assert not meaning_differs("Very good.", "Very good!")
+
+
+def test_max_entries_evicts_least_recently_used():
+    """超出句对数上限时淘汰最久未用的句对，桶中的记录一并删除"""
+    memory = TranslationMemory(threshold=FUZZY_THRESHOLD, max_entries=2)
+    memory.add("今天天气很好", "The weather is nice today.", "zh")
+    memory.add("我们明天去爬山", "We will go hiking tomorrow.", "zh")
+    assert memory.lookup("今天天气很好", "zh") is not None
+    memory.add("这本书非常有意思", "This book is very interesting.", "zh")
+
+    assert len(memory) == 2
+    assert memory.lookup("我们明天去爬山", "zh") is None
+    assert memory.lookup("今天天气很好", "zh") is not None
+    assert memory.stats()["evictions"] == 1
+    live = set(memory._entries["zh"])
+    assert all(entry_id in live for bucket in memory._buckets["zh"].values() for entry_id in bucket)
+
+
+def test_learned_entries_bound_to_model():
+    """学到的译文只对产生它的模型（版本、预设）有效，导入的句对对所有模型有效"""
+    memory = TranslationMemory()
+    memory.add("今天天气很好", "old model output", "zh", "opus-mt-zh-en")
+    memory.add("我们明天去爬山", "We will go hiking tomorrow.", "zh")
+    assert memory.lookup("今天天气很好", "zh", "opus-mt-zh-en")["translation"] == "old model output"
+    assert memory.lookup("今天天气很好", "zh", "opus-mt-zh-en:v2") is None
+    assert memory.lookup("我们明天去爬山", "zh", "opus-mt-zh-en:v2") is not None
+
+
+def test_import_export_roundtrip(tmp_path):
+    """导出的 JSON Lines 可以原样导入，模型标识随之保留，无效记录被跳过"""
+    memory = TranslationMemory()
+    imported = memory.import_entries([
+        {"source": "今天天气很好", "target": "The weather is nice today.", "source_lang": "zh"},
+        {"source": "Good morning", "target": "早上好", "source_lang": "en", "model": "opus-mt-en-zh"},
+        {"source": "  ", "target": "空白原文"},
+        {"source": "没有译文"},
+    ])
+    assert imported == 2
+
+    path = str(tmp_path / "memory.jsonl")
+    assert memory.save(path) == 2
+    restored = TranslationMemory()
+    assert restored.load(path) == 2
+    assert restored.export_entries() == memory.export_entries()
+    assert restored.lookup("Good morning", "en", "opus-mt-en-zh")["translation"] == "早上好"
+    assert restored.lookup("Good morning", "en", "opus-mt-en-zh@fast") is None
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程推理工作池测试
+使用桩后端，检查推理进程被杀后任务失败、进程被补上，并且之后的任务仍能完成
+"""
+
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from translator import ChineseEnglishTranslator
+from worker_pool import ProcessWorkerPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="工作池只支持 fork 启动方式")
+
+
+def _make_pool(batch_latency_ms=None):
+    translator = ChineseEnglishTranslator(backend="stub", cache=None)
+    if batch_latency_ms is not None:
+        # 在fork之前调慢桩模型，推理进程继承这个设置
+        translator._get_translator("zh").batch_latency_ms = batch_latency_ms
+    return ProcessWorkerPool(translator, num_workers=2, pin_cpus=False, warmup=["zh"])
+
+
+def _wait_for_restart(pool, restarts=1, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while pool.stats()["restarts"] < restarts:
+        assert time.monotonic() < deadline, "推理进程没有被重新启动"
+        time.sleep(0.05)
+
+
+def test_idle_worker_killed():
+    """空闲的推理进程被杀后补上新进程，之后提交的任务都能完成"""
+    pool = _make_pool()
+    try:
+        os.kill(pool.stats()["workers"][1]["pid"], signal.SIGKILL)
+        _wait_for_restart(pool)
+
+        texts = [f"第{i}句" for i in range(6)]
+        futures = [pool.translate_batch_async([text], "zh") for text in texts]
+        assert [future.result(timeout=10)[0] for future in futures] == [
+            f"[opus-mt-zh-en] {text}" for text in texts]
+        assert all(worker["alive"] for worker in pool.stats()["workers"])
+    finally:
+        pool.close()
+
+
+def test_busy_worker_killed():
+    """正在推理的进程被杀时它的任务以 RuntimeError 结束，不会一直等待"""
+    pool = _make_pool(batch_latency_ms=5000)
+    try:
+        future = pool.submit("_generate", ["被杀掉的任务"], "zh", None)
+        worker = next(worker for worker in pool.stats()["workers"] if worker["pending"])
+        os.kill(worker["pid"], signal.SIGKILL)
+        with pytest.raises(RuntimeError, match="异常退出"):
+            future.result(timeout=10)
+        _wait_for_restart(pool)
+        assert pool.stats()["pending"] == 0
+    finally:
+        pool.close()
+
+
+def test_spare_takes_over():
+    """异常退出的进程由启动时预先fork的备用进程顶替，并补上新的备用进程"""
+    pool = _make_pool()
+    try:
+        spare = pool.stats()["spare"]
+        os.kill(pool.stats()["workers"][0]["pid"], signal.SIGKILL)
+        _wait_for_restart(pool)
+
+        stats = pool.stats()
+        assert stats["workers"][0]["pid"] == spare
+        assert stats["spare"] not in (None, spare)
+        assert pool.translate_batch_async(["备用进程"], "zh").result(timeout=10) == ["[opus-mt-zh-en] 备用进程"]
+    finally:
+        pool.close()
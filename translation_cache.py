@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译结果缓存
+内存LRU + TTL淘汰，可选SQLite持久化，重启后热点数据仍然可用
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """规范化缓存键文本：NFKC（全角转半角等）、去首尾空白、合并连续空白"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def make_cache_key(text: str, source_lang: str, model_name: str) -> str:
+    """由规范化文本、翻译方向和模型名组成缓存键"""
+    direction = "zh-en" if source_lang == "zh" else "en-zh"
+    return f"{direction}\x1f{model_name}\x1f{normalize_text(text)}"
+
+
+class SQLiteCacheBackend:
+    """基于SQLite的持久化缓存后端"""
+
+    def __init__(self, path: str):
+        """打开（或创建）缓存数据库"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translation_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        """读取 (译文, 过期时间)，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM translation_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def set(self, key: str, value: str, expires_at: Optional[float]):
+        """写入一条缓存"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translation_cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        """删除一条缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM translation_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def recent(self, limit: int):
+        """按最近写入时间返回 (键, 译文, 过期时间)，用于启动时预热内存"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, value, expires_at FROM translation_cache "
+                "ORDER BY accessed_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def purge_expired(self) -> int:
+        """清理已过期的记录，返回删除条数"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM translation_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class TranslationCache:
+    """翻译结果缓存
+
+    内存中是容量为 max_size 的LRU，每条记录在 ttl_seconds 秒后过期
+    （ttl_seconds 为 None 表示永不过期）。配置了 backend 时，所有写入
+    同时落盘；内存未命中会再查后端，命中后提升回内存。
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = 3600,
+                 backend: Optional[SQLiteCacheBackend] = None, preload: bool = True):
+        """初始化缓存"""
+        if max_size < 1:
+            raise ValueError("max_size 必须大于 0")
+
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "backend_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "sets": 0
+        }
+
+        if backend is not None:
+            backend.purge_expired()
+            if preload:
+                self._preload()
+
+    def _preload(self):
+        """从持久化后端加载最近使用的热点数据"""
+        now = time.time()
+        rows = self.backend.recent(self.max_size)
+        with self._lock:
+            # recent() 按时间倒序，反向插入使最近的记录位于LRU尾部
+            for key, value, expires_at in reversed(rows):
+                if expires_at is None or expires_at > now:
+                    self._entries[key] = (value, expires_at)
+
+    def get(self, text: str, source_lang: str, model_name: str) -> Optional[str]:
+        """查询缓存，未命中返回 None"""
+        key = make_cache_key(text, source_lang, model_name)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                if self.backend is not None:
+                    self.backend.delete(key)
+                self._stats["misses"] += 1
+                return None
+
+        if self.backend is not None:
+            row = self.backend.get(key)
+            if row is not None:
+                value, expires_at = row
+                if expires_at is None or expires_at > now:
+                    with self._lock:
+                        self._insert(key, value, expires_at)
+                        self._stats["hits"] += 1
+                        self._stats["backend_hits"] += 1
+                    return value
+                self.backend.delete(key)
+                with self._lock:
+                    self._stats["expirations"] += 1
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, text: str, source_lang: str, model_name: str, translation: str):
+        """写入缓存"""
+        key = make_cache_key(text, source_lang, model_name)
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds is not None else None
+
+        with self._lock:
+            self._insert(key, translation, expires_at)
+            self._stats["sets"] += 1
+
+        if self.backend is not None:
+            self.backend.set(key, translation, expires_at)
+
+    def _insert(self, key: str, value: str, expires_at: Optional[float]):
+        """插入内存LRU，超出容量时淘汰最久未使用的记录（调用方需持有锁）"""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        """清空内存缓存（不影响持久化后端）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """返回命中、未命中、淘汰等计数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_size"] = self.max_size
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["persistent"] = self.backend is not None
+        if self.backend is not None:
+            stats["backend_size"] = len(self.backend)
+        return stats
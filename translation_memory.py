@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译记忆库
+按原文的字符 n-gram 计算 MinHash 签名，再按 LSH 分段放入桶中；查询时只在同桶的候选句中
+计算真实的 Jaccard 相似度，完全相同或相似度达到阈值的句子直接复用已有译文，不再调用模型。
+适合模板化的商品描述等大量近似重复的文本。模糊匹配默认关闭，开启后差异部分含有数字或否定词的
+相似句也不会复用
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from translation_cache import normalize_text
+
+# 字符 n-gram 长度
+SHINGLE_SIZE = 3
+
+# MinHash 签名长度 = 分段数 * 每段行数；相似度约 (1/BANDS)^(1/ROWS)≈0.5 以上的句子大概率落入同一个桶
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+
+# 默认只做完全匹配：相似句的译文可能是另一个意思（价格、日期、否定不同）
+DEFAULT_THRESHOLD = 1.0
+
+# 开启模糊匹配时建议的 Jaccard 相似度阈值
+FUZZY_THRESHOLD = 0.85
+
+# 按共同桶数排序后最多校验的候选句数（共同桶数越多，估计相似度越高）
+MAX_VERIFY = 8
+
+# 每个桶最多保留的句子数，模板化文本集中在少数桶时限制候选数量
+MAX_BUCKET_SIZE = 64
+
+# 每个方向默认最多保留的句对数，超出时淘汰最久未用的句对
+DEFAULT_MAX_ENTRIES = 100000
+
+# 匹配类型
+EXACT = "exact"
+FUZZY = "fuzzy"
+
+# 差异部分含有这些词（或中文字）时不复用相似句的译文，意思可能正好相反
+NEGATION_WORDS = frozenset({"not", "no", "never", "none", "nor", "neither", "without", "cannot"})
+NEGATION_CHARS = frozenset("不没无非未别勿莫否")
+
+# 英文按单词、其他文字按单个字符切分，用于找出两句话的差异部分
+_TOKEN_RE = re.compile(r"[a-z0-9']+|\S")
+
+def _hash_masks(count: int) -> List[int]:
+    """固定种子生成的64位异或掩码，保证签名在进程之间一致"""
+    state = 0x9E3779B97F4A7C15
+    masks = []
+    for _ in range(count):
+        state = (state * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+        masks.append(state)
+    return masks
+
+
+# 每个掩码相当于一个哈希函数：与 n-gram 的64位哈希异或后取最小值
+_HASH_MASKS = _hash_masks(MINHASH_BANDS * MINHASH_ROWS)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """规范化（NFKC、小写、合并空白）后的字符 n-gram 集合，短于 size 的文本整体作为一个元素"""
+    text = normalize_text(text).lower()
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """两个集合的 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def _is_critical(token: str) -> bool:
+    """数字（含中文数字）或否定词"""
+    return (any(char.isnumeric() for char in token) or token in NEGATION_WORDS
+            or token in NEGATION_CHARS or token.endswith("n't"))
+
+
+def meaning_differs(a: str, b: str) -> bool:
+    """两句话的差异部分是否含有数字或否定词，含有时不能用一句的译文代替另一句"""
+    tokens_a = _TOKEN_RE.findall(normalize_text(a).lower())
+    tokens_b = _TOKEN_RE.findall(normalize_text(b).lower())
+    matcher = difflib.SequenceMatcher(None, tokens_a, tokens_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal" and any(map(_is_critical, tokens_a[i1:i2] + tokens_b[j1:j2])):
+            return True
+    return False
+
+
+def _hash64(item: str) -> int:
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(items: Set[str]) -> List[int]:
+    """集合的 MinHash 签名（map 在C层完成异或，一句话约0.3毫秒）"""
+    hashes = [_hash64(item) for item in items]
+    return [min(map(mask.__xor__, hashes)) for mask in _HASH_MASKS]
+
+
+def band_keys(signature: List[int]) -> List[Tuple[int, ...]]:
+    """把签名切成 LSH 分段，每段（带上段号）是一个桶键"""
+    return [
+        (band,) + tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+class TranslationMemory:
+    """线程安全的内存翻译记忆库
+
+    threshold 为模糊匹配的相似度阈值，默认 1.0 只做完全匹配，开启模糊匹配可用 FUZZY_THRESHOLD；
+    learn=True 时模型的新译文也会写入记忆库，后续相似输入直接复用。
+    max_entries 为每个方向最多保留的句对数，超出时按最近最少使用淘汰，None 表示不限制。
+    学到的译文带有产生它的模型标识（含版本和解码预设），只在用同一个模型查询时复用；
+    导入的句对不带模型标识，对所有模型都有效。
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, learn: bool = True,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"相似度阈值必须在 (0, 1] 之间: {threshold}")
+        if max_entries is not None and max_entries < 1:
+            raise ValueError(f"句对数上限必须大于0: {max_entries}")
+        self.threshold = threshold
+        self.learn = learn
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 每个方向: 句子编号 -> (规范化原文, 原文, 译文, 模型标识, 所在的桶)，最近使用的排在后面；
+        # 规范化原文 -> 句子编号；LSH 桶 -> 句子编号列表
+        self._entries: Dict[str, "OrderedDict[int, Tuple]"] = {"zh": OrderedDict(), "en": OrderedDict()}
+        self._exact: Dict[str, Dict[str, int]] = {"zh": {}, "en": {}}
+        self._buckets: Dict[str, Dict[Tuple[int, ...], List[int]]] = {"zh": {}, "en": {}}
+        # 句子编号只增不减，越大越新
+        self._next_id = 0
+        self._evictions = 0
+        self._lookups = 0
+        self._exact_hits = 0
+        self._fuzzy_hits = 0
+        self._fuzzy_rejected = 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, source: str, target: str, source_lang: str = "zh", model: Optional[str] = None):
+        """写入一条句对；原文已存在时更新译文。model 为产生译文的模型标识，人工译文为 None"""
+        key = normalize_text(source)
+        if not key or not target:
+            return
+        items = shingles(source)
+        keys = band_keys(minhash(items)) if self.threshold < 1.0 else []
+        with self._lock:
+            entries = self._entries[source_lang]
+            entry_id = self._exact[source_lang].get(key)
+            if entry_id is not None:
+                bucket_keys = entries[entry_id][4]
+                entries[entry_id] = (key, source, target, model, bucket_keys)
+                entries.move_to_end(entry_id)
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self._exact[source_lang][key] = entry_id
+            buckets = self._buckets[source_lang]
+            bucket_keys = []
+            for bucket_key in keys:
+                bucket = buckets.setdefault(bucket_key, [])
+                if len(bucket) < MAX_BUCKET_SIZE:
+                    bucket.append(entry_id)
+                    bucket_keys.append(bucket_key)
+            entries[entry_id] = (key, source, target, model, bucket_keys)
+            while self.max_entries is not None and len(entries) > self.max_entries:
+                self._evict(source_lang)
+
+    def _evict(self, source_lang: str):
+        """在持有 self._lock 时淘汰最久未用的句对，连同它在完全匹配表和桶中的记录"""
+        entry_id, (key, _, _, _, bucket_keys) = self._entries[source_lang].popitem(last=False)
+        del self._exact[source_lang][key]
+        buckets = self._buckets[source_lang]
+        for bucket_key in bucket_keys:
+            bucket = buckets[bucket_key]
+            bucket.remove(entry_id)
+            if not bucket:
+                del buckets[bucket_key]
+        self._evictions += 1
+
+    def lookup(self, text: str, source_lang: str = "zh", model: Optional[str] = None) -> Optional[Dict]:
+        """查询记忆库，命中时返回 {"translation", "source", "match", "similarity"}，否则返回 None
+
+        model 为当前使用的模型标识，其他模型学到的译文不会返回。
+        """
+        key = normalize_text(text)
+        with self._lock:
+            self._lookups += 1
+            entries = self._entries[source_lang]
+            entry_id = self._exact[source_lang].get(key)
+            if entry_id is not None and entries[entry_id][3] in (None, model):
+                self._exact_hits += 1
+                entries.move_to_end(entry_id)
+                _, source, target, _, _ = entries[entry_id]
+                return {"translation": target, "source": source, "match": EXACT, "similarity": 1.0}
+        if self.threshold >= 1.0:
+            return None
+
+        items = shingles(text)
+        keys = band_keys(minhash(items))
+        with self._lock:
+            buckets = self._buckets[source_lang]
+            counts = Counter(entry_id for bucket_key in keys for entry_id in buckets.get(bucket_key, ()))
+            # 共同桶数相同时较新的句子在前
+            top = sorted(counts, key=lambda entry_id: (-counts[entry_id], -entry_id))[:MAX_VERIFY]
+            entries = [(entry_id,) + self._entries[source_lang][entry_id][1:3] for entry_id in top
+                       if self._entries[source_lang][entry_id][3] in (None, model)]
+
+        best = None
+        best_similarity = self.threshold
+        rejected = False
+        for entry_id, source, target in entries:
+            similarity = jaccard(items, shingles(source))
+            if similarity > best_similarity or (best is None and similarity == best_similarity):
+                if meaning_differs(text, source):
+                    rejected = True
+                    continue
+                best, best_similarity = (entry_id, source, target), similarity
+        if best is None:
+            if rejected:
+                with self._lock:
+                    self._fuzzy_rejected += 1
+            return None
+        with self._lock:
+            self._fuzzy_hits += 1
+            # 校验期间可能已被淘汰
+            if best[0] in self._entries[source_lang]:
+                self._entries[source_lang].move_to_end(best[0])
+        return {"translation": best[2], "source": best[1], "match": FUZZY,
+                "similarity": round(best_similarity, 4)}
+
+    def import_entries(self, entries: Iterable[Dict]) -> int:
+        """批量导入 {"source", "target", "source_lang"} 记录（可带 "model"），返回导入条数"""
+        count = 0
+        for entry in entries:
+            source = entry.get("source", "")
+            target = entry.get("target", "")
+            source_lang = "en" if entry.get("source_lang") == "en" else "zh"
+            if normalize_text(source) and target:
+                self.add(source, target, source_lang, entry.get("model"))
+                count += 1
+        return count
+
+    def export_entries(self) -> List[Dict]:
+        """导出全部句对，格式与 import_entries 相同"""
+        exported = []
+        with self._lock:
+            for source_lang, entries in self._entries.items():
+                for _, source, target, model, _ in entries.values():
+                    entry = {"source": source, "target": target, "source_lang": source_lang}
+                    if model:
+                        entry["model"] = model
+                    exported.append(entry)
+        return exported
+
+    def load(self, path: str) -> int:
+        """从 JSON Lines 文件导入，返回导入条数"""
+        with open(path, "r", encoding="utf-8") as f:
+            return self.import_entries(json.loads(line) for line in f if line.strip())
+
+    def save(self, path: str) -> int:
+        """导出到 JSON Lines 文件，返回导出条数"""
+        entries = self.export_entries()
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return len(entries)
+
+    def stats(self) -> Dict:
+        """句对数量、查询次数和完全/模糊命中率"""
+        with self._lock:
+            hits = self._exact_hits + self._fuzzy_hits
+            return {
+                "entries": {lang: len(entries) for lang, entries in self._entries.items()},
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "threshold": self.threshold,
+                "learn": self.learn,
+                "lookups": self._lookups,
+                "exact_hits": self._exact_hits,
+                "fuzzy_hits": self._fuzzy_hits,
+                "fuzzy_rejected": self._fuzzy_rejected,
+                "match_rate": hits / self._lookups if self._lookups else 0.0
+            }
@@ -5,75 +5,301 @@
 支持翻译和英文例句查询
 """
 
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
-import re
 import json
 import os
-from typing import List, Dict, Optional, Tuple
+import re
+import sys
+import threading
+import time
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+
+from segmenter import (split_sentences, split_long_sentence, bucket_by_length,
+                       join_translations, output_separator)
+from backends import create_translation_pipeline
+from dictionary_store import open_dictionary
+from lookup_index import LookupEngine, tokenize_words
+from decoding import generation_kwargs, validate_preset
+from model_registry import ModelRegistry
+from pipeline_pool import PipelinePool
+from reverse_index import EXACT
+from example_corpus import ExampleCorpus
+from language import detect_language, resolve_language, translate_mixed
+from metrics import (BATCH_SIZE, TRANSLATION_MEMORY_HITS, TRANSLATION_SOURCES, direction_label,
+                     instrument_pipeline, profiling, stage)
+
+# 使用Helsinki-NLP的OPUS-MT模型进行中英翻译，键为源语言
+DEFAULT_MODEL_NAMES = {
+    "zh": "Helsinki-NLP/opus-mt-zh-en",
+    "en": "Helsinki-NLP/opus-mt-en-zh"
+}
+
+# 不超过这个字数的纯中文输入先查反向词典，释义完全匹配时直接返回英文词头、不调用模型
+DICTIONARY_SHORTCUT_MAX_CHARS = 4
+_SHORT_CHINESE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]{1,%d}" % DICTIONARY_SHORTCUT_MAX_CHARS)
+
+# 每个单词返回的例句数
+EXAMPLES_PER_WORD = 3
+
+# 主模型加载失败时使用的备用模型
+FALLBACK_MODEL = "t5-small"
 
 
 class ChineseEnglishTranslator:
-    """中英翻译器类"""
+    """中英翻译器类
+    
+    翻译模型按方向懒加载：第一次用到某个方向时才导入 torch/transformers
+    并加载对应模型，只查字典时不会加载任何模型。
+    """
     
-    def __init__(self):
-        """初始化翻译器"""
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"使用设备: {self.device}")
+    def __init__(self, cache=None, warmup: Optional[List[str]] = None,
+                 model_names: Optional[Dict[str, str]] = None,
+                 backend: str = "pytorch", num_threads: Optional[int] = None,
+                 onnx_cache_dir: Optional[str] = None,
+                 dictionary_path: Optional[str] = None,
+                 preset: Optional[str] = None,
+                 memory_budget_mb: Optional[float] = None,
+                 local_models_only: bool = False,
+                 dictionary_shortcut: bool = False,
+                 example_corpus_path: Optional[str] = None,
+                 memory=None,
+                 max_concurrency: int = 1,
+                 interop_threads: Optional[int] = None):
+        """初始化翻译器
         
-        # 初始化翻译模型
-        self._init_translation_models()
+        cache: 可选的 TranslationCache，命中时跳过模型推理
+        warmup: 需要在初始化时预先加载的方向列表，如 ["zh", "en"]
+        model_names: 覆盖默认模型（模型名或本地路径），键为源语言
+        backend: 推理后端，"pytorch"、"quantized"（动态int8）、"onnx" 或 "stub"（离线测试用桩后端）
+        num_threads: 每次推理使用的算子内线程数（intra-op），None 时按 CPU 核数除以 max_concurrency，
+                     max_concurrency 为1时使用框架默认值
+        onnx_cache_dir: onnx 后端导出模型的缓存目录
+        dictionary_path: 编译好的字典文件（见 dictionary_store.py），None 时使用内置字典
+        preset: 默认解码预设（fast/balanced/quality，见 decoding.py），None 时使用模型自带的生成配置
+        memory_budget_mb: 已加载模型的内存预算，超出时卸载最近最少使用的模型（见 model_registry.py）
+        local_models_only: 只从本地目录加载模型，加载失败时也不再尝试下载备用模型
+        dictionary_shortcut: 短中文输入先查反向词典，命中时不调用模型（默认关闭，译文与模型输出不同）
+        example_corpus_path: 编译好的例句语料库（见 example_corpus.py），None 时例句取自字典词条
+        memory: 可选的 TranslationMemory，完全或模糊命中时复用已有译文，跳过模型推理
+        max_concurrency: 每个方向允许同时进行的推理数（见 pipeline_pool.py），超出的调用排队等待
+        interop_threads: torch/ONNX Runtime 的算子间线程池大小（inter-op），None 表示框架默认值
+        """
+        self.cache = cache
+        self.memory = memory
+        self.backend = backend
+        self.max_concurrency = max(1, max_concurrency)
+        # 多个推理同时进行时按并发度分配核数，避免每个推理都占满全部核心
+        if num_threads is None and self.max_concurrency > 1 and backend != "stub":
+            num_threads = max(1, (os.cpu_count() or 1) // self.max_concurrency)
+        self.num_threads = num_threads
+        self.interop_threads = interop_threads
+        self.onnx_cache_dir = onnx_cache_dir
+        self.dictionary_path = dictionary_path
+        self.preset = validate_preset(preset)
+        self.dictionary_shortcut = dictionary_shortcut
+        self.example_corpus_path = example_corpus_path
+        self.model_names = dict(DEFAULT_MODEL_NAMES)
+        if model_names:
+            self.model_names.update(model_names)
+        
+        self._device = None
+        self._fallback_lock = threading.Lock()
+        # 每个方向的推理槽位，模型被切换或重新加载后重建
+        self._pools: Dict[str, PipelinePool] = {}
+        self._pools_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.registry = ModelRegistry(self._load_model, memory_budget_mb, local_models_only,
+                                      on_unload=self._drop_pools)
+        for model_name in self.model_names.values():
+            self.registry.register(model_name)
+        self._load_stats = {
+            lang: {"fallback": False, "first_call_ms": None,
+                   "steady_calls": 0, "steady_total_ms": 0.0}
+            for lang in self.model_names
+        }
         
         # 初始化字典数据
         self._init_dictionary()
+        
+        # 预热指定方向的翻译模型
+        if warmup:
+            self._init_translation_models(warmup)
     
-    def _init_translation_models(self):
-        """初始化翻译模型"""
-        try:
-            # 使用Helsinki-NLP的OPUS-MT模型进行中英翻译
-            model_name_zh_en = "Helsinki-NLP/opus-mt-zh-en"
-            model_name_en_zh = "Helsinki-NLP/opus-mt-en-zh"
-            
-            print("正在加载中英翻译模型...")
-            self.zh_en_translator = pipeline(
-                "translation", 
-                model=model_name_zh_en, 
-                device=0 if self.device == "cuda" else -1
-            )
-            
-            print("正在加载英中翻译模型...")
-            self.en_zh_translator = pipeline(
-                "translation", 
-                model=model_name_en_zh, 
-                device=0 if self.device == "cuda" else -1
-            )
-            
-            print("翻译模型加载完成!")
-            
-        except Exception as e:
-            print(f"模型加载失败: {e}")
-            print("尝试使用备用模型...")
-            self._load_fallback_models()
+    @property
+    def device(self) -> str:
+        """推理设备，首次访问时才导入 torch"""
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"使用设备: {self._device}")
+        return self._device
     
-    def _load_fallback_models(self):
-        """加载备用翻译模型"""
-        try:
-            # 备用模型
-            fallback_model = "t5-small"
-            self.zh_en_translator = pipeline(
-                "translation", 
-                model=fallback_model, 
-                device=0 if self.device == "cuda" else -1
-            )
-            self.en_zh_translator = self.zh_en_translator
-            print("备用模型加载完成!")
-        except Exception as e:
-            print(f"备用模型也加载失败: {e}")
-            raise
+    @property
+    def zh_en_translator(self):
+        """中译英pipeline（懒加载）"""
+        return self._get_translator("zh")
+    
+    @property
+    def en_zh_translator(self):
+        """英译中pipeline（懒加载）"""
+        return self._get_translator("en")
+    
+    def _get_translator(self, source_lang: str):
+        """获取指定方向的翻译pipeline，未加载（或已被注册表卸载）时加载"""
+        direction = direction_label(source_lang)
+        model_name = self.model_names[source_lang]
+        # 热切换后的新pipeline也要加计时，instrument_pipeline 对已处理过的对象直接返回
+        if self.registry.is_loaded(model_name):
+            return instrument_pipeline(self.registry.get(model_name), direction)
+        
+        with stage("load", direction):
+            try:
+                pipeline = self.registry.get(model_name)
+            except Exception as e:
+                if self.registry.local_only or model_name == FALLBACK_MODEL:
+                    raise
+                print(f"模型加载失败: {e}")
+                print("尝试使用备用模型...")
+                pipeline = self._load_fallback_model(source_lang)
+        return instrument_pipeline(pipeline, direction)
+    
+    def _get_pool(self, source_lang: str) -> PipelinePool:
+        """获取指定方向的推理槽位（首次调用时加载模型）"""
+        pipeline = self._get_translator(source_lang)
+        pool = self._pools.get(source_lang)
+        if pool is None or pool.source is not pipeline:
+            with self._pools_lock:
+                pool = self._pools.get(source_lang)
+                if pool is None or pool.source is not pipeline:
+                    direction = direction_label(source_lang)
+                    pool = PipelinePool(pipeline, self.max_concurrency,
+                                        lambda pipe: instrument_pipeline(pipe, direction))
+                    self._pools[source_lang] = pool
+        return pool
+    
+    def _drop_pools(self, model_name: str):
+        """模型被注册表淘汰或替换后丢弃对应方向的推理槽位，释放槽位持有的pipeline"""
+        with self._pools_lock:
+            for lang, name in self.model_names.items():
+                if name == model_name:
+                    self._pools.pop(lang, None)
+    
+    def _init_translation_models(self, langs: Optional[List[str]] = None):
+        """预先加载翻译模型（默认两个方向都加载）"""
+        for lang in langs or list(self.model_names):
+            self._get_translator(lang)
+        print("翻译模型加载完成!")
+    
+    def _create_pipeline(self, model_name: str):
+        """按配置的推理后端创建翻译pipeline"""
+        # 桩后端不依赖 torch，不做设备检测
+        use_gpu = self.backend != "stub" and self.device == "cuda"
+        return create_translation_pipeline(
+            model_name,
+            backend=self.backend,
+            device=0 if use_gpu else -1,
+            num_threads=self.num_threads,
+            onnx_cache_dir=self.onnx_cache_dir,
+            interop_threads=self.interop_threads
+        )
+    
+    def _load_model(self, model_path: str):
+        """注册表的加载函数：加载一个翻译模型"""
+        print(f"正在加载翻译模型 {model_path}（{self.backend}）...")
+        return self._create_pipeline(model_path)
+    
+    def _load_fallback_model(self, source_lang: str):
+        """加载备用翻译模型，只替换加载失败的方向，并在统计中标记"""
+        with self._fallback_lock:
+            self.registry.register(FALLBACK_MODEL)
+            try:
+                translator = self.registry.get(FALLBACK_MODEL)
+            except Exception as e:
+                print(f"备用模型也加载失败: {e}")
+                raise
+            print(f"{direction_label(source_lang)} 方向改用备用模型 {FALLBACK_MODEL}")
+            self.model_names[source_lang] = FALLBACK_MODEL
+            self._load_stats[source_lang]["fallback"] = True
+            return translator
+    
+    def swap_model(self, source_lang: str, model_path: str, version: Optional[str] = None) -> Dict:
+        """不停服切换某个方向的模型版本，新版本加载完成前旧版本继续服务
+        
+        缓存键和翻译记忆库学到的译文都带有版本标签，切换后不会命中旧版本的译文。
+        """
+        return self.registry.swap(self.model_names[source_lang], model_path, version)
+    
+    def get_load_stats(self) -> Dict:
+        """冷启动与稳态耗时统计
+        
+        每个方向给出模型加载耗时、首次推理耗时（两者之和即冷启动开销）
+        以及之后推理的平均耗时（稳态），单位毫秒。
+        """
+        directions = {}
+        registry_stats = self.registry.stats()
+        for lang, stats in self._load_stats.items():
+            model = registry_stats["models"][self.model_names[lang]]
+            steady_calls = stats["steady_calls"]
+            cold_start_ms = None
+            if model["load_ms"] is not None and stats["first_call_ms"] is not None:
+                cold_start_ms = model["load_ms"] + stats["first_call_ms"]
+            directions[lang] = {
+                "model": self.model_names[lang],
+                "path": model["path"],
+                "version": model["version"],
+                "fallback": stats["fallback"],
+                "backend": self.backend,
+                "loaded": model["loaded"],
+                "memory_mb": model["memory_mb"],
+                "load_ms": model["load_ms"],
+                "first_call_ms": stats["first_call_ms"],
+                "cold_start_ms": cold_start_ms,
+                "steady_calls": steady_calls,
+                "steady_avg_ms": stats["steady_total_ms"] / steady_calls if steady_calls else None
+            }
+        return {
+            "directions": directions,
+            "registry": registry_stats,
+            "concurrency": {
+                "max_concurrency": self.max_concurrency,
+                "num_threads": self.num_threads,
+                "interop_threads": self.interop_threads,
+                "slots": {lang: pool.stats() for lang, pool in self._pools.items()}
+            },
+            "torch_imported": "torch" in sys.modules
+        }
+    
+    def _record_call(self, source_lang: str, elapsed_ms: float):
+        """记录一次模型推理耗时，区分首次调用与稳态调用"""
+        stats = self._load_stats[source_lang]
+        with self._stats_lock:
+            if stats["first_call_ms"] is None:
+                stats["first_call_ms"] = elapsed_ms
+            else:
+                stats["steady_calls"] += 1
+                stats["steady_total_ms"] += elapsed_ms
     
     def _init_dictionary(self):
-        """初始化英文字典数据"""
-        self.dictionary = {
+        """初始化英文字典数据
+        
+        配置了字典文件时按需从文件查询，否则使用内置的常用词字典。
+        """
+        if self.dictionary_path:
+            self.dictionary = open_dictionary(self.dictionary_path)
+            print(f"已打开字典文件: {self.dictionary_path}（{len(self.dictionary)} 个词条）")
+        else:
+            self.dictionary = self._builtin_dictionary()
+        
+        # 前缀补全、模糊匹配和词形还原
+        self.lookup = LookupEngine(self.dictionary)
+        
+        self.example_corpus = ExampleCorpus(self.example_corpus_path) if self.example_corpus_path else None
+        if self.example_corpus is not None:
+            print(f"已打开例句语料库: {self.example_corpus_path}（{len(self.example_corpus)} 条例句）")
+    
+    @staticmethod
+    def _builtin_dictionary() -> Dict[str, Dict]:
+        """内置的常用词字典"""
+        return {
             "hello": {
                 "pronunciation": "/həˈloʊ/",
                 "definitions": [
@@ -206,102 +432,468 @@ class ChineseEnglishTranslator:
             }
         }
     
-    def translate_chinese_to_english(self, chinese_text: str) -> str:
+    def translate_chinese_to_english(self, chinese_text: str, preset: Optional[str] = None) -> str:
         """中文翻译为英文"""
         try:
             if not chinese_text.strip():
                 return ""
             
             # 使用翻译模型进行翻译
-            result = self.zh_en_translator(chinese_text)
-            english_text = result[0]['translation_text']
-            
-            return english_text.strip()
+            return self.translate_batch([chinese_text], "zh", preset=preset)[0]
         except Exception as e:
             print(f"翻译错误: {e}")
             return f"翻译失败: {e}"
     
-    def translate_english_to_chinese(self, english_text: str) -> str:
+    def translate_english_to_chinese(self, english_text: str, preset: Optional[str] = None) -> str:
         """英文翻译为中文"""
         try:
             if not english_text.strip():
                 return ""
             
             # 使用翻译模型进行翻译
-            result = self.en_zh_translator(english_text)
-            chinese_text = result[0]['translation_text']
-            
-            return chinese_text.strip()
+            return self.translate_batch([english_text], "en", preset=preset)[0]
         except Exception as e:
             print(f"翻译错误: {e}")
             return f"翻译失败: {e}"
     
+    def _cache_model_key(self, source_lang: str, preset: Optional[str] = None) -> str:
+        """缓存键中的模型标识
+        
+        量化/ONNX后端的输出可能与fp32略有不同，不同解码预设和切换后的模型版本的译文也不同，都需要区分。
+        """
+        model_name = self.model_names[source_lang]
+        version = self.registry.version(model_name)
+        if version:
+            model_name = f"{model_name}:{version}"
+        if self.backend != "pytorch":
+            model_name = f"{model_name}#{self.backend}"
+        if preset:
+            model_name = f"{model_name}@{preset}"
+        return model_name
+    
+    def translate_batch(self, texts: List[str], source_lang: str = "zh",
+                        preset: Optional[str] = None, with_steps: bool = False):
+        """批量翻译，一次前向计算处理整批（自动padding）
+        
+        空字符串直接返回空结果，不进入模型；配置了缓存或翻译记忆库时命中的文本也不进入模型。
+        preset 为本次使用的解码预设，None 时使用翻译器的默认预设。
+        source_lang="auto" 时逐条检测语言，只翻译源语言片段（见 language.py）。
+        返回结果与输入顺序一致。with_steps=True 时返回 (结果, 每条文本实际解码的步数)，
+        缓存、翻译记忆库或词典命中的文本步数为0。模型异常会直接抛出，由调用方决定如何处理。
+        """
+        preset = validate_preset(preset or self.preset)
+        if source_lang == "auto":
+            if with_steps:
+                # 自动检测时同一片段可能在多条文本中出现，无法把步数对应到单条文本
+                raise ValueError("source_lang=\"auto\" 时不支持 with_steps")
+            return translate_mixed(texts, lambda batch, lang: self.translate_batch(batch, lang, preset))[0]
+        source_lang = "zh" if source_lang == "zh" else "en"
+        results, missing = self._lookup_cached(texts, source_lang, preset)
+        steps = [0] * len(texts)
+        if missing:
+            outputs, counts = self._generate([texts[i] for i in missing], source_lang, preset)
+            self._store_results(texts, source_lang, results, missing, outputs, preset)
+            for i, count in zip(missing, counts):
+                steps[i] = count
+        return (results, steps) if with_steps else results
+    
+    def _lookup_cached(self, texts: List[str], source_lang: str,
+                       preset: Optional[str] = None) -> Tuple[List[str], List[int]]:
+        """查缓存，返回 (结果列表, 需要模型翻译的下标)；空字符串直接得到空结果
+        
+        短中文输入先查反向词典（见 _dictionary_translation），命中的不进入缓存和模型；
+        缓存未命中的再查翻译记忆库。
+        """
+        model_name = self._cache_model_key(source_lang, preset)
+        direction = direction_label(source_lang)
+        results = [""] * len(texts)
+        missing = []
+        shortcut = self.dictionary_shortcut and source_lang == "zh"
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            if shortcut:
+                word = self._dictionary_translation(text.strip())
+                if word is not None:
+                    TRANSLATION_SOURCES.inc(direction=direction, source="dictionary")
+                    results[i] = word
+                    continue
+            cached = self.cache.get(text, source_lang, model_name) if self.cache else None
+            if cached is not None:
+                TRANSLATION_SOURCES.inc(direction=direction, source="cache")
+                results[i] = cached
+                continue
+            match = self.memory.lookup(text, source_lang, model_name) if self.memory is not None else None
+            if match is not None:
+                TRANSLATION_MEMORY_HITS.inc(direction=direction, match=match["match"])
+                TRANSLATION_SOURCES.inc(direction=direction, source="memory")
+                results[i] = match["translation"]
+            else:
+                missing.append(i)
+        return results, missing
+    
+    def _store_results(self, texts: List[str], source_lang: str, results: List[str],
+                       missing: List[int], outputs: List[str], preset: Optional[str] = None):
+        """把模型译文填回结果列表并写入缓存（以及开启了学习的翻译记忆库）"""
+        model_name = self._cache_model_key(source_lang, preset)
+        learn = self.memory is not None and self.memory.learn
+        TRANSLATION_SOURCES.inc(len(missing), direction=direction_label(source_lang), source="model")
+        for i, output in zip(missing, outputs):
+            results[i] = output
+            if self.cache:
+                self.cache.set(texts[i], source_lang, model_name, output)
+            if learn:
+                self.memory.add(texts[i], output, source_lang, model_name)
+    
+    def _generate(self, batch: List[str], source_lang: str,
+                  preset: Optional[str] = None) -> Tuple[List[str], List[int]]:
+        """直接用模型翻译一批非空文本（首次调用时加载模型），返回 (译文列表, 每条译文实际生成的token数)
+        
+        可以被多个线程同时调用：每次推理独占一个槽位，同时进行的推理数不超过 max_concurrency。
+        生成的token数（含结束符）取自 generate 的输出；拿不到时（如桩后端）按译文分词估算。
+        """
+        pool = self._get_pool(source_lang)
+        direction = direction_label(source_lang)
+        BATCH_SIZE.observe(len(batch), direction=direction)
+        # 预设的 max_new_tokens 按本批最长输入的token数设上限
+        kwargs = generation_kwargs(preset, pool.token_lengths(batch)) if preset else {}
+        with pool.slot() as translator:
+            # 槽位由本次调用独占，instrument_pipeline 把生成的token数记在这个列表里
+            generated = translator._generated_lengths = []
+            start = time.perf_counter()
+            try:
+                # inference 覆盖整次pipeline调用，其中包含 tokenize / generate / decode 三个子阶段
+                with stage("inference", direction):
+                    outputs = translator(batch, batch_size=len(batch), **kwargs)
+            finally:
+                translator._generated_lengths = None
+            self._record_call(source_lang, (time.perf_counter() - start) * 1000)
+        outputs = [output['translation_text'].strip() for output in outputs]
+        if len(generated) != len(outputs):
+            generated = pool.token_lengths(outputs, target=True)
+        return outputs, generated
+    
+    def _token_lengths(self, texts: List[str], source_lang: str) -> List[int]:
+        """计算每条文本的token数，没有分词器时退化为字符数"""
+        return self._get_pool(source_lang).token_lengths(texts)
+    
+    def translate_document(self, text: str, source_lang: str = "zh",
+                           max_batch_size: int = 16, max_batch_tokens: int = 4096,
+                           max_sentence_chars: int = 300,
+                           translate_batch: Optional[Callable] = None) -> Dict:
+        """长文档翻译：分句 -> 按长度分桶批量翻译 -> 按原顺序重建
+        
+        返回译文以及各阶段耗时（毫秒），便于定位长文本的耗时瓶颈。
+        translate_batch 替换批量翻译函数（如多进程工作池的 translate_batch），默认为本翻译器的。
+        """
+        translate_batch = translate_batch or self.translate_batch
+        source_lang = resolve_language(text, source_lang)
+        target_lang = "en" if source_lang == "zh" else "zh"
+        piece_joiner = " " if target_lang == "en" else ""
+        timings = {}
+        start = time.perf_counter()
+        
+        # 1. 分句，超长句子再按逗号等切分
+        step_start = time.perf_counter()
+        segments = split_sentences(text, source_lang)
+        pieces = []
+        owners = []
+        for index, (sentence, _) in enumerate(segments):
+            for piece in split_long_sentence(sentence, max_sentence_chars):
+                pieces.append(piece)
+                owners.append(index)
+        timings["segment_ms"] = (time.perf_counter() - step_start) * 1000
+        
+        # 2. 计算长度并分桶
+        step_start = time.perf_counter()
+        lengths = self._token_lengths(pieces, source_lang)
+        buckets = bucket_by_length(lengths, max_batch_size, max_batch_tokens)
+        timings["tokenize_ms"] = (time.perf_counter() - step_start) * 1000
+        
+        # 3. 逐桶批量翻译
+        step_start = time.perf_counter()
+        piece_translations = [""] * len(pieces)
+        for bucket in buckets:
+            outputs = translate_batch([pieces[i] for i in bucket], source_lang)
+            for i, output in zip(bucket, outputs):
+                piece_translations[i] = output
+        timings["translate_ms"] = (time.perf_counter() - step_start) * 1000
+        
+        # 4. 按原始顺序重建译文
+        step_start = time.perf_counter()
+        sentence_translations = [[] for _ in segments]
+        for owner, translation in zip(owners, piece_translations):
+            sentence_translations[owner].append(translation)
+        translation = join_translations(
+            [piece_joiner.join(parts) for parts in sentence_translations],
+            [sep for _, sep in segments],
+            target_lang
+        )
+        timings["reassemble_ms"] = (time.perf_counter() - step_start) * 1000
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        
+        return {
+            "translation": translation,
+            "sentences": len(segments),
+            "segments": len(pieces),
+            "batches": len(buckets),
+            "padding_ratio": _padding_ratio(lengths, buckets),
+            "timings": timings
+        }
+    
+    def translate_stream(self, text: str, source_lang: str = "zh",
+                         mode: str = "segment") -> Iterator[Dict]:
+        """流式翻译，边解码边产出部分译文
+        
+        mode="segment" 时逐句翻译、每句完成后产出；mode="token" 时逐token产出。
+        依次产出 {"type": "delta", "index": 句子序号, "text": 新增译文}，
+        最后产出 {"type": "done", "translation": 完整译文, "first_output_ms": ..., "total_ms": ...}。
+        source_lang="auto" 时按整段文本的主语言确定方向。
+        """
+        source_lang = resolve_language(text, source_lang)
+        target_lang = "en" if source_lang == "zh" else "zh"
+        start = time.perf_counter()
+        first_output_ms = None
+        parts = []
+        
+        segments = split_sentences(text, source_lang)
+        for index, (sentence, sep) in enumerate(segments):
+            if mode == "token":
+                pieces = self._stream_sentence(sentence, source_lang)
+            else:
+                pieces = iter(self.translate_batch([sentence], source_lang))
+            
+            for piece in pieces:
+                if not piece:
+                    continue
+                if first_output_ms is None:
+                    first_output_ms = (time.perf_counter() - start) * 1000
+                parts.append(piece)
+                yield {"type": "delta", "index": index, "text": piece}
+            
+            if index < len(segments) - 1:
+                separator = output_separator(sep, target_lang)
+                if separator:
+                    parts.append(separator)
+                    yield {"type": "delta", "index": index, "text": separator}
+        
+        yield {
+            "type": "done",
+            "source_lang": source_lang,
+            "translation": "".join(parts).strip(),
+            "sentences": len(segments),
+            "first_output_ms": first_output_ms,
+            "total_ms": (time.perf_counter() - start) * 1000
+        }
+    
+    def _stream_sentence(self, sentence: str, source_lang: str) -> Iterator[str]:
+        """逐token翻译单个句子，缓存命中时一次性产出整句
+        
+        逐token输出只支持贪心解码，结果可能与束搜索略有不同，因此不写入缓存。
+        """
+        results, missing = self._lookup_cached([sentence], source_lang)
+        if not missing:
+            yield results[0]
+            return
+        
+        from transformers import TextIteratorStreamer
+        
+        # 整句生成期间独占一个槽位（分词器和解码状态不与其他推理共享）
+        with self._get_pool(source_lang).slot() as translator:
+            streamer = TextIteratorStreamer(translator.tokenizer, skip_special_tokens=True, timeout=60)
+            inputs = translator.tokenizer([sentence], return_tensors="pt", truncation=True)
+            if self.device == "cuda":
+                inputs = inputs.to(translator.model.device)
+            
+            # generate 在后台线程运行，解码出的token通过 streamer 逐段取回
+            generate_kwargs = {**inputs, "streamer": streamer, "num_beams": 1}
+            generation_config = getattr(translator, "generation_config", None)
+            if generation_config is not None:
+                generate_kwargs["generation_config"] = generation_config
+            # 客户端断开（生成器被关闭）时通过停止条件结束 generate
+            cancelled = threading.Event()
+            generate_kwargs["stopping_criteria"] = _event_stopping_criteria(cancelled)
+            generation = threading.Thread(
+                target=translator.model.generate,
+                kwargs=generate_kwargs,
+                daemon=True
+            )
+            start = time.perf_counter()
+            generation.start()
+            try:
+                for piece in streamer:
+                    yield piece
+            finally:
+                # generate 真正结束后才归还槽位，同时进行的推理数不会超过 max_concurrency
+                cancelled.set()
+                generation.join()
+            self._record_call(source_lang, (time.perf_counter() - start) * 1000)
+    
     def get_word_definition(self, word: str) -> Optional[Dict]:
-        """获取单词定义和例句"""
+        """获取单词定义和例句，查不到时回退到词元（如 learned -> learn）"""
+        word_lower = word.lower().strip()
+        word_info = self.dictionary.get(word_lower)
+        if word_info is None:
+            lemma = self.lookup.lemmatize(word_lower)
+            if lemma:
+                word_info = self.dictionary.get(lemma)
+        return word_info
+    
+    def get_word_definition_json(self, word: str) -> Optional[bytes]:
+        """单词定义的JSON字节（回退规则与 get_word_definition 相同）
+        
+        字典存储提供预编码JSON（get_json）时直接返回，不构造 Python 对象。
+        """
         word_lower = word.lower().strip()
-        return self.dictionary.get(word_lower)
+        get_json = getattr(self.dictionary, "get_json", None)
+        if get_json is None:
+            word_info = self.get_word_definition(word_lower)
+            return encode_entry(word_info) if word_info is not None else None
+        
+        data = get_json(word_lower)
+        if data is None:
+            lemma = self.lookup.lemmatize(word_lower)
+            if lemma:
+                data = get_json(lemma)
+        return data
+    
+    def get_word_definitions_json(self, words: List[str]) -> Dict[str, bytes]:
+        """批量获取单词定义的JSON字节，查不到的词不出现在结果中"""
+        return {word: encode_entry(entry) for word, (_, entry) in self.lookup.lookup_many(words).items()}
+    
+    def suggest_words(self, prefix: str, limit: int = 10) -> List[str]:
+        """单词前缀补全"""
+        return self.lookup.suggest(prefix, limit)
+    
+    def lookup_chinese(self, term: str, limit: int = 10,
+                       fields: Optional[List[str]] = None) -> List[Dict]:
+        """中文反查英文单词，返回词头、命中的中文释义、匹配类型以及词条（fields 指定只返回哪些字段）"""
+        hits = self.lookup.lookup_chinese(term, limit)
+        if fields is not None:
+            keep = {"word", "gloss", "match", *fields}
+            hits = [{key: value for key, value in hit.items() if key in keep} for hit in hits]
+        return hits
+    
+    def _dictionary_translation(self, text: str) -> Optional[str]:
+        """短中文词语的词典译文：释义完全匹配时返回排名最前的英文词头，否则返回 None"""
+        if not _SHORT_CHINESE.fullmatch(text):
+            return None
+        hits = self.lookup.lookup_chinese(text, limit=1, with_entries=False)
+        if hits and hits[0]["match"] == EXACT:
+            return hits[0]["word"]
+        return None
+    
+    def search_words(self, query: str, max_distance: int = 2, limit: int = 10) -> List[Dict]:
+        """单词综合查询：精确匹配、词形还原、有界编辑距离模糊匹配"""
+        return self.lookup.search(query, max_distance, limit)
+    
+    def get_word_definitions(self, words: List[str],
+                             fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """批量获取单词定义（回退规则与 get_word_definition 相同）
+        
+        每个不同的词只查一次，字典存储一次批量查询；fields 指定只返回哪些词条字段。
+        查不到的词不出现在结果中。
+        """
+        results = {}
+        for word, (_, entry) in self.lookup.lookup_many(words).items():
+            if fields is not None:
+                entry = {field: entry[field] for field in fields if field in entry}
+            results[word] = entry
+        return results
     
     def extract_english_words(self, text: str) -> List[str]:
-        """从文本中提取英文单词"""
-        # 使用正则表达式提取英文单词
-        words = re.findall(r'\b[a-zA-Z]+\b', text)
-        # 过滤掉太短的单词
-        words = [word.lower() for word in words if len(word) > 2]
-        return list(set(words))  # 去重
+        """从文本中提取英文单词（小写、长度大于2、按出现顺序去重）"""
+        return tokenize_words(text)
     
     def get_examples_for_text(self, text: str) -> Dict[str, List[str]]:
         """获取文本中单词的例句"""
         words = self.extract_english_words(text)
-        examples = {}
+        return self._collect_examples(words, self.get_word_definitions(words))[0]
+    
+    def search_examples(self, query: str, limit: int = EXAMPLES_PER_WORD) -> List[Dict]:
+        """在例句语料库中查询包含单词或短语的例句（未配置语料库时返回空列表）"""
+        if self.example_corpus is None:
+            return []
+        return self.example_corpus.search(query, limit)
+    
+    def _collect_examples(self, words: List[str],
+                          definitions: Dict[str, Dict]) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """收集每个单词的例句，返回 (单词 -> 英文例句, 单词 -> 例句的中文译文)
         
-        for word in words:
-            word_info = self.get_word_definition(word)
-            if word_info and 'examples' in word_info:
+        配置了例句语料库时优先从语料库检索，语料库中没有的词再取字典词条中的例句。
+        """
+        examples = {}
+        translations = {}
+        if self.example_corpus is not None:
+            for word, pairs in self.example_corpus.search_many(words, EXAMPLES_PER_WORD).items():
+                examples[word] = [pair["en"] for pair in pairs]
+                translations[word] = [pair["zh"] for pair in pairs]
+        for word, word_info in definitions.items():
+            if word not in examples and 'examples' in word_info:
                 examples[word] = word_info['examples']
-        
-        return examples
+        return examples, translations
     
-    def translate_with_examples(self, text: str, source_lang: str = "zh") -> Dict:
-        """翻译并获取例句"""
+    def translate_with_examples(self, text: str, source_lang: str = "zh",
+                                document: bool = False, profile: bool = False,
+                                translate_batch: Optional[Callable] = None) -> Dict:
+        """翻译并获取例句
+        
+        document=True 时使用长文档模式（分句+分桶批量翻译），
+        并在结果中附带各阶段耗时。profile=True 时在结果的 "profile"
+        字段中返回本次调用各阶段（分词、生成、提词、查词等）的耗时分解。
+        source_lang="auto" 时按主语言确定方向，结果的 "source_lang" 为实际使用的源语言。
+        translate_batch 替换批量翻译函数（多进程工作池借此只把模型推理交给推理进程）。
+        """
+        if profile:
+            with profiling() as collected:
+                result = self.translate_with_examples(text, source_lang, document,
+                                                      translate_batch=translate_batch)
+            result["profile"] = collected.breakdown()
+            return result
+        
+        source_lang = resolve_language(text, source_lang)
+        direction = direction_label(source_lang)
         result = {
             "original_text": text,
+            "source_lang": source_lang,
             "translation": "",
             "examples": {},
             "word_definitions": {}
         }
         
         try:
+            with stage("translate", direction):
+                if document:
+                    doc = self.translate_document(text, source_lang, translate_batch=translate_batch)
+                    result["timings"] = doc["timings"]
+                    translated = doc["translation"]
+                elif translate_batch is not None:
+                    translated = translate_batch([text], source_lang)[0]
+                elif source_lang == "zh":
+                    translated = self.translate_chinese_to_english(text)
+                else:
+                    translated = self.translate_english_to_chinese(text)
+            
             if source_lang == "zh":
                 # 中文翻译为英文
-                english_text = self.translate_chinese_to_english(text)
+                english_text = translated
                 result["translation"] = english_text
-                
-                # 获取英文例句
-                examples = self.get_examples_for_text(english_text)
-                result["examples"] = examples
-                
-                # 获取单词定义
-                words = self.extract_english_words(english_text)
-                for word in words:
-                    word_info = self.get_word_definition(word)
-                    if word_info:
-                        result["word_definitions"][word] = word_info
-                        
             else:
-                # 英文翻译为中文
-                chinese_text = self.translate_english_to_chinese(text)
-                result["translation"] = chinese_text
-                
-                # 获取英文例句（从原文）
-                examples = self.get_examples_for_text(text)
-                result["examples"] = examples
-                
-                # 获取单词定义
-                words = self.extract_english_words(text)
-                for word in words:
-                    word_info = self.get_word_definition(word)
-                    if word_info:
-                        result["word_definitions"][word] = word_info
+                # 英文翻译为中文，例句和释义取自英文原文
+                english_text = text
+                result["translation"] = translated
+            
+            # 提取一次单词，批量查询定义，例句取自同一批词条
+            with stage("extract_words", direction):
+                words = self.extract_english_words(english_text)
+            with stage("dictionary_lookup", direction):
+                definitions = self.get_word_definitions(words)
+            with stage("example_search", direction):
+                examples, example_translations = self._collect_examples(words, definitions)
+            result["examples"] = examples
+            if example_translations:
+                result["example_translations"] = example_translations
+            result["word_definitions"] = definitions
             
             return result
             
@@ -310,6 +902,35 @@ class ChineseEnglishTranslator:
             return result
 
 
+def _event_stopping_criteria(event: threading.Event):
+    """generate 的停止条件：event 被设置后在下一个解码步停止"""
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+    
+    class StopOnEvent(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), event.is_set(), dtype=torch.bool,
+                              device=input_ids.device)
+    
+    return StoppingCriteriaList([StopOnEvent()])
+
+
+def encode_entry(entry) -> bytes:
+    """把词条编码为JSON字节，二进制字典的词条直接使用预编码结果"""
+    to_json = getattr(entry, "to_json", None)
+    if to_json is not None:
+        return to_json()
+    return json.dumps(dict(entry), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _padding_ratio(lengths: List[int], buckets: List[List[int]]) -> float:
+    """分桶后padding token占比"""
+    padded = sum(len(bucket) * max(lengths[i] for i in bucket) for bucket in buckets)
+    if not padded:
+        return 0.0
+    return 1 - sum(lengths) / padded
+
+
 def main():
     """主函数 - 命令行界面"""
     print("=== 中英翻译和英文字典系统 ===")
@@ -372,11 +993,10 @@ def main():
                 text = input("请输入要翻译的文本: ").strip()
                 if text:
                     # 自动检测语言
-                    if re.search(r'[\u4e00-\u9fff]', text):
-                        source_lang = "zh"
+                    source_lang = detect_language(text)
+                    if source_lang == "zh":
                         print("检测到中文，将翻译为英文...")
                     else:
-                        source_lang = "en"
                         print("检测到英文，将翻译为中文...")
                     
                     result = translator.translate_with_examples(text, source_lang)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译服务的异步Python客户端
+基于 asyncio 的 HTTP/1.1 keep-alive 连接池（只依赖标准库）；短时间窗口内的单条翻译和查词
+合并成一次批量接口调用（/api/translate/batch、/api/dictionary/lookup），
+相同的在途请求只发送一次，查词结果保存在本地LRU中
+
+用法:
+    async with TranslatorClient("http://127.0.0.1:5000") as client:
+        english = await client.translate("你好，世界")
+        entries = await asyncio.gather(*(client.lookup(word) for word in ["hello", "world"]))
+"""
+
+import asyncio
+import gzip
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TranslatorClientError(Exception):
+    """服务返回错误（业务错误或非2xx状态码）"""
+
+
+class _StaleConnection(Exception):
+    """复用的空闲连接已被服务端关闭"""
+
+
+class ConnectionPool:
+    """HTTP/1.1 keep-alive 连接池，同时打开的连接数不超过 max_connections"""
+
+    def __init__(self, host: str, port: int, max_connections: int = 8,
+                 timeout: float = 30.0, ssl: bool = False):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.ssl = ssl
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self.opened = 0
+        self.reused = 0
+        self.requests = 0
+        # 服务端不保持连接（如 Werkzeug 开发服务器总是返回 Connection: close）的响应数
+        self.server_closes = 0
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl or None), self.timeout)
+        self.opened += 1
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        connection[1].close()
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """发送请求，返回 (状态码, 小写的响应头, 解压后的响应体)
+
+        复用的空闲连接如果已被服务端关闭（还没读到任何响应），换一个新连接重发一次。
+        """
+        async with self._semaphore:
+            self.requests += 1
+            if self._idle:
+                connection = self._idle.pop()
+                self.reused += 1
+                try:
+                    return await self._exchange(connection, method, path, body, headers)
+                except (_StaleConnection, ConnectionResetError, BrokenPipeError):
+                    self._close(connection)
+            connection = await self._open()
+            try:
+                return await self._exchange(connection, method, path, body, headers)
+            except _StaleConnection:
+                raise ConnectionError("服务端在返回响应前关闭了连接")
+
+    async def _exchange(self, connection, method, path, body, headers):
+        reader, writer = connection
+        try:
+            result, keep_alive = await asyncio.wait_for(
+                self._roundtrip(reader, writer, method, path, body, headers), self.timeout)
+        except BaseException:
+            self._close(connection)
+            raise
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            self.server_closes += 1
+            self._close(connection)
+        return result
+
+    async def _roundtrip(self, reader, writer, method, path, body, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 "Connection: keep-alive", "Accept-Encoding: gzip"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise _StaleConnection()
+        version, status = status_line.decode("latin-1").split(None, 2)[:2]
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        status = int(status)
+        connection_header = response_headers.get("connection", "").lower()
+        keep_alive = (version == "HTTP/1.1" and connection_header != "close") or connection_header == "keep-alive"
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            data = b""
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            data = await self._read_chunked(reader)
+        elif "content-length" in response_headers:
+            data = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            # 没有长度信息时读到连接关闭为止
+            data = await reader.read()
+            keep_alive = False
+        if response_headers.get("content-encoding") == "gzip":
+            data = gzip.decompress(data)
+        return (status, response_headers, data), keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader) -> bytes:
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # 跳过 trailer 直到空行
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def close(self):
+        """关闭全部空闲连接"""
+        while self._idle:
+            self._close(self._idle.pop())
+
+
+class TranslatorClient:
+    """翻译服务的异步客户端
+
+    batch_window_ms 内提交的单条翻译（按方向和解码预设分组）和查词分别合并成一次批量请求，
+    攒够 max_batch_size 条时立即发送；相同文本/单词的在途请求共享同一个结果；
+    查词结果（包括查不到的词）保存在容量为 dictionary_cache_size 的LRU中。
+    客户端绑定创建它的事件循环，不能跨线程使用。
+    """
+
+    def __init__(self, base_url: str = "http://127.0.0.1:5000", max_connections: int = 8,
+                 batch_window_ms: float = 5.0, max_batch_size: int = 32,
+                 dictionary_cache_size: int = 1024, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"不支持的地址: {base_url}")
+        self.base_path = parts.path.rstrip("/")
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.dictionary_cache_size = dictionary_cache_size
+        self._pool = ConnectionPool(
+            parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+            max_connections, timeout, ssl=parts.scheme == "https"
+        )
+
+        # 请求键 -> 在途结果；分组 -> 等待发送的 [(内容, 请求键, Future)]
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._pending: Dict[Tuple, List[Tuple[str, Tuple, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self._dictionary_cache: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+
+        self._calls = 0
+        self._coalesced = 0
+        self._cache_hits = 0
+        self._batches = 0
+        self._items_sent = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def translate(self, text: str, source_lang: str = "zh", preset: Optional[str] = None) -> str:
+        """翻译一条文本；source_lang 为 "zh"、"en" 或 "auto"，preset 为解码预设"""
+        self._calls += 1
+        return await self._submit(("translate", source_lang, preset),
+                                  ("translate", text, source_lang, preset), text)
+
+    async def translate_many(self, texts: List[str], source_lang: str = "zh",
+                             preset: Optional[str] = None) -> List[str]:
+        """翻译多条文本，与同一时间窗口内的其他调用一起合并发送"""
+        return list(await asyncio.gather(*(self.translate(text, source_lang, preset) for text in texts)))
+
+    async def lookup(self, word: str) -> Optional[Dict]:
+        """查询单词词条，查不到时返回 None；返回的词条与本地缓存共享，不要修改"""
+        self._calls += 1
+        word = word.lower().strip()
+        if word in self._dictionary_cache:
+            self._cache_hits += 1
+            self._dictionary_cache.move_to_end(word)
+            return self._dictionary_cache[word]
+        return await self._submit(("lookup",), ("lookup", word), word)
+
+    async def _submit(self, group: Tuple, key: Tuple, item: str):
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._inflight[key] = future
+            pending = self._pending.setdefault(group, [])
+            pending.append((item, key, future))
+            if len(pending) >= self.max_batch_size:
+                self._flush(group)
+            elif group not in self._timers:
+                self._timers[group] = loop.call_later(self.batch_window, self._flush, group)
+        else:
+            self._coalesced += 1
+        # 多个调用者共享同一个 Future，某个调用者被取消时不影响其他调用者
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Tuple):
+        """把分组中等待的请求作为一批发送"""
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, None)
+        if batch:
+            task = asyncio.ensure_future(self._send(group, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, group: Tuple, batch: List[Tuple[str, Tuple, asyncio.Future]]):
+        items = [item for item, _, _ in batch]
+        self._batches += 1
+        self._items_sent += len(items)
+        try:
+            if group[0] == "translate":
+                _, source_lang, preset = group
+                data = await self._post("/api/translate/batch",
+                                        {"texts": items, "source_lang": source_lang, "preset": preset})
+                results = data["translations"]
+            else:
+                data = await self._post("/api/dictionary/lookup", {"words": items})
+                entries = data.get("entries", {})
+                results = [entries.get(item) for item in items]
+                for item, entry in zip(items, results):
+                    self._cache_entry(item, entry)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            for _, key, _ in batch:
+                self._inflight.pop(key, None)
+
+    def _cache_entry(self, word: str, entry: Optional[Dict]):
+        if self.dictionary_cache_size <= 0:
+            return
+        self._dictionary_cache[word] = entry
+        self._dictionary_cache.move_to_end(word)
+        while len(self._dictionary_cache) > self.dictionary_cache_size:
+            self._dictionary_cache.popitem(last=False)
+
+    async def _post(self, path: str, payload: Dict) -> Dict:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return self._parse(*await self._pool.request(
+            "POST", self.base_path + path, body, {"Content-Type": "application/json"}))
+
+    async def get(self, path: str) -> Dict:
+        """GET 其他接口（如 /api/health、/api/stats），返回解析后的JSON"""
+        return self._parse(*await self._pool.request("GET", self.base_path + path))
+
+    @staticmethod
+    def _parse(status: int, headers: Dict[str, str], body: bytes) -> Dict:
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+        if status >= 400:
+            raise TranslatorClientError(f"HTTP {status}: {data.get('error', body[:200])}")
+        if isinstance(data, dict) and "error" in data:
+            raise TranslatorClientError(data["error"])
+        return data
+
+    async def close(self):
+        """发送尚未发出的请求，等待在途请求完成后关闭连接"""
+        for group in list(self._pending):
+            self._flush(group)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pool.close()
+
+    def stats(self) -> Dict:
+        """调用次数、合并/缓存命中次数、批量请求数以及连接复用情况"""
+        return {
+            "calls": self._calls,
+            "coalesced": self._coalesced,
+            "dictionary_cache_hits": self._cache_hits,
+            "dictionary_cache_size": len(self._dictionary_cache),
+            "batches": self._batches,
+            "items_sent": self._items_sent,
+            "http_requests": self._pool.requests,
+            "connections_opened": self._pool.opened,
+            "connections_reused": self._pool.reused,
+            "server_closes": self._pool.server_closes
+        }
@@ -5,28 +5,299 @@ Web界面版本的中英翻译和英文字典系统
 使用Flask框架提供Web服务
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from collections.abc import Mapping
+from concurrent.futures import TimeoutError
+import argparse
+import atexit
 import json
 import os
+import signal
+import sys
+import time
 from translator import ChineseEnglishTranslator
+from batcher import MicroBatcher
+from serving import InferenceQueue, QueueFullError, ServiceDrainingError
+from worker_pool import ProcessWorkerPool
+from incremental import IncrementalTranslator
+from translation_cache import TranslationCache, SQLiteCacheBackend
+from translation_memory import TranslationMemory, DEFAULT_MAX_ENTRIES, DEFAULT_THRESHOLD
+from http_cache import COMPRESS_MIN_BYTES, HotResponseCache, PreparedResponse, etag_matches, negotiate_encoding
+from metrics import DECODE_STEPS, HTTP_REQUESTS, HTTP_SECONDS, MODEL_MEMORY, QUEUE_DEPTH, REGISTRY
+from decoding import DECODING_PRESETS
+from language import translate_mixed
+
+class EntryJSONProvider(DefaultJSONProvider):
+    """支持二进制字典的惰性词条（Mapping）"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
 
 app = Flask(__name__)
+app.json = EntryJSONProvider(app)
 CORS(app)
 
 # 全局翻译器实例
 translator = None
 
+# 全局微批处理器，合并并发的 /api/translate 请求
+batcher = None
+
+# 全局有界推理队列，模型推理都在专用工作线程中执行
+inference_queue = None
+
+# 多进程推理工作池（INFERENCE_PROCESSES 大于0时启用），模型权重在进程间共享
+worker_pool = None
+
+# 增量翻译：实时翻译时只重新翻译变化的句子
+incremental_translator = None
+
+# 微批处理配置（可通过环境变量调整）
+MAX_BATCH_SIZE = int(os.environ.get('TRANSLATE_MAX_BATCH_SIZE', '16'))
+MAX_WAIT_MS = float(os.environ.get('TRANSLATE_MAX_WAIT_MS', '10'))
+
+# 推理队列配置：队列容量、工作线程数、单请求超时（秒）、关闭时排空的最长等待（秒）
+MAX_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', '64'))
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '1'))
+REQUEST_TIMEOUT = float(os.environ.get('REQUEST_TIMEOUT', '30'))
+DRAIN_TIMEOUT = float(os.environ.get('DRAIN_TIMEOUT', '30'))
+INFERENCE_PROCESSES = int(os.environ.get('INFERENCE_PROCESSES', '0'))
+
+# 增量翻译会话数上限和会话过期时间（秒）
+INCREMENTAL_SESSIONS = int(os.environ.get('INCREMENTAL_SESSIONS', '1000'))
+INCREMENTAL_TTL = float(os.environ.get('INCREMENTAL_TTL', '600'))
+
+# 批量查词接口单次最多查询的不同单词数
+LOOKUP_MAX_WORDS = int(os.environ.get('DICTIONARY_LOOKUP_MAX_WORDS', '1000'))
+
+# 批量翻译接口单次最多的文本数
+TRANSLATE_BATCH_MAX_TEXTS = int(os.environ.get('TRANSLATE_BATCH_MAX_TEXTS', '256'))
+
+# 翻译缓存配置：容量、过期时间（秒，0表示不过期）、可选的SQLite持久化文件
+CACHE_SIZE = int(os.environ.get('TRANSLATION_CACHE_SIZE', '10000'))
+CACHE_TTL = float(os.environ.get('TRANSLATION_CACHE_TTL', '86400'))
+CACHE_DB = os.environ.get('TRANSLATION_CACHE_DB', '')
+
+def create_cache():
+    """根据环境变量创建翻译缓存"""
+    backend = SQLiteCacheBackend(CACHE_DB) if CACHE_DB else None
+    return TranslationCache(
+        max_size=CACHE_SIZE,
+        ttl_seconds=CACHE_TTL or None,
+        backend=backend
+    )
+
+# 翻译记忆库：模糊匹配阈值（默认1只做完全匹配，小于1开启模糊匹配，0表示不启用）、是否记录模型译文、
+# 每个方向的句对数上限（0表示不限制）、启动时导入的JSON Lines文件
+MEMORY_THRESHOLD = float(os.environ.get('TRANSLATION_MEMORY_THRESHOLD', str(DEFAULT_THRESHOLD)))
+MEMORY_LEARN = os.environ.get('TRANSLATION_MEMORY_LEARN', '1') == '1'
+MEMORY_MAX_ENTRIES = int(os.environ.get('TRANSLATION_MEMORY_MAX_ENTRIES', str(DEFAULT_MAX_ENTRIES))) or None
+MEMORY_FILE = os.environ.get('TRANSLATION_MEMORY_FILE', '')
+
+def create_memory():
+    """根据环境变量创建翻译记忆库"""
+    if MEMORY_THRESHOLD <= 0:
+        return None
+    memory = TranslationMemory(threshold=MEMORY_THRESHOLD, learn=MEMORY_LEARN,
+                               max_entries=MEMORY_MAX_ENTRIES)
+    if MEMORY_FILE and os.path.exists(MEMORY_FILE):
+        print(f"已导入翻译记忆 {memory.load(MEMORY_FILE)} 条: {MEMORY_FILE}")
+    return memory
+
+# 启动时预热的翻译方向，如 "zh,en"；为空时首次使用才加载模型
+WARMUP = [lang for lang in os.environ.get('TRANSLATOR_WARMUP', '').split(',') if lang]
+
+# 推理后端（pytorch / quantized / onnx）与算子内线程数
+BACKEND = os.environ.get('TRANSLATOR_BACKEND', 'pytorch')
+NUM_THREADS = int(os.environ.get('TRANSLATOR_THREADS', '0')) or None
+# 每个方向同时进行的推理数（默认与推理线程数相同）与算子间线程池大小
+CONCURRENCY = int(os.environ.get('TRANSLATOR_CONCURRENCY', '0')) or max(INFERENCE_WORKERS, 1)
+INTEROP_THREADS = int(os.environ.get('TRANSLATOR_INTEROP_THREADS', '0')) or None
+ONNX_CACHE_DIR = os.environ.get('TRANSLATOR_ONNX_DIR') or None
+
+# 默认解码预设（fast / balanced / quality），为空时使用模型自带的生成配置；/api/translate 可按请求覆盖
+PRESET = os.environ.get('TRANSLATOR_PRESET') or None
+
+# 已加载模型的内存预算（MB），超出时卸载最近最少使用的模型；0 表示不限制
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get('MODEL_MEMORY_BUDGET_MB', '0')) or None
+# 为 1 时只从本地目录加载模型（TRANSLATOR_MODEL_ZH / TRANSLATOR_MODEL_EN 指定路径）
+LOCAL_MODELS_ONLY = os.environ.get('TRANSLATOR_LOCAL_ONLY', '0') == '1'
+MODEL_PATHS = {lang: os.environ[f'TRANSLATOR_MODEL_{lang.upper()}']
+               for lang in ('zh', 'en') if os.environ.get(f'TRANSLATOR_MODEL_{lang.upper()}')}
+# 模型热切换接口的口令（请求头 X-Admin-Token），为空时关闭该接口
+MODEL_ADMIN_TOKEN = os.environ.get('MODEL_ADMIN_TOKEN', '')
+
+# 编译好的字典文件路径（python dictionary_store.py build 生成），为空时使用内置字典
+DICTIONARY_DB = os.environ.get('DICTIONARY_DB') or None
+# 不超过4个汉字的翻译请求先查反向词典，释义完全匹配时不调用模型（默认关闭）
+DICTIONARY_SHORTCUT = os.environ.get('TRANSLATOR_DICTIONARY_SHORTCUT', '0') == '1'
+
+# 只读查词接口的浏览器/CDN缓存时间（秒），以及预先序列化的热点响应数量（0表示不缓存）
+HTTP_CACHE_MAX_AGE = int(os.environ.get('DICTIONARY_CACHE_MAX_AGE', '3600'))
+HOT_RESPONSES = int(os.environ.get('DICTIONARY_HOT_RESPONSES', '10000'))
+# 可以走热点响应缓存的只读GET接口
+HOT_ENDPOINTS = {'dictionary', 'dictionary_suggest', 'dictionary_search', 'dictionary_chinese', 'examples'}
+hot_responses = HotResponseCache(HOT_RESPONSES)
+
+# 编译好的例句语料库路径（python example_corpus.py build 生成），为空时例句取自字典词条
+EXAMPLE_CORPUS_DB = os.environ.get('EXAMPLE_CORPUS_DB') or None
+
 def init_translator():
     """初始化翻译器"""
-    global translator
+    global translator, batcher, inference_queue, worker_pool, incremental_translator
     try:
-        translator = ChineseEnglishTranslator()
+        translator = ChineseEnglishTranslator(
+            cache=create_cache(),
+            memory=create_memory(),
+            warmup=WARMUP,
+            backend=BACKEND,
+            num_threads=NUM_THREADS,
+            max_concurrency=CONCURRENCY,
+            interop_threads=INTEROP_THREADS,
+            onnx_cache_dir=ONNX_CACHE_DIR,
+            dictionary_path=DICTIONARY_DB,
+            dictionary_shortcut=DICTIONARY_SHORTCUT,
+            preset=PRESET,
+            model_names=MODEL_PATHS or None,
+            memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+            local_models_only=LOCAL_MODELS_ONLY,
+            example_corpus_path=EXAMPLE_CORPUS_DB
+        )
+        if INFERENCE_PROCESSES > 0:
+            worker_pool = ProcessWorkerPool(translator, INFERENCE_PROCESSES)
+        batcher = MicroBatcher(
+            worker_pool or translator,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=MAX_WAIT_MS,
+            max_queue_size=MAX_QUEUE_SIZE
+        )
+        batcher.start()
+        inference_queue = InferenceQueue(
+            max_queue_size=MAX_QUEUE_SIZE,
+            num_workers=max(INFERENCE_WORKERS, INFERENCE_PROCESSES),
+            default_timeout=REQUEST_TIMEOUT
+        )
+        incremental_translator = IncrementalTranslator(
+            lambda texts, lang: run_inference((worker_pool or translator).translate_batch, texts, lang),
+            max_sessions=INCREMENTAL_SESSIONS,
+            ttl_seconds=INCREMENTAL_TTL
+        )
         return True
     except Exception as e:
         print(f"翻译器初始化失败: {e}")
         return False
 
+def shutdown_service():
+    """平滑关闭：停止接收新请求，等待已排队的推理完成"""
+    if batcher:
+        batcher.stop(DRAIN_TIMEOUT)
+    if inference_queue and not inference_queue.draining:
+        print("正在排空推理队列...")
+        if not inference_queue.drain(DRAIN_TIMEOUT):
+            print("推理队列排空超时")
+    if worker_pool:
+        worker_pool.close(DRAIN_TIMEOUT)
+    if MEMORY_FILE and translator and translator.memory is not None and translator.memory.learn:
+        print(f"已保存翻译记忆 {translator.memory.save(MEMORY_FILE)} 条: {MEMORY_FILE}")
+
+def json_bytes_response(fields, entry_json: bytes) -> Response:
+    """把预编码的词条JSON与少量附加字段拼接成响应，不重建词条对象"""
+    head = json.dumps(fields, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if entry_json.strip() == b'{}':
+        body = head
+    else:
+        body = head[:-1] + b',' + entry_json.lstrip()[1:]
+    return Response(body, mimetype='application/json')
+
+def send_prepared(prepared: PreparedResponse) -> Response:
+    """发送预先序列化的响应：协商压缩编码，ETag命中时返回304"""
+    encoding = None
+    if len(prepared.body) >= COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    if etag_matches(request.headers.get('If-None-Match'), prepared.etag):
+        response = Response(status=304)
+    else:
+        response = Response(prepared.encoded(encoding) if encoding else prepared.body,
+                            mimetype=prepared.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = prepared.etag_for(encoding)
+    # POST 的批量查词不会被共享缓存保存，只支持客户端带ETag的条件请求
+    response.headers['Cache-Control'] = (f'public, max-age={HTTP_CACHE_MAX_AGE}'
+                                         if request.method == 'GET' else 'no-cache')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def cacheable_response(response: Response) -> Response:
+    """把只读接口的成功响应转为带ETag、可压缩的响应；GET请求同时放入热点响应缓存"""
+    prepared = PreparedResponse(response.get_data(), response.mimetype)
+    if request.method == 'GET':
+        hot_responses.put(request.full_path, prepared)
+    return send_prepared(prepared)
+
+def run_inference(fn, *args, **kwargs):
+    """在推理队列中执行模型调用并等待结果"""
+    if inference_queue:
+        return inference_queue.submit(fn, *args, timeout=REQUEST_TIMEOUT, **kwargs)
+    return fn(*args, **kwargs)
+
+def stream_inference(fn, *args, **kwargs):
+    """在推理队列中执行流式模型调用，返回逐个产出结果的迭代器（排队阶段同样受背压和超时约束）"""
+    if inference_queue:
+        return inference_queue.submit_stream(fn, *args, timeout=REQUEST_TIMEOUT, **kwargs)
+    return fn(*args, **kwargs)
+
+@app.before_request
+def start_timer():
+    """记录请求开始时间"""
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def serve_hot_response():
+    """热点只读请求直接返回预先序列化的响应，不进入查词代码"""
+    if request.method == 'GET' and request.endpoint in HOT_ENDPOINTS:
+        prepared = hot_responses.get(request.full_path)
+        if prepared is not None:
+            return send_prepared(prepared)
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由记录请求数和处理耗时"""
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    start = g.get('request_start')
+    if start is not None:
+        HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+@app.errorhandler(QueueFullError)
+def handle_queue_full(e):
+    """推理队列已满：返回429，提示客户端稍后重试"""
+    response = jsonify({'error': f'服务繁忙，请稍后重试: {str(e)}'})
+    response.status_code = 429
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.errorhandler(ServiceDrainingError)
+def handle_draining(e):
+    """服务正在关闭：返回503"""
+    response = jsonify({'error': f'服务暂不可用: {str(e)}'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+@app.errorhandler(TimeoutError)
+def handle_timeout(e):
+    """推理超时：返回504"""
+    response = jsonify({'error': f'翻译超时（{REQUEST_TIMEOUT:g}秒）'})
+    response.status_code = 504
+    return response
+
 @app.route('/')
 def index():
     """主页"""
@@ -39,28 +310,179 @@ def translate():
         data = request.get_json()
         text = data.get('text', '').strip()
         source_lang = data.get('source_lang', 'zh')
+        preset = data.get('preset') or None
         
         if not text:
             return jsonify({'error': '请输入要翻译的文本'})
         
+        if preset is not None and preset not in DECODING_PRESETS:
+            return jsonify({'error': f'未知的解码预设: {preset}，可选: {", ".join(DECODING_PRESETS)}'})
+        
         if not translator:
             return jsonify({'error': '翻译器未初始化'})
         
-        if source_lang == 'zh':
-            result = translator.translate_chinese_to_english(text)
+        # 解码步数取自模型实际生成的token数，缓存、翻译记忆库和词典命中时为0
+        if source_lang == 'auto':
+            # 按片段检测语言，只有源语言片段进入模型；片段经微批处理器与其他请求合并推理
+            steps = []
+
+            def translate_segments(texts, lang):
+                if batcher:
+                    futures = [batcher.submit_async(segment, lang, preset) for segment in texts]
+                    outputs = [future.result(REQUEST_TIMEOUT) for future in futures]
+                else:
+                    outputs = zip(*translator.translate_batch(texts, lang, preset, with_steps=True))
+                translations = []
+                for translation, count in outputs:
+                    translations.append(translation)
+                    steps.append(count)
+                return translations
+
+            [result], [source_lang] = translate_mixed([text], translate_segments)
+            decode_steps = sum(steps)
         else:
-            result = translator.translate_english_to_chinese(text)
+            source_lang = 'zh' if source_lang == 'zh' else 'en'
+            if batcher:
+                result, decode_steps = batcher.submit(text, source_lang, timeout=REQUEST_TIMEOUT,
+                                                      preset=preset, with_steps=True)
+            else:
+                [result], [decode_steps] = translator.translate_batch([text], source_lang, preset,
+                                                                      with_steps=True)
+        
+        # 解码步数按预设分别统计，便于为不同接口设定延迟目标
+        preset = preset or translator.preset or 'default'
+        DECODE_STEPS.observe(decode_steps, endpoint='translate', preset=preset)
         
         return jsonify({
             'success': True,
             'original_text': text,
             'translation': result,
-            'source_lang': source_lang
+            'source_lang': source_lang,
+            'preset': preset,
+            'decode_steps': decode_steps
+        })
+        
+    except (QueueFullError, ServiceDrainingError, TimeoutError):
+        raise
+    except Exception as e:
+        return jsonify({'error': f'翻译失败: {str(e)}'})
+
+@app.route('/api/translate/batch', methods=['POST'])
+def translate_batch_api():
+    """批量翻译API：一次请求翻译多条文本，结果与输入顺序一致"""
+    try:
+        data = request.get_json() or {}
+        texts = data.get('texts')
+        source_lang = data.get('source_lang', 'zh')
+        preset = data.get('preset') or None
+        
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'texts 必须是字符串列表'})
+        if len(texts) > TRANSLATE_BATCH_MAX_TEXTS:
+            return jsonify({'error': f'单次最多翻译 {TRANSLATE_BATCH_MAX_TEXTS} 条文本'})
+        
+        if preset is not None and preset not in DECODING_PRESETS:
+            return jsonify({'error': f'未知的解码预设: {preset}，可选: {", ".join(DECODING_PRESETS)}'})
+        
+        if not translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        # 整批文本已经是一个批次，不再逐条进入微批处理器，直接在推理队列中翻译
+        texts = [text.strip() for text in texts]
+        engine = worker_pool or translator
+        if source_lang == 'auto':
+            translations, source_langs = run_inference(
+                translate_mixed, texts, lambda batch, lang: engine.translate_batch(batch, lang, preset))
+        else:
+            source_lang = 'zh' if source_lang == 'zh' else 'en'
+            translations = run_inference(engine.translate_batch, texts, source_lang, preset)
+            source_langs = [source_lang] * len(texts)
+        
+        return jsonify({
+            'success': True,
+            'translations': translations,
+            'source_langs': source_langs,
+            'preset': preset or translator.preset or 'default'
+        })
+        
+    except (QueueFullError, ServiceDrainingError, TimeoutError):
+        raise
+    except Exception as e:
+        return jsonify({'error': f'翻译失败: {str(e)}'})
+
+@app.route('/api/translate/stream', methods=['POST'])
+def translate_stream():
+    """流式翻译API（Server-Sent Events）
+    
+    每个事件是一行 data: JSON，先是若干 delta 事件（新增译文），最后是 done 事件。
+    mode 为 segment（逐句，默认）或 token（逐token）。
+    """
+    data = request.get_json()
+    text = data.get('text', '').strip()
+    source_lang = data.get('source_lang', 'zh')
+    mode = data.get('mode', 'segment')
+    
+    if not text:
+        return jsonify({'error': '请输入要翻译的文本'})
+    
+    if not translator:
+        return jsonify({'error': '翻译器未初始化'})
+    
+    # 排队失败（429/503/504）在开始输出之前抛出，由错误处理器返回对应状态码
+    stream = stream_inference(translator.translate_stream, text, source_lang, mode=mode)
+    
+    def events():
+        try:
+            for event in stream:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            error = {'type': 'error', 'error': f'翻译失败: {str(e)}'}
+            yield f"data: {json.dumps(error, ensure_ascii=False)}\n\n"
+        finally:
+            # 客户端断开时通知推理线程停止
+            stream.close()
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    # 禁止代理缓冲，保证部分结果及时送达
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/translate/incremental', methods=['POST'])
+def translate_incremental():
+    """增量翻译API：传入上一次响应的 id 和编辑后的全文，只重新翻译变化的句子"""
+    try:
+        data = request.get_json()
+        text = data.get('text', '').strip()
+        source_lang = data.get('source_lang', 'zh')
+        previous_id = data.get('previous_id')
+        
+        if not text:
+            return jsonify({'error': '请输入要翻译的文本'})
+        
+        if not incremental_translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        result = incremental_translator.translate(text, source_lang, previous_id)
+        return jsonify({
+            'success': True,
+            'original': text,
+            'source_lang': source_lang,
+            **result
         })
         
+    except (QueueFullError, ServiceDrainingError, TimeoutError):
+        raise
     except Exception as e:
         return jsonify({'error': f'翻译失败: {str(e)}'})
 
+@app.route('/api/translate/incremental/<session_id>', methods=['DELETE'])
+def close_incremental(session_id):
+    """关闭增量翻译会话（编辑结束时调用，否则会话在过期后自动失效）"""
+    if not incremental_translator:
+        return jsonify({'error': '翻译器未初始化'})
+    return jsonify({'success': incremental_translator.close(session_id)})
+
 @app.route('/api/translate_with_examples', methods=['POST'])
 def translate_with_examples():
     """翻译并获取例句API"""
@@ -75,16 +497,151 @@ def translate_with_examples():
         if not translator:
             return jsonify({'error': '翻译器未初始化'})
         
-        result = translator.translate_with_examples(text, source_lang)
+        # document=true 时启用长文档模式（分句、分桶批量翻译，并返回各阶段耗时）
+        document = bool(data.get('document', False))
+        # profile=true 时在响应中返回各阶段耗时分解
+        profile = bool(data.get('profile', False)) or request.args.get('profile') == '1'
+        engine = worker_pool or translator
+        result = run_inference(engine.translate_with_examples, text, source_lang,
+                               document=document, profile=profile)
+        if profile and 'profile' in result:
+            # 包含排队等待在内的请求总耗时
+            result['profile']['request_ms'] = round((time.perf_counter() - g.request_start) * 1000, 3)
         
         return jsonify({
             'success': True,
             **result
         })
         
+    except (QueueFullError, ServiceDrainingError, TimeoutError):
+        raise
     except Exception as e:
         return jsonify({'error': f'翻译失败: {str(e)}'})
 
+@app.route('/api/dictionary/suggest')
+def dictionary_suggest():
+    """单词前缀补全API"""
+    try:
+        if not translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        prefix = request.args.get('q', '').strip()
+        limit = min(int(request.args.get('limit', 10)), 100)
+        
+        return cacheable_response(jsonify({
+            'success': True,
+            'query': prefix,
+            'suggestions': translator.suggest_words(prefix, limit)
+        }))
+        
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'})
+
+@app.route('/api/dictionary/search')
+def dictionary_search():
+    """单词综合查询API（精确、词形还原、模糊匹配）"""
+    try:
+        if not translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        query = request.args.get('q', '').strip()
+        limit = min(int(request.args.get('limit', 10)), 100)
+        max_distance = min(int(request.args.get('max_distance', 2)), 2)
+        
+        return cacheable_response(jsonify({
+            'success': True,
+            'query': query,
+            'results': translator.search_words(query, max_distance, limit)
+        }))
+        
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'})
+
+@app.route('/api/dictionary/lookup', methods=['POST'])
+def dictionary_lookup():
+    """批量查词API：传入单词列表或整段文本，一次返回所有词条"""
+    try:
+        if not translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        data = request.get_json() or {}
+        words = data.get('words')
+        if words is None:
+            words = translator.extract_english_words(data.get('text', ''))
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+            return jsonify({'error': 'words 必须是字符串列表'})
+        words = list(dict.fromkeys(word.lower().strip() for word in words if word.strip()))
+        if len(words) > LOOKUP_MAX_WORDS:
+            return jsonify({'error': f'单次最多查询 {LOOKUP_MAX_WORDS} 个单词'})
+        
+        # fields 可以是列表或逗号分隔的字符串，只返回指定的词条字段
+        fields = data.get('fields')
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        
+        if fields:
+            entries = translator.get_word_definitions(words, fields)
+            return cacheable_response(jsonify({
+                'success': True,
+                'entries': entries,
+                'missing': [word for word in words if word not in entries]
+            }))
+        
+        # 不裁剪字段时直接拼接各词条的预编码JSON
+        encoded = translator.get_word_definitions_json(words)
+        entries_json = b'{' + b','.join(
+            json.dumps(word, ensure_ascii=False).encode('utf-8') + b':' + data
+            for word, data in encoded.items()
+        ) + b'}'
+        missing = [word for word in words if word not in encoded]
+        return cacheable_response(json_bytes_response({'success': True, 'missing': missing},
+                                                      b'{"entries":' + entries_json + b'}'))
+        
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'})
+
+@app.route('/api/dictionary/zh/<term>')
+def dictionary_chinese(term):
+    """中文反查API：按中文释义查英文单词，不调用翻译模型"""
+    try:
+        if not translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        limit = min(int(request.args.get('limit', 10)), 100)
+        fields = request.args.get('fields')
+        if fields is not None:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        
+        return cacheable_response(jsonify({
+            'success': True,
+            'term': term,
+            'results': translator.lookup_chinese(term, limit, fields)
+        }))
+        
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'})
+
+@app.route('/api/examples')
+def examples():
+    """例句检索API：查询包含单词或短语的例句及其中文译文"""
+    try:
+        if not translator:
+            return jsonify({'error': '翻译器未初始化'})
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '请提供查询词'})
+        limit = min(int(request.args.get('limit', 3)), 50)
+        
+        return cacheable_response(jsonify({
+            'success': True,
+            'query': query,
+            'results': translator.search_examples(query, limit)
+        }))
+        
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'})
+
 @app.route('/api/dictionary/<word>')
 def dictionary(word):
     """字典查询API"""
@@ -92,29 +649,184 @@ def dictionary(word):
         if not translator:
             return jsonify({'error': '翻译器未初始化'})
         
-        word_info = translator.get_word_definition(word)
+        word_json = translator.get_word_definition_json(word)
         
-        if word_info:
-            return jsonify({
-                'success': True,
-                'word': word,
-                **word_info
-            })
+        if word_json:
+            return cacheable_response(json_bytes_response({'success': True, 'word': word}, word_json))
         else:
             return jsonify({'error': f'未找到单词 "{word}" 的定义'})
         
     except Exception as e:
         return jsonify({'error': f'查询失败: {str(e)}'})
 
+@app.route('/api/stats')
+def stats():
+    """运行统计API（缓存命中/未命中/淘汰计数，模型冷启动与稳态耗时）"""
+    if not translator:
+        return jsonify({'error': '翻译器未初始化'})
+    
+    return jsonify({
+        'success': True,
+        'cache': translator.cache.stats() if translator.cache else None,
+        'hot_responses': hot_responses.stats(),
+        'memory': translator.memory.stats() if translator.memory is not None else None,
+        'models': translator.get_load_stats(),
+        'queue': inference_queue.stats() if inference_queue else None,
+        'batcher_queue_depth': batcher.queue_depth() if batcher else None,
+        'worker_pool': worker_pool.stats() if worker_pool else None,
+        'incremental': incremental_translator.stats() if incremental_translator else None
+    })
+
+@app.route('/api/models')
+def models():
+    """模型注册表API：各模型的路径、版本、是否已加载、内存占用和加载耗时"""
+    if not translator:
+        return jsonify({'error': '翻译器未初始化'})
+    
+    return jsonify({
+        'success': True,
+        **translator.registry.stats()
+    })
+
+@app.route('/api/models/swap', methods=['POST'])
+def swap_model():
+    """模型热切换API：加载新版本后替换，加载期间旧版本继续服务"""
+    if not MODEL_ADMIN_TOKEN or request.headers.get('X-Admin-Token') != MODEL_ADMIN_TOKEN:
+        return jsonify({'error': '无权切换模型'}), 403
+    
+    if not translator:
+        return jsonify({'error': '翻译器未初始化'})
+    
+    # 多进程模式下模型在fork前加载，父进程切换不会影响推理进程
+    if worker_pool:
+        return jsonify({'error': '多进程推理模式下不支持热切换模型'})
+    
+    try:
+        data = request.get_json()
+        source_lang = 'zh' if data.get('source_lang', 'zh') == 'zh' else 'en'
+        path = data.get('path', '').strip()
+        if not path:
+            return jsonify({'error': '请指定模型路径'})
+        
+        model = translator.swap_model(source_lang, path, data.get('version'))
+        return jsonify({
+            'success': True,
+            'source_lang': source_lang,
+            'model': model
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'切换失败: {str(e)}'})
+
+@app.route('/api/memory')
+def memory_stats():
+    """翻译记忆库统计API（句对数量、完全/模糊命中次数和命中率）"""
+    if not translator or translator.memory is None:
+        return jsonify({'error': '翻译记忆库未启用'})
+    
+    return jsonify({'success': True, 'memory': translator.memory.stats()})
+
+@app.route('/api/memory/import', methods=['POST'])
+def memory_import():
+    """批量导入翻译记忆：JSON {"entries": [...]} 或 JSON Lines，每条 {"source", "target", "source_lang"}"""
+    if not MODEL_ADMIN_TOKEN or request.headers.get('X-Admin-Token') != MODEL_ADMIN_TOKEN:
+        return jsonify({'error': '无权导入翻译记忆'}), 403
+    
+    if not translator or translator.memory is None:
+        return jsonify({'error': '翻译记忆库未启用'})
+    
+    try:
+        if request.is_json:
+            entries = request.get_json().get('entries', [])
+        else:
+            lines = request.get_data(as_text=True).splitlines()
+            entries = [json.loads(line) for line in lines if line.strip()]
+        
+        return jsonify({
+            'success': True,
+            'imported': translator.memory.import_entries(entries),
+            'memory': translator.memory.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'导入失败: {str(e)}'})
+
+@app.route('/api/memory/export')
+def memory_export():
+    """导出全部翻译记忆（JSON Lines）"""
+    if not MODEL_ADMIN_TOKEN or request.headers.get('X-Admin-Token') != MODEL_ADMIN_TOKEN:
+        return jsonify({'error': '无权导出翻译记忆'}), 403
+    
+    if not translator or translator.memory is None:
+        return jsonify({'error': '翻译记忆库未启用'})
+    
+    lines = (json.dumps(entry, ensure_ascii=False) + '\n' for entry in translator.memory.export_entries())
+    return Response(lines, mimetype='application/x-ndjson')
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 文本格式的指标"""
+    if inference_queue:
+        QUEUE_DEPTH.set(inference_queue.stats()['queue_depth'], queue='inference')
+    if batcher:
+        QUEUE_DEPTH.set(batcher.queue_depth(), queue='batcher')
+    if worker_pool:
+        QUEUE_DEPTH.set(worker_pool.stats()['pending'], queue='worker_pool')
+    if translator:
+        for name, model in translator.registry.stats()['models'].items():
+            MODEL_MEMORY.set(model['memory_mb'] if model['loaded'] else 0, model=name)
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health')
 def health():
-    """健康检查API"""
-    return jsonify({
-        'status': 'healthy',
-        'translator_ready': translator is not None
+    """健康检查API（排空期间返回503，便于负载均衡摘除实例）"""
+    draining = bool(inference_queue and inference_queue.draining)
+    response = jsonify({
+        'status': 'draining' if draining else 'healthy',
+        'translator_ready': translator is not None,
+        'queue_depth': inference_queue.stats()['queue_depth'] if inference_queue else 0
     })
+    if draining:
+        response.status_code = 503
+    return response
+
+def create_asgi_app():
+    """ASGI入口，供 uvicorn 等异步服务器使用:
+    uvicorn --factory web_app:create_asgi_app
+    """
+    from asgiref.wsgi import WsgiToAsgi
+    
+    if not init_translator():
+        raise RuntimeError("翻译器初始化失败")
+    atexit.register(shutdown_service)
+    return WsgiToAsgi(app)
+
+def serve_production(host, port, threads):
+    """生产模式：关闭调试，使用多线程服务器，收到SIGTERM时平滑排空"""
+    def handle_signal(signum, frame):
+        print(f"收到信号 {signum}，开始平滑关闭...")
+        shutdown_service()
+        sys.exit(0)
+    
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    
+    try:
+        from waitress import serve
+    except ImportError:
+        print("未安装waitress，使用Flask内置多线程服务器")
+        app.run(host=host, port=port, debug=False, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=threads)
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="中英翻译和英文字典Web服务")
+    parser.add_argument('--production', action='store_true', help="生产模式（关闭调试，有界队列，平滑关闭）")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=16, help="生产模式下处理HTTP请求的线程数")
+    args = parser.parse_args()
+    
     # 创建templates目录
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
@@ -124,6 +836,9 @@ if __name__ == '__main__':
     if init_translator():
         print("翻译器初始化成功!")
         print("启动Web服务器...")
-        app.run(host='0.0.0.0', port=5000, debug=True)
+        if args.production:
+            serve_production(args.host, args.port, args.threads)
+        else:
+            app.run(host=args.host, port=args.port, debug=True)
     else:
         print("翻译器初始化失败，无法启动Web服务")
\ No newline at end of file
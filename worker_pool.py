@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程推理工作池
+父进程先加载模型，再fork出多个推理进程：模型权重通过写时复制在进程间共享，
+内存不随进程数线性增长；每个进程绑定到一组CPU核心，吞吐随核心数扩展
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Set
+
+from backends import set_num_threads
+from decoding import validate_preset
+from metrics import BATCH_SIZE, STAGE_ERRORS, WORKER_RESTARTS, direction_label, observe_stage
+
+# 结果线程等待结果或进程退出的最长时间（秒），到时检查工作池是否已关闭
+MONITOR_INTERVAL = 0.5
+
+
+def _available_cpus() -> List[int]:
+    """当前进程可用的CPU核心"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _assign_cpus(num_workers: int) -> List[List[int]]:
+    """把可用CPU核心按连续分组分配给各个进程"""
+    cpus = _available_cpus()
+    if num_workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(num_workers)]
+
+    per_worker = len(cpus) // num_workers
+    return [cpus[i * per_worker:(i + 1) * per_worker] for i in range(num_workers)]
+
+
+def _worker_main(translator, tasks, results, cpus: Optional[List[int]], pin_cpus: bool):
+    """推理进程主循环
+
+    tasks 是该进程独占的任务队列，results 是该进程独占的结果管道的写入端：
+    进程被杀时可能正持有队列或管道的锁，独占使这些锁不会卡住其他进程。
+    cpus 为 None 表示备用进程，顶替某个槽位时才从任务队列收到要绑定的CPU。
+    """
+    # 缓存和翻译记忆库由父进程统一管理；fork继承的SQLite连接不能跨进程使用，需要重新打开
+    translator.cache = None
+    translator.memory = None
+    if translator.dictionary_path or translator.example_corpus_path:
+        translator._init_dictionary()
+
+    if cpus is None:
+        cpus = tasks.get()
+        if cpus is None:
+            return
+    if pin_cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    set_num_threads(len(cpus))
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        task_id, method, args, kwargs = item
+        try:
+            result = getattr(translator, method)(*args, **kwargs)
+        except Exception as e:
+            results.send((task_id, False, f"{type(e).__name__}: {e}"))
+            continue
+        try:
+            results.send((task_id, True, result))
+        except Exception as e:
+            # 结果无法序列化
+            results.send((task_id, False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """一个推理进程槽位：进程、独占的任务队列、结果管道的读取端和已派发未完成的任务"""
+
+    def __init__(self, slot: Optional[int], process, tasks, results):
+        self.slot = slot
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.pending: Set[int] = set()
+
+
+class ProcessWorkerPool:
+    """多进程推理工作池
+
+    提供与 ChineseEnglishTranslator 相同的 translate_* 接口，调用被分发到
+    未完成任务最少的推理进程（每个进程有独占的任务队列）。翻译缓存仍在父进程中查询
+    和写入，只有未命中的文本才发给推理进程。推理进程异常退出（如被OOM杀掉、段错误）时，
+    已派发给它的任务以 RuntimeError 结束，由启动时预先fork的备用进程顶替，仅支持 fork 启动方式（Linux）。
+
+    备用进程和推理进程一样在其他线程启动之前fork，状态是干净的。顶替之后需要补一个新的备用进程，
+    这时父进程里已经有结果线程、微批处理和Web服务的线程：fork时若其他线程正持有锁
+    （malloc、OpenMP线程池等），新进程用到这把锁就会卡死。补充的进程只作为备用，等下一次异常退出
+    才接收任务，仍有这个风险；spare=False 时直接使用新fork的进程，风险相同。
+    重启次数记录在指标 translator_worker_restarts_total 中。
+    """
+
+    def __init__(self, translator, num_workers: Optional[int] = None, pin_cpus: bool = True,
+                 warmup: Optional[List[str]] = None, spare: bool = True):
+        """加载模型并启动推理进程
+
+        translator: 父进程中的翻译器，fork前会预先加载 warmup 指定的方向
+        num_workers: 推理进程数，默认等于CPU核心数
+        pin_cpus: 是否把每个进程绑定到固定的CPU核心
+        warmup: fork前加载的翻译方向，默认两个方向都加载
+        spare: 是否额外fork一个备用进程，推理进程异常退出时顶替它
+        """
+        self.translator = translator
+        self.num_workers = num_workers or len(_available_cpus())
+
+        # 必须在fork之前加载模型，子进程才能共享权重
+        translator._init_translation_models(warmup)
+
+        self._context = multiprocessing.get_context("fork")
+        self._pin_cpus = pin_cpus
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._closed = False
+        self._stopped = False
+        self._restarts = 0
+
+        self._cpu_sets = _assign_cpus(self.num_workers)
+        self._workers = [self._start_worker(i) for i in range(self.num_workers)]
+        self._spare_enabled = spare
+        self._spare = self._start_worker(None) if spare else None
+
+        self._listener = threading.Thread(target=self._collect_results, name="worker-pool-results",
+                                          daemon=True)
+        self._listener.start()
+
+    def _start_worker(self, slot: Optional[int]) -> _Worker:
+        """fork一个推理进程占用指定槽位，slot 为 None 时作为备用进程"""
+        tasks = self._context.Queue()
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.translator, tasks, writer,
+                  None if slot is None else self._cpu_sets[slot], self._pin_cpus),
+            name="translator-worker-spare" if slot is None else f"translator-worker-{slot}",
+            daemon=True
+        )
+        process.start()
+        # 父进程不写结果，关闭写入端的副本
+        writer.close()
+        return _Worker(slot, process, tasks, reader)
+
+    def _collect_results(self):
+        """后台线程：把推理进程返回的结果交给对应的 Future，推理进程退出时让它的任务失败并补上进程"""
+        while not self._stopped:
+            with self._lock:
+                workers = list(self._workers)
+            if self._spare is not None:
+                workers.append(self._spare)
+            readers = {worker.results: worker for worker in workers if not worker.results.closed}
+            # 关闭过程中进程正常退出，不再当作异常
+            sentinels = {} if self._closed else {worker.process.sentinel: worker for worker in workers}
+            ready = wait(list(readers) + list(sentinels), timeout=MONITOR_INTERVAL)
+            # 先取结果再处理退出，进程退出前已写出的结果不会被当作失败
+            for conn in ready:
+                if conn in readers:
+                    self._receive(readers[conn])
+            for conn in ready:
+                if conn in sentinels:
+                    self._replace_worker(sentinels[conn])
+
+        # 关闭时取走推理进程退出前写出的最后一批结果
+        for worker in self._workers:
+            while not worker.results.closed and worker.results.poll():
+                self._receive(worker)
+
+    def _receive(self, worker: _Worker):
+        try:
+            task_id, ok, value = worker.results.recv()
+        except (EOFError, OSError):
+            # 所有写入端都已关闭
+            worker.results.close()
+            return
+        with self._lock:
+            worker.pending.discard(task_id)
+            future = self._futures.pop(task_id, None)
+        if future is not None:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _replace_worker(self, worker: _Worker):
+        """让异常退出的进程已派发的任务失败，由备用进程顶替，再补一个备用进程"""
+        if self._closed:
+            return
+        process = worker.process
+        message = f"推理进程 {process.pid} 异常退出（exitcode={process.exitcode}）"
+        if worker.slot is None:
+            print(f"备用{message}，重新启动")
+            self._discard(worker)
+            self._spare = self._start_worker(None)
+            return
+        with self._lock:
+            futures = [self._futures.pop(task_id, None) for task_id in worker.pending]
+            worker.pending.clear()
+        for future in futures:
+            if future is not None:
+                future.set_exception(RuntimeError(message))
+        print(f"{message}，重新启动")
+        WORKER_RESTARTS.inc()
+        self._discard(worker)
+
+        replacement, self._spare = self._spare, None
+        if replacement is None:
+            replacement = self._start_worker(worker.slot)
+        else:
+            replacement.slot = worker.slot
+            replacement.tasks.put(self._cpu_sets[worker.slot])
+        with self._lock:
+            self._workers[worker.slot] = replacement
+            self._restarts += 1
+        if self._spare_enabled:
+            self._spare = self._start_worker(None)
+
+    @staticmethod
+    def _discard(worker: _Worker):
+        """关闭已退出进程的任务队列和结果管道"""
+        # 没有读取方的任务队列不能再等后台线程把数据写完
+        worker.tasks.cancel_join_thread()
+        worker.tasks.close()
+        worker.results.close()
+
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        """把一次翻译器方法调用发给空闲的推理进程"""
+        if self._closed:
+            raise RuntimeError("工作池已关闭")
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        task_id = next(self._task_ids)
+        with self._lock:
+            worker = min(self._workers, key=lambda worker: len(worker.pending))
+            worker.pending.add(task_id)
+            self._futures[task_id] = future
+        worker.tasks.put((task_id, method, args, kwargs))
+        return future
+
+    def translate_batch_async(self, texts: List[str], source_lang: str = "zh",
+                              preset: Optional[str] = None, with_steps: bool = False) -> Future:
+        """异步批量翻译：父进程查缓存，未命中的文本交给推理进程
+
+        with_steps=True 时 Future 的结果为 (结果, 每条文本实际解码的步数)，参见 translator.translate_batch。
+        """
+        source_lang = "zh" if source_lang == "zh" else "en"
+        preset = validate_preset(preset or self.translator.preset)
+        results, missing = self.translator._lookup_cached(texts, source_lang, preset)
+        steps = [0] * len(texts)
+        done: Future = Future()
+        done.set_running_or_notify_cancel()
+        if not missing:
+            done.set_result((results, steps) if with_steps else results)
+            return done
+
+        # 推理进程中记录的指标不会回传，父进程按往返耗时记录推理阶段
+        direction = direction_label(source_lang)
+        BATCH_SIZE.observe(len(missing), direction=direction)
+        start = time.perf_counter()
+
+        def finish(future: Future):
+            observe_stage("inference", direction, time.perf_counter() - start)
+            try:
+                outputs, counts = future.result()
+            except Exception as e:
+                STAGE_ERRORS.inc(stage="inference", direction=direction)
+                done.set_exception(e)
+                return
+            self.translator._store_results(texts, source_lang, results, missing, outputs, preset)
+            for i, count in zip(missing, counts):
+                steps[i] = count
+            done.set_result((results, steps) if with_steps else results)
+
+        self.submit(
+            "_generate", [texts[i] for i in missing], source_lang, preset
+        ).add_done_callback(finish)
+        return done
+
+    def translate_batch(self, texts: List[str], source_lang: str = "zh",
+                        preset: Optional[str] = None, with_steps: bool = False):
+        """批量翻译"""
+        return self.translate_batch_async(texts, source_lang, preset, with_steps).result()
+
+    def translate_chinese_to_english(self, chinese_text: str) -> str:
+        """中文翻译为英文"""
+        try:
+            if not chinese_text.strip():
+                return ""
+            return self.translate_batch([chinese_text], "zh")[0]
+        except Exception as e:
+            print(f"翻译错误: {e}")
+            return f"翻译失败: {e}"
+
+    def translate_english_to_chinese(self, english_text: str) -> str:
+        """英文翻译为中文"""
+        try:
+            if not english_text.strip():
+                return ""
+            return self.translate_batch([english_text], "en")[0]
+        except Exception as e:
+            print(f"翻译错误: {e}")
+            return f"翻译失败: {e}"
+
+    def translate_with_examples(self, text: str, source_lang: str = "zh",
+                                document: bool = False, profile: bool = False) -> Dict:
+        """翻译并获取例句
+
+        在父进程中执行，译文先查父进程的缓存和翻译记忆库，只有未命中的文本交给推理进程。
+        """
+        return self.translator.translate_with_examples(text, source_lang, document=document,
+                                                       profile=profile, translate_batch=self.translate_batch)
+
+    def stats(self) -> Dict:
+        """各推理进程的PID、绑定的CPU、存活状态和未完成的任务数"""
+        with self._lock:
+            pending = len(self._futures)
+            workers = [(worker, len(worker.pending)) for worker in self._workers]
+        return {
+            "workers": [
+                {"pid": worker.process.pid, "cpus": self._cpu_sets[worker.slot],
+                 "alive": worker.process.is_alive(), "pending": count}
+                for worker, count in workers
+            ],
+            "spare": self._spare.process.pid if self._spare is not None else None,
+            "pending": pending,
+            "restarts": self._restarts
+        }
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """关闭工作池，等待推理进程处理完已提交的任务"""
+        if self._closed:
+            return
+        self._closed = True
+        workers = self._workers + ([self._spare] if self._spare is not None else [])
+        for worker in workers:
+            worker.tasks.put(None)
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._stopped = True
+        self._listener.join(timeout)